@@ -36,6 +36,24 @@ TXT_OUTPUT_FOLDER = "data/output/txt"
 JSON_OUTPUT_FOLDER = "data/output/json"
 CSV_OUTPUT_FOLDER = "data/output/csv"
 
+# 抽出エンジン設定（'lxml'、'bs4' または 'scan'。lxmlが使えない場合は自動的にbs4を使用）
+EXTRACT_ENGINE = 'lxml'
+
+# 1つの大きなHTMLを article要素の境界で分割して並列にパースするプロセス数（1の場合は並列化しない）
+EXTRACT_WORKERS = 1
+
+# 一括抽出（extract --since/--until/--pending）で並列に処理するプロセス数（Noneの場合はCPU数）
+EXTRACT_JOBS = None
+
+# 抽出結果のjsonの出力形式（'json' は全件をまとめた整形済みのJSON、'ndjson' は1行に1件のツイート）
+OUTPUT_FORMAT = 'json'
+
+# JSONの変換に使うライブラリ（'orjson'、'ujson' または 'json'。Noneの場合はインストールされている中で最も速いもの）
+JSON_BACKEND = None
+
+# Trueの場合は json 形式でも字下げ・空白を入れずに保存する（ファイルが小さくなり、書き出しも速い）
+JSON_COMPACT = False
+
 # prefix別のフォルダ設定
 def get_prefix_folders(prefix):
     """prefixに基づいてフォルダパスを取得"""
@@ -71,6 +89,18 @@ _PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 CONFIG_DIR = os.path.join(_PROJECT_ROOT, 'data', 'config')
 POSITION_CONFIG_PATH = os.path.join(CONFIG_DIR, "positions.json")
 
+# 抽出プラン（マークアップの種類の判定結果とセレクタのマッチ数）のキャッシュ
+CACHE_DIR = os.path.join(_PROJECT_ROOT, 'data', 'cache')
+PLAN_CACHE_PATH = os.path.join(CACHE_DIR, "extract_plans.json")
+
+# 抽出結果のキャッシュ（HTMLの内容と抽出処理が同じなら再パースしない）
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, "results")
+
+# 抽出したツイートをSQLiteのストアにも保存する場合はTrue（merge --from-store と search はストアを使う）
+TWEET_STORE_ENABLED = False
+TWEET_STORE_PATH = os.path.join(_PROJECT_ROOT, 'data', 'tweets.sqlite3')
+
 # デフォルトのマウスポジション設定
 DEFAULT_POSITIONS = {
     'search_box': {'x': 0, 'y': 0},  # 検索ボックスの位置
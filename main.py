@@ -8,8 +8,10 @@ Twitter HTML Extractor メインプログラム
 
 使い方:
   python main.py html 250803 [--keyword-type TYPE] [--search-keyword KEYWORD] [--no-date] [--verbose]
-  python main.py merge [--keyword-type TYPE] [--verbose]
+  python main.py merge [--keyword-type TYPE] [--from-store] [--verbose]
+  python main.py search WORD [WORD ...] [--keyword-type TYPE] [--since DATE] [--until DATE] [--limit N]
   python main.py extract DATE [--keyword-type TYPE] [--verbose]
+  python main.py extract [--since DATE] [--until DATE] [--pending] [--jobs N] [--keyword-type TYPE]
   python main.py all DATE [--keyword-type TYPE] [--verbose]
 
 例:
@@ -25,6 +27,7 @@ import os
 import sys
 import importlib
 import argparse
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -54,6 +57,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import config
 from src.extract_tweets_from_html import main as extract_main
 from src.merge_all_txt_to_csv import merge_all_txt_to_csv
+from src.batch_extract import run_batch_extract
+from src import tweet_store
 from src.create_twitter_html_all import main as create_twitter_html_all_main
 
 class StoreKeywordAction(argparse.Action):
@@ -194,14 +199,43 @@ def parse_arguments(args=None):
     # マージコマンド
     merge_parser = subparsers.add_parser('merge', help='すべてのテキストファイルをCSVに結合')
     add_common_arguments(merge_parser, include_keyword_type=True)
+    merge_parser.add_argument('--from-store', action='store_true', help='txtファイルを読み込まずにSQLiteのストア（config.TWEET_STORE_PATH）から結合する')
     merge_parser.set_defaults(func=run_merge_command)
 
+    # 検索コマンド
+    search_parser = subparsers.add_parser('search', help='抽出したツイートの本文を全文検索（config.TWEET_STORE_ENABLED が必要）',
+                                        usage='%(prog)s word [word ...] [options]',
+                                        description='SQLiteのストア（config.TWEET_STORE_PATH）に保存したツイートの本文を検索します。'
+                                                    'ストアには config.TWEET_STORE_ENABLED = True で抽出したツイートだけが保存されます。')
+    search_parser.add_argument('words', nargs='+', metavar='word', help='検索語（複数指定した場合はすべてを含むツイート）')
+    search_parser.add_argument('--keyword-type', '-k', dest='keyword_type', help='キーワードタイプで絞り込む（カンマ区切りで複数指定可。デフォルト: すべて）')
+    search_parser.add_argument('--since', metavar='YYMMDD', help='この日付（JST）以降に投稿されたツイートだけにする')
+    search_parser.add_argument('--until', metavar='YYMMDD', help='この日付（JST）以前に投稿されたツイートだけにする')
+    search_parser.add_argument('--limit', type=int, default=50, metavar='N', help='表示する最大件数（デフォルト: 50、0の場合は制限なし）')
+    search_parser.add_argument('--verbose', '-v', action='store_true', help='詳細な出力を有効化')
+    search_parser.set_defaults(func=run_search_command)
+
     # 抽出コマンド
     extract_parser = subparsers.add_parser('extract', help='指定した日付のツイートを抽出',
                                          usage='%(prog)s [date] [--no-date] [options]')
     extract_parser.add_argument('date', nargs='?', metavar='MMDD', help='抽出する日付 (MMDD形式、--no-date を指定した場合は無視されます)')
     add_common_arguments(extract_parser, include_keyword_type=True)
     extract_parser.add_argument('--no-date', action='store_true', help='最新のHTMLファイルを使用')
+    extract_parser.add_argument('--engine', choices=['lxml', 'bs4', 'scan'], help='抽出エンジンを指定（デフォルト: config.EXTRACT_ENGINE）')
+    extract_parser.add_argument('--stream', action='store_true', help='ツイート要素ごとに逐次パースしてメモリ使用量を抑える')
+    extract_parser.add_argument('--max-tweets', type=int, metavar='N', help='N件抽出した時点で終了する')
+    extract_parser.add_argument('--restrict-parse', action='store_true', help='article要素の範囲だけをパースする')
+    extract_parser.add_argument('--capture-raw-html', action='store_true', help='ツイート要素のHTMLの位置（バイトオフセット）を記録する')
+    extract_parser.add_argument('--verify-scan', action='store_true', help='高速パス（scan）とDOMの抽出結果を比較して違いを表示する')
+    extract_parser.add_argument('--workers', type=int, metavar='N', help='大きなHTMLを分割してNプロセスで並列にパースする')
+    extract_parser.add_argument('--since', metavar='YYMMDD', help='この日付以降のHTMLファイルを一括抽出する')
+    extract_parser.add_argument('--until', metavar='YYMMDD', help='この日付以前のHTMLファイルを一括抽出する')
+    extract_parser.add_argument('--pending', action='store_true', help='まだ抽出していない（jsonがない、またはHTMLより古い）HTMLファイルを一括抽出する')
+    extract_parser.add_argument('--jobs', '-j', type=int, metavar='N', help='一括抽出のプロセス数（デフォルト: config.EXTRACT_JOBS）')
+    extract_parser.add_argument('--no-cache', action='store_true', help='抽出結果のキャッシュを使わずにHTMLをパースする')
+    extract_parser.add_argument('--fields', metavar='NAMES', help='出力する項目をカンマ区切りで指定する（例: status_id,datetime）')
+    extract_parser.add_argument('--format', choices=['json', 'ndjson'], help='jsonの出力形式（ndjson は1行に1件のツイート。デフォルト: config.OUTPUT_FORMAT）')
+    extract_parser.add_argument('--stdout', action='store_true', help='ツイートをNDJSONで標準出力に書き出す（ファイルには保存しない）')
     extract_parser.set_defaults(func=run_extract_command)
 
     # 全実行コマンド
@@ -236,7 +270,7 @@ def parse_arguments(args=None):
         all_parser.set_defaults(func=run_all_command)
 
     # 他のパーサーに共通の引数を追加（all_parserは除外）
-    for p in [html_parser, merge_parser, extract_parser]:
+    for p in [html_parser, merge_parser, search_parser, extract_parser]:
         p._optionals.title = 'オプション'
 
     # ヘルプオプションを追加
@@ -267,6 +301,9 @@ def parse_arguments(args=None):
   # ファイル結合（複数キーワードタイプ）
   python main.py merge --keyword-type chikirin,thai
 
+  # 抽出したツイートの全文検索（すべての語を含むツイートを新しい順に表示）
+  python main.py search DTV ビザ -k thai --since 250601
+
   # 一括実行（作成 + 抽出、単一キーワードタイプ）
   python main.py all 250827 -k chikirin
 
@@ -320,8 +357,8 @@ def parse_arguments(args=None):
                 if hasattr(parsed_args, 'verbose') and parsed_args.verbose:
                     print(f"INFO: 日付未指定のため前日(ローカル)を自動設定しました: {parsed_args.date}")
 
-    # キーワードタイプを検証
-    if not validate_keyword_type(parsed_args.keyword_type):
+    # キーワードタイプを検証（search で指定しなかった場合は、すべてのキーワードタイプが対象）
+    if parsed_args.keyword_type is not None and not validate_keyword_type(parsed_args.keyword_type):
         print(f"エラー: 無効なキーワードタイプです。使用可能な選択肢: {', '.join(config.KEYWORD_PREFIX_MAPPING.keys())}")
         sys.exit(1)
 
@@ -477,7 +514,7 @@ def run_merge_command(args):
 
         try:
             # マージを実行
-            merge_all_txt_to_csv(keyword_type)
+            merge_all_txt_to_csv(keyword_type, from_store=getattr(args, 'from_store', False))
             if hasattr(args, 'verbose') and args.verbose:
                 print(f"キーワードタイプ '{keyword_type}' のデータ結合が完了しました")
         except Exception as e:
@@ -490,6 +527,57 @@ def run_merge_command(args):
     return success
 
 
+def run_search_command(args):
+    """検索コマンドを実行する（SQLiteのストアの全文検索の索引を使う）
+
+    Args:
+        args: コマンドライン引数
+
+    Returns:
+        bool: 検索できた場合はTrue、失敗した場合はFalse
+    """
+    for date_str in (args.since, args.until):
+        if date_str and not validate_date(date_str):
+            print(f"エラー: 無効な日付形式です: {date_str}（YYMMDD 形式で指定してください）")
+            return False
+
+    keyword_types = None
+    if args.keyword_type:
+        keyword_types = [kt.strip() for kt in args.keyword_type.split(',')]
+        for keyword_type in keyword_types:
+            if not validate_keyword_type(keyword_type):
+                print(f"エラー: 無効なキーワードタイプ '{keyword_type}' です")
+                return False
+
+    store_path = tweet_store.default_store_path()
+    if not os.path.exists(store_path):
+        print(f"ストアが見つかりません: {store_path}")
+        print("config.TWEET_STORE_ENABLED を True にして抽出すると、抽出したツイートが検索できるようになります。")
+        return False
+    if not tweet_store.store_enabled():
+        print("注意: config.TWEET_STORE_ENABLED が False のため、その後に抽出したツイートはストアに保存されず、検索できません。")
+
+    start = time.perf_counter()
+    results = tweet_store.search_tweets(
+        args.words, keyword_types,
+        since_ms=tweet_store.date_epoch_ms(args.since), until_ms=tweet_store.date_epoch_ms(args.until, next_day=True),
+        limit=args.limit or None, path=store_path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for keyword_type, tweet in results:
+        user = ' '.join(value for value in (tweet.get('user_name'), tweet.get('handle') and f"({tweet['handle']})") if value)
+        print(f"[{keyword_type}] {tweet.get('datetime', '')} {user}")
+        if tweet.get('url'):
+            print(tweet['url'])
+        print(tweet.get('text', ''))
+        print("-" * 30)
+
+    print(f"{len(results)} 件のツイートが見つかりました（{elapsed_ms:.1f} ms）")
+    if args.limit and len(results) == args.limit:
+        print(f"（最新の {args.limit} 件を表示しました。--limit で件数を変更できます）")
+    return True
+
+
 def run_extract_command(args, test_mode=False):
     """抽出コマンドを実行する
 
@@ -500,6 +588,10 @@ def run_extract_command(args, test_mode=False):
     Returns:
         bool: 全てのキーワードタイプで成功した場合はTrue、失敗した場合はFalse
     """
+    # 日付範囲・未抽出の指定がある場合は一括抽出
+    if getattr(args, 'since', None) or getattr(args, 'until', None) or getattr(args, 'pending', False):
+        return run_batch_extract_command(args)
+
     # --no-date が指定されていない場合のみ日付を検証
     if not getattr(args, 'no_date', False):
         if not hasattr(args, 'date') or not args.date or not validate_date(args.date):
@@ -516,6 +608,9 @@ def run_extract_command(args, test_mode=False):
     else:
         keyword_types = [args.keyword_type]
 
+    # --stdout の場合、標準出力にはNDJSONだけを書き出す
+    log = sys.stderr if getattr(args, 'stdout', False) else sys.stdout
+
     # 各キーワードタイプで処理を実行
     success = True
     for keyword_type in keyword_types:
@@ -526,7 +621,7 @@ def run_extract_command(args, test_mode=False):
             continue
 
         if hasattr(args, 'verbose') and args.verbose:
-            print(f"キーワードタイプ '{keyword_type}' でツイートを抽出します（日付={date_str}）")
+            print(f"キーワードタイプ '{keyword_type}' でツイートを抽出します（日付={date_str}）", file=log)
 
         # 一時的にコマンドライン引数を設定（後方互換性のため）
         old_argv = sys.argv
@@ -560,6 +655,32 @@ def run_extract_command(args, test_mode=False):
                     cmd_args.extend(['--extension-button-x', str(args.extension_button['x'])])
                     cmd_args.extend(['--extension-button-y', str(args.extension_button['y'])])
 
+            # 抽出エンジンを指定
+            if getattr(args, 'engine', None):
+                cmd_args.extend(['--engine', args.engine])
+
+            # 逐次パース・抽出件数の上限を指定
+            if getattr(args, 'stream', False):
+                cmd_args.append('--stream')
+            if getattr(args, 'max_tweets', None):
+                cmd_args.extend(['--max-tweets', str(args.max_tweets)])
+            if getattr(args, 'restrict_parse', False):
+                cmd_args.append('--restrict-parse')
+            if getattr(args, 'capture_raw_html', False):
+                cmd_args.append('--capture-raw-html')
+            if getattr(args, 'verify_scan', False):
+                cmd_args.append('--verify-scan')
+            if getattr(args, 'workers', None):
+                cmd_args.extend(['--workers', str(args.workers)])
+            if getattr(args, 'no_cache', False):
+                cmd_args.append('--no-cache')
+            if getattr(args, 'fields', None):
+                cmd_args.extend(['--fields', args.fields])
+            if getattr(args, 'format', None):
+                cmd_args.extend(['--format', args.format])
+            if getattr(args, 'stdout', False):
+                cmd_args.append('--stdout')
+
             # 詳細出力を指定
             if hasattr(args, 'verbose') and args.verbose:
                 cmd_args.append('--verbose')
@@ -574,7 +695,7 @@ def run_extract_command(args, test_mode=False):
                 success = False
             else:
                 if hasattr(args, 'verbose') and args.verbose:
-                    print(f"キーワードタイプ '{keyword_type}' の抽出が完了しました。")
+                    print(f"キーワードタイプ '{keyword_type}' の抽出が完了しました。", file=log)
 
         except Exception as e:
             error_msg = f"キーワードタイプ '{keyword_type}' の抽出中にエラーが発生しました: {e}"
@@ -589,6 +710,47 @@ def run_extract_command(args, test_mode=False):
     return success
 
 
+def run_batch_extract_command(args):
+    """日付範囲・未抽出のHTMLファイルを一括抽出する
+
+    Args:
+        args: コマンドライン引数
+
+    Returns:
+        bool: 全てのファイルで成功した場合はTrue、失敗した場合はFalse
+    """
+    for date_str in (getattr(args, 'since', None), getattr(args, 'until', None)):
+        if date_str and not validate_date(date_str):
+            print(f"エラー: 無効な日付形式です: {date_str}（YYMMDD 形式で指定してください）")
+            return False
+
+    # キーワードタイプをリストに変換
+    keyword_types = [kt.strip() for kt in args.keyword_type.split(',')]
+    for keyword_type in keyword_types:
+        if not validate_keyword_type(keyword_type):
+            print(f"エラー: 無効なキーワードタイプ '{keyword_type}' です")
+            return False
+
+    if getattr(args, 'workers', None):
+        print("注意: 一括抽出ではファイル単位で並列化するため、--workers は使用しません")
+    if getattr(args, 'stdout', False):
+        print("エラー: 一括抽出では --stdout は使用できません（--format ndjson でファイルに保存してください）")
+        return False
+    if getattr(args, 'verify_scan', False):
+        print("エラー: 一括抽出では --verify-scan は使用できません（ファイルごとに extract コマンドで検証してください）")
+        return False
+
+    fields = None
+    if getattr(args, 'fields', None):
+        fields = [name.strip() for name in args.fields.split(',') if name.strip()]
+
+    return run_batch_extract(keyword_types, since=args.since, until=args.until, pending_only=args.pending,
+                             jobs=getattr(args, 'jobs', None), engine=getattr(args, 'engine', None),
+                             use_cache=not getattr(args, 'no_cache', False), verbose=getattr(args, 'verbose', False),
+                             fields=fields, output_format=getattr(args, 'format', None),
+                             stream=getattr(args, 'stream', False), max_tweets=getattr(args, 'max_tweets', None),
+                             restrict=getattr(args, 'restrict_parse', False), capture_raw_html=getattr(args, 'capture_raw_html', False))
+
 def main():
     """メインエントリーポイント"""
     try:
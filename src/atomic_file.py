@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+出力ファイルの原子的な書き出し
+同じフォルダの一時ファイルに書き込んでから名前を変更して置き換えるため、途中で中断しても
+書きかけのファイルが残らない。内容が既存のファイルと同じ場合は置き換えず、更新日時も変えない
+（同期・バックアップで変更のないファイルを転送し直さないようにする）。
+"""
+
+import os
+
+# 内容を比較する際の読み込み単位
+_COMPARE_CHUNK_SIZE = 1 << 20
+
+def temp_path_for(path):
+    """path を置き換えるための一時ファイルのパス（同じフォルダに作る）"""
+    return f"{path}.tmp{os.getpid()}"
+
+def _strip_volatile(data, volatile_prefix):
+    """比較から除く先頭部分（抽出日時など）を除く（パターンに合わない場合はNone）"""
+    match = volatile_prefix.match(data)
+    return data[match.end():] if match else None
+
+def _same_bytes(path, data, volatile_prefix=None):
+    """path の内容が data と同じかどうか（volatile_prefix に合う先頭部分は比較しない）"""
+    try:
+        if volatile_prefix is None and os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            existing = f.read()
+    except OSError:
+        return False
+    if volatile_prefix is not None:
+        existing, data = _strip_volatile(existing, volatile_prefix), _strip_volatile(data, volatile_prefix)
+        if existing is None or data is None:
+            return False
+    return existing == data
+
+def _same_file(path, other_path, volatile_prefix=None):
+    """2つのファイルの内容が同じかどうか（volatile_prefix に合う先頭部分は比較しない）"""
+    if volatile_prefix is not None:
+        with open(other_path, 'rb') as f:
+            return _same_bytes(path, f.read(), volatile_prefix)
+    try:
+        if os.path.getsize(path) != os.path.getsize(other_path):
+            return False
+        with open(path, 'rb') as f, open(other_path, 'rb') as other:
+            while True:
+                chunk = f.read(_COMPARE_CHUNK_SIZE)
+                if chunk != other.read(_COMPARE_CHUNK_SIZE):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+def _replace(temp_path, path):
+    """一時ファイルを path に置き換える（既存のファイルのパーミッションを引き継ぐ）"""
+    try:
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+    except OSError:
+        pass
+    os.replace(temp_path, path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def write_if_changed(path, data, volatile_prefix=None):
+    """data を path に原子的に書き出す（内容が既存のファイルと同じ場合は書き出さない）
+
+    Args:
+        path (str): 出力ファイルのパス
+        data (bytes | str): 書き出す内容（str はUTF-8で書き出す）
+        volatile_prefix (re.Pattern): 内容の比較から除く先頭部分のバイト列のパターン（抽出日時など）
+
+    Returns:
+        bool: 書き出した場合はTrue、内容が同じため書き出さなかった場合はFalse
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if _same_bytes(path, data, volatile_prefix):
+        return False
+    temp_path = temp_path_for(path)
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(temp_path, path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return True
+
+class AtomicFile:
+    """path の一時ファイルに書き込み、commit() で原子的に置き換えるファイル
+
+    with で使うと、正常に抜けた場合は commit()、例外で抜けた場合は discard() する。
+    内容が既存のファイルと同じ場合は置き換えない（changed が False になる）。
+
+    Args:
+        path (str): 出力ファイルのパス
+        mode (str): 一時ファイルを開くモード（'w' または 'wb'）
+        encoding (str): テキストモードの文字コード
+        newline (str): テキストモードの改行の扱い（open と同じ）
+        volatile_prefix (re.Pattern): 内容の比較から除く先頭部分のバイト列のパターン
+    """
+
+    def __init__(self, path, mode='w', encoding=None, newline=None, volatile_prefix=None):
+        self.path = path
+        self.temp_path = temp_path_for(path)
+        self.volatile_prefix = volatile_prefix
+        self.changed = None
+        self.file = open(self.temp_path, mode, encoding=encoding, newline=newline)
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def writelines(self, lines):
+        self.file.writelines(lines)
+
+    def flush(self):
+        self.file.flush()
+
+    def commit(self):
+        """書き込んだ内容で path を置き換える（内容が同じ場合は一時ファイルを消す）
+
+        Returns:
+            bool: 置き換えた場合はTrue
+        """
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.changed = not _same_file(self.path, self.temp_path, self.volatile_prefix)
+            if self.changed:
+                _replace(self.temp_path, self.path)
+            else:
+                _remove(self.temp_path)
+        except BaseException:
+            self.discard()
+            raise
+        return self.changed
+
+    def discard(self):
+        """書き込んだ内容を捨てる（path は変更しない）"""
+        self.file.close()
+        _remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+複数のHTMLファイルの一括抽出
+キーワードタイプごとの入力フォルダから日付範囲・未抽出のHTMLファイルを集め、
+プロセスプールで並列に抽出して txt/json を保存する。
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 設定ファイルをインポート
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.extract_tweets_from_html import OUTPUT_FORMATS, iter_tweets_for_output, save_tweets_to_files
+from src.extraction_plan import PlanCache
+from src.result_cache import ResultCache
+from src.tweet_record import TWEET_FIELDS
+from src.tweet_selectors import selector_stats
+
+# 入力HTMLのファイル名（YYMMDD.html）
+_HTML_FILE_PATTERN = re.compile(r'^(\d{6})\.html$')
+
+def to_yymmdd(date_str):
+    """YYMMDD または YYYY-MM-DD 形式の日付を YYMMDD にそろえる（Noneはそのまま）"""
+    if date_str and len(date_str) == 10:
+        return date_str[2:4] + date_str[5:7] + date_str[8:10]
+    return date_str
+
+def find_html_files(keyword_type, since=None, until=None, pending_only=False):
+    """キーワードタイプの入力フォルダから抽出対象のHTMLファイルを探す
+
+    Args:
+        keyword_type (str): キーワードタイプ
+        since (str): この日付以降（YYMMDD、Noneの場合は制限なし）
+        until (str): この日付以前（YYMMDD、Noneの場合は制限なし）
+        pending_only (bool): Trueの場合は未抽出（json・ndjsonがない、またはHTMLより古い）ファイルだけを返す
+
+    Returns:
+        list: (日付, HTMLファイルのパス) を日付順に並べたリスト
+    """
+    folders = config.get_prefix_folders(config.KEYWORD_PREFIX_MAPPING.get(keyword_type))
+    if not os.path.isdir(folders['input']):
+        return []
+
+    html_files = []
+    for name in sorted(os.listdir(folders['input'])):
+        match = _HTML_FILE_PATTERN.match(name)
+        if not match:
+            continue
+        date_str = match.group(1)
+        if (since and date_str < since) or (until and date_str > until):
+            continue
+        html_file = os.path.join(folders['input'], name)
+        if pending_only:
+            json_files = [os.path.join(folders['json'], f"{date_str}.{ext}") for ext in OUTPUT_FORMATS]
+            if any(os.path.exists(json_file) and os.path.getmtime(json_file) >= os.path.getmtime(html_file) for json_file in json_files):
+                continue
+        html_files.append((date_str, html_file))
+    return html_files
+
+def _extract_file(keyword_type, date_str, html_file, engine=None, plan=None, cache_dir=None, fields=None, output_format=None, extract_options=None):
+    """HTMLファイル1つを抽出して保存する（ワーカープロセスで実行）
+
+    cache_dir を指定した場合は抽出結果のキャッシュを使う。fields を指定した場合はその項目だけを保存する。
+    output_format は保存するjsonの形式（save_tweets_to_files）。
+    extract_options は iter_tweets_for_output にそのまま渡す引数（stream, max_tweets, restrict, capture_raw_html）。
+
+    Returns:
+        dict: keyword_type, date, html_file, tweets（件数）, error, seconds, log（抽出時の出力）, stats（抽出前後の selector_stats()）
+    """
+    start_time = time.time()
+    stats_before = selector_stats()
+    result = {'keyword_type': keyword_type, 'date': date_str, 'html_file': html_file, 'tweets': 0, 'error': None}
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            cache = ResultCache(cache_dir) if cache_dir else None
+            # 抽出しながら書き出しスレッドに渡す（ツイートがない場合は保存しない）
+            tweets = save_tweets_to_files(iter_tweets_for_output(html_file, engine=engine, plan=plan, cache=cache, fields=fields, **(extract_options or {})), date_str, keyword_type, output_format)
+        result['tweets'] = len(tweets)
+        if not tweets:
+            result['error'] = 'ツイートを抽出できませんでした'
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.time() - start_time
+    result['log'] = log.getvalue()
+    result['stats'] = (stats_before, selector_stats())
+    return result
+
+def run_batch_extract(keyword_types, since=None, until=None, pending_only=False, jobs=None, engine=None, use_cache=True, verbose=False, fields=None, output_format=None,
+                      stream=False, max_tweets=None, restrict=False, capture_raw_html=False):
+    """複数のキーワードタイプ・日付のHTMLファイルをプロセスプールで一括抽出する
+
+    Args:
+        keyword_types (list): キーワードタイプのリスト
+        since (str): この日付以降（YYMMDD または YYYY-MM-DD）
+        until (str): この日付以前（YYMMDD または YYYY-MM-DD）
+        pending_only (bool): Trueの場合は未抽出のファイルだけを抽出する
+        jobs (int): プロセス数（Noneの場合は config.EXTRACT_JOBS、それもNoneの場合はCPU数）
+        engine (str): 抽出エンジン（Noneの場合は設定値）
+        use_cache (bool): Falseの場合は抽出結果のキャッシュを使わない
+        verbose (bool): Trueの場合はファイルごとの抽出時の出力も表示する
+        fields (list): 出力する項目の名前（Noneの場合はすべて）
+        output_format (str): jsonの出力形式（'json' または 'ndjson'、Noneの場合は config.OUTPUT_FORMAT）
+        stream (bool): Trueの場合はツイート要素ごとに逐次パースする
+        max_tweets (int): ファイルごとに抽出するツイートの上限（Noneの場合は全件）
+        restrict (bool): Trueの場合はarticle要素の範囲だけをパースする
+        capture_raw_html (bool): Trueの場合は要素のバイトオフセットを 'raw_html_offset' に記録する
+
+    Returns:
+        bool: すべてのファイルで抽出できた場合はTrue
+    """
+    unknown = [name for name in fields or () if name not in TWEET_FIELDS]
+    if unknown:
+        print(f"エラー: 不明な項目: {', '.join(unknown)}（指定できる項目: {', '.join(TWEET_FIELDS)}）")
+        return False
+
+    since, until = to_yymmdd(since), to_yymmdd(until)
+    tasks = []
+    for keyword_type in keyword_types:
+        for date_str, html_file in find_html_files(keyword_type, since, until, pending_only):
+            tasks.append((keyword_type, date_str, html_file))
+
+    if not tasks:
+        print("抽出対象のHTMLファイルが見つかりませんでした")
+        return True
+
+    jobs = jobs or getattr(config, 'EXTRACT_JOBS', None) or os.cpu_count() or 1
+    jobs = min(jobs, len(tasks))
+    print(f"{len(tasks)} 件のHTMLファイルを {jobs} プロセスで抽出します")
+
+    # 抽出プランは親プロセスで決め、キャッシュに記録する
+    plan_cache = PlanCache(config.PLAN_CACHE_PATH)
+    plans = {html_file: plan_cache.plan_for(html_file) for _, _, html_file in tasks}
+    cache_dir = config.RESULT_CACHE_DIR if use_cache and getattr(config, 'RESULT_CACHE_ENABLED', True) else None
+    extract_options = {'stream': stream, 'max_tweets': max_tweets, 'restrict': restrict, 'capture_raw_html': capture_raw_html}
+
+    start_time = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_extract_file, keyword_type, date_str, html_file, engine, plans[html_file], cache_dir, fields, output_format, extract_options)
+            for keyword_type, date_str, html_file in tasks
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            plan_cache.record(plans[result['html_file']], result['stats'][1], result['stats'][0])
+            if verbose:
+                print(result['log'])
+            status = f"{result['tweets']} 件" if not result['error'] else f"失敗: {result['error']}"
+            print(f"[{i}/{len(tasks)}] {result['keyword_type']} {result['date']}: {status}（{result['seconds']:.1f}秒）")
+    plan_cache.save()
+
+    # 結果のまとめ
+    results.sort(key=lambda r: (r['keyword_type'], r['date']))
+    failed = [r for r in results if r['error']]
+    print("\n" + "=" * 50)
+    print("一括抽出の結果")
+    print("=" * 50)
+    for keyword_type in keyword_types:
+        type_results = [r for r in results if r['keyword_type'] == keyword_type]
+        if type_results:
+            print(f"{keyword_type}: {len(type_results)} ファイル, {sum(r['tweets'] for r in type_results)} 件のツイート")
+    print(f"合計: {len(results) - len(failed)}/{len(results)} ファイル成功, "
+          f"{sum(r['tweets'] for r in results)} 件のツイート（{time.time() - start_time:.1f}秒）")
+    for result in failed:
+        print(f"  失敗: {result['html_file']}: {result['error']}")
+    return not failed
@@ -14,11 +14,12 @@ import json
 import re
 from datetime import datetime
 import argparse
-from bs4 import BeautifulSoup
 
 # 設定ファイルをインポート
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.atomic_file import write_if_changed
+from src.detail_page import extract_focal_tweet_text
 
 def debug_print(message, verbose_flag=False):
     """デバッグメッセージを表示する
@@ -155,7 +156,10 @@ def copy_html_with_extension(extension_button_pos):
 
 
 def process_detail_pages(tweets_data, search_box_pos, extension_button_pos, date_str, keyword_type):
-    """「さらに表示」ボタンがあるツイートの詳細ページを処理"""
+    """「さらに表示」ボタンがあるツイートの詳細ページを処理
+
+    詳細ページの本文は extract_focal_tweet_text で本文要素の範囲だけをパースして取り出す
+    """
     complete_texts = {}
 
     # 「さらに表示」ボタンがあるツイートのみ処理
@@ -191,16 +195,9 @@ def process_detail_pages(tweets_data, search_box_pos, extension_button_pos, date
             html_content = copy_html_with_extension(extension_button_pos)
 
             if html_content:
-                # HTMLから完全なテキストを抽出
-                soup = BeautifulSoup(html_content, 'html.parser')
-                text_container = soup.select_one('[data-testid="tweetText"]')
-                if text_container:
-                    complete_text = text_container.get_text(separator='\n')
-                    complete_text = complete_text.replace('\r\n', '\n').replace('\r', '\n')
-                    complete_text = re.sub(r'[ \t]+\n', '\n', complete_text)
-                    complete_text = re.sub(r'\n{3,}', '\n\n', complete_text)
-                    complete_text = re.sub(r'[ \t]{2,}', ' ', complete_text)
-                    complete_text = re.sub(r' ?\n ?', '\n', complete_text).strip()
+                # HTMLから完全なテキストを抽出（フォーカスされたツイートの本文のみ）
+                complete_text = extract_focal_tweet_text(html_content)
+                if complete_text is not None:
                     print(f"詳細ページからテキスト取得完了（{len(complete_text)}文字）")
                     complete_texts[tweet_url] = complete_text
 
@@ -267,8 +264,8 @@ def save_detail_html_to_file(html_content, tweet_url, date_str, keyword_type='de
     filename = f"{yymmdd}_{tweet_id}.html"
     filepath = os.path.join(detail_dir, filename)
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # 一時ファイルに書き込んで置き換える（内容が同じ場合は書き換えない）
+    write_if_changed(filepath, html_content)
     return filepath
 
 def save_html_to_file(html_content, date_str, keyword_type='default', search_keyword=None):
@@ -308,8 +305,8 @@ def save_html_to_file(html_content, date_str, keyword_type='default', search_key
 
     filename = f"{yymmdd}.html"
     filepath = os.path.join(output_dir, filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # 一時ファイルに書き込んで置き換える（内容が同じ場合は書き換えない）
+    write_if_changed(filepath, html_content)
     return filepath
 
 def main(test_mode=False, date_str=None, search_keyword=None, use_date=True,
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+詳細ページ（会話ビュー）からの本文抽出
+詳細ページのHTMLから、フォーカスされたツイート（最初の [data-testid="tweetText"]）の
+本文だけを取り出す。文書全体ではなく本文要素の範囲だけをパースする。
+"""
+
+import re
+from bs4 import BeautifulSoup
+
+from src.tweet_selectors import SELECTORS
+
+# タグ内の属性部分（引用符で囲まれた > を許容する）
+_ATTRS = r'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+
+# 本文要素の data-testid 属性
+_TWEET_TEXT_ATTR_PATTERN = re.compile(r'''data-testid\s*=\s*(["']?)tweetText\1(?=[\s/>])''')
+# html.parser がタグとして扱わない範囲（コメント・script・style の中身）
+_HIDDEN_PATTERN = re.compile(r'<(?:!--.*?-->|(script|style)(?=[\s/>])' + _ATTRS + r'>.*?</\1\s*>)', re.S | re.I)
+_START_TAG_PATTERN = re.compile(r'<([a-zA-Z][a-zA-Z0-9-]*)(' + _ATTRS + r')>')
+# 本文要素の中身に含まれていると範囲を確実に求められない記述
+_UNSAFE_CONTENT_PATTERN = re.compile(r'<(?:script|style|textarea|title|[!?](?!--))', re.I)
+
+# 終了タグのない要素
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# 要素の終了位置を探すためのタグ名ごとの正規表現
+_ELEMENT_TAG_PATTERNS = {}
+
+# 空白の連続（改行・タブ・CRを含む）
+_WHITESPACE_RUN_PATTERN = re.compile(r'[ \t\r\n]+')
+
+def _normalize_whitespace_run(match):
+    """空白の連続1つ分を整形する（normalize_detail_text を参照）"""
+    run = match.group()
+    newlines = run.count('\n') + run.count('\r') - run.count('\r\n')
+    if not newlines:
+        # 2文字以上のスペース・タブは1つのスペースにする
+        return run if len(run) == 1 else ' '
+    # 改行前のスペース・タブは除き、連続する改行は2つまでにする。
+    # 最後の改行の後は、スペース1つまたは2文字以上を除く（タブ1つだけは残す）
+    tail = run[max(run.rfind('\n'), run.rfind('\r')) + 1:]
+    return '\n' * min(newlines, 2) + ('\t' if tail == '\t' else '')
+
+def normalize_detail_text(text):
+    """詳細ページの本文の空白を1回の走査で整形する
+
+    改行コードを \\n にそろえ、行末のスペース・タブを除き、3つ以上の改行を2つに、
+    2文字以上のスペース・タブを1つのスペースに、改行の前後のスペースを除く。
+    """
+    return _WHITESPACE_RUN_PATTERN.sub(_normalize_whitespace_run, text).strip()
+
+def _find_tweet_text_tag(html_content):
+    """最初の tweetText 要素の開始タグを探す
+
+    Returns:
+        re.Match: 開始タグ（group(1) がタグ名、group(2) が属性部分）。見つからない場合はNone
+    """
+    hidden_iter = _HIDDEN_PATTERN.finditer(html_content)
+    hidden = next(hidden_iter, None)
+    for match in _TWEET_TEXT_ATTR_PATTERN.finditer(html_content):
+        if not html_content[match.start() - 1:match.start()].isspace():
+            continue  # aria-data-testid などの別の属性
+        while hidden is not None and hidden.end() <= match.start():
+            hidden = next(hidden_iter, None)
+        if hidden is not None and hidden.start() < match.start():
+            continue  # コメント・script・style の中
+        tag_start = html_content.rfind('<', 0, match.start())
+        tag_match = _START_TAG_PATTERN.match(html_content, tag_start) if tag_start != -1 else None
+        if tag_match is None or tag_match.end() <= match.end():
+            continue  # タグの外（テキスト）
+        return tag_match
+    return None
+
+def _element_end(html_content, tag, start):
+    """start（開始タグの直後）から始まる要素の終了タグの終わりの位置を返す（見つからない場合はNone）"""
+    pattern = _ELEMENT_TAG_PATTERNS.get(tag)
+    if pattern is None:
+        pattern = re.compile(r'<(?:!--.*?-->|(/?)' + re.escape(tag) + r'(?=[\s/>])(' + _ATTRS + r')>)', re.S | re.I)
+        _ELEMENT_TAG_PATTERNS[tag] = pattern
+    depth = 1
+    for match in pattern.finditer(html_content, start):
+        closing = match.group(1)
+        if closing is None:
+            continue  # コメント
+        if closing:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+        elif not match.group(2).endswith('/'):
+            depth += 1
+    return None
+
+def _focal_tweet_text_markup(html_content):
+    """最初の tweetText 要素のHTMLを返す（範囲を確実に求められない場合はNone）"""
+    tag_match = _find_tweet_text_tag(html_content)
+    if tag_match is None:
+        return None
+    tag = tag_match.group(1).lower()
+    if tag in _VOID_TAGS or tag_match.group(2).endswith('/'):
+        return tag_match.group()
+    end = _element_end(html_content, tag, tag_match.end())
+    if end is None or _UNSAFE_CONTENT_PATTERN.search(html_content, tag_match.end(), end):
+        return None
+    return html_content[tag_match.start():end]
+
+def extract_focal_tweet_text(html_content):
+    """詳細ページのHTMLから、フォーカスされたツイートの本文を取り出す
+
+    最初の [data-testid="tweetText"] 要素の範囲を文字列検索で求め、その範囲だけをパースする。
+    範囲を確実に求められない崩れたマークアップでは、文書全体をパースする。
+
+    Args:
+        html_content (str): 詳細ページのHTML
+
+    Returns:
+        str: 整形した本文（本文要素がない場合はNone）
+    """
+    if 'tweetText' not in html_content:
+        return None
+    markup = _focal_tweet_text_markup(html_content)
+    if markup is not None:
+        text_container = BeautifulSoup(markup, 'html.parser')
+    else:
+        text_container = SELECTORS['tweet_text'].select_one(BeautifulSoup(html_content, 'html.parser'))
+        if text_container is None:
+            return None
+    return normalize_detail_text(text_container.get_text(separator='\n'))
@@ -1,49 +1,119 @@
 from bs4 import BeautifulSoup
-import json
-from datetime import datetime, timezone, timedelta
+from bs4.element import Tag, NavigableString, CData
+from datetime import datetime
 import re
 import argparse
 import sys
 import os
+import itertools
+import contextlib
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import pyperclip
 
 # 設定ファイルをインポート
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.tweet_selectors import SELECTORS, TWEET_SELECTOR_NAMES, merge_selector_stats, selector_stats
+from src.tweet_scanner import scan_tweet_articles
+from src.extraction_plan import PlanCache, TEXT_AUTO_SPANS, plan_for_file
+from src.result_cache import ResultCache
+from src.snowflake import snowflake_epoch_ms, status_id_from_url
+from src.tweet_time import normalize_iso_datetime
+from src.tweet_record import TWEET_FIELDS, Tweet
+from src.html_source import html_prefix, is_html_data, open_html_bytes, open_html_stream
+from src.tweet_writer import TweetWriter, format_tweet_text
+from src import tweet_store
+from src.tweet_metrics import COUNT_FIELDS, ENGAGEMENT_FIELDS, count_from_label, count_from_text, handle_from_text, is_media_url
+
+# 抽出エンジン（scan はDOMを構築しない高速パス、解析できない要素はBeautifulSoupで抽出）
+ENGINE_LXML = 'lxml'
+ENGINE_BS4 = 'bs4'
+ENGINE_SCAN = 'scan'
+ENGINES = (ENGINE_LXML, ENGINE_BS4, ENGINE_SCAN)
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# ツイート要素を探すセレクタ（優先順）
+TWEET_SELECTORS = [SELECTORS[name].css for name in TWEET_SELECTOR_NAMES]
+
+if LXML_AVAILABLE:
+    # lxml.htmlの要素クラスは使わず、素のetree要素でパースする（要素生成が速い）。
+    # バイト列はmetaタグの文字コード指定によらずUTF-8としてパースする
+    _LXML_PARSER = etree.HTMLParser(encoding='utf-8')
+    # text_content() と同じ結果を返すXPath
+    _LXML_STRING = etree.XPath('string()')
+    # 子孫のaタグのうち、status URL の候補となるhref（文書順）
+    _LXML_STATUS_HREFS = etree.XPath('.//a/@href[contains(., "status/")]')
+    # 一部の項目だけを抽出する場合に、ツイート要素を走査せずに集めるためのXPath
+    _LXML_HREFS = etree.XPath('.//a/@href', smart_strings=False)
+    _LXML_HTTP_HREFS = etree.XPath('.//a/@href[starts-with(., "http")]', smart_strings=False)
+    _LXML_FIRST_TWEET_TEXT = etree.XPath('(.//*[@data-testid="tweetText"])[1]')
+    _LXML_FIRST_TIME = etree.XPath('(.//time)[1]')
+
+def resolve_engine(engine=None):
+    """使用する抽出エンジンを決定する
 
-def extract_tweet_url(tweet_element):
-    """ツイート要素からツイートURLを抽出"""
-    # 複数の方法でURLを抽出を試みる
+    Args:
+        engine (str): 'lxml'、'bs4' または 'scan'（Noneの場合は config.EXTRACT_ENGINE）
 
+    Returns:
+        str: 実際に使用するエンジン名（lxmlが使えない場合は 'bs4'）
+    """
+    if engine is None:
+        engine = getattr(config, 'EXTRACT_ENGINE', ENGINE_LXML)
+    if engine not in ENGINES:
+        raise ValueError(f"不明な抽出エンジンです: {engine}（使用可能: {', '.join(ENGINES)}）")
+    if engine == ENGINE_LXML and not LXML_AVAILABLE:
+        print("警告: lxmlが利用できないため、BeautifulSoupで抽出します")
+        return ENGINE_BS4
+    return engine
+
+def _dom_engine(engine=None):
+    """DOMを構築して抽出する場合のエンジンを決定する（scan の場合は lxml）"""
+    engine = resolve_engine(engine)
+    if engine == ENGINE_SCAN:
+        return resolve_engine(ENGINE_LXML)
+    return engine
+
+def _to_full_url(href):
+    """status URL を判定し、完全なURLに変換する（対象外ならNone）"""
+    if href and ('/status/' in href or 'status/' in href):
+        # 相対URLの場合は絶対URLに変換
+        if href.startswith('/'):
+            return f"https://x.com{href}"
+        elif href.startswith('https://x.com/') or href.startswith('https://twitter.com/'):
+            return href
+    return None
+
+def _resolve_tweet_url(hrefs, time_link_hrefs):
+    """収集したリンクからツイートURLを決定する
+
+    Args:
+        hrefs (list): ツイート内の全リンクのhref（文書順）
+        time_link_hrefs (list): time要素の祖先（3レベルまで）にあるaタグのhref
+
+    Returns:
+        str: ツイートURL（見つからない場合は空文字）
+    """
     # 方法1: ツイート内のリンクからstatusを含むURLを探す
-    all_links = tweet_element.select('a[href]')
-    for link in all_links:
-        href = link.get('href', '')
-        if href and ('/status/' in href or 'status/' in href):
-            # 相対URLの場合は絶対URLに変換
-            if href.startswith('/'):
-                return f"https://x.com{href}"
-            elif href.startswith('https://x.com/') or href.startswith('https://twitter.com/'):
-                return href
+    for href in hrefs:
+        url = _to_full_url(href)
+        if url:
+            return url
 
     # 方法2: time要素の親からリンクを探す（タイムスタンプのリンク）
-    time_element = tweet_element.select_one('time')
-    if time_element:
-        # time要素の親を遡ってリンクを探す
-        parent = time_element.parent
-        for _ in range(3):  # 3レベルまで遡る
-            if parent and parent.name == 'a':
-                href = parent.get('href', '')
-                if href and ('/status/' in href or 'status/' in href):
-                    if href.startswith('/'):
-                        return f"https://x.com{href}"
-                    elif href.startswith('https://x.com/') or href.startswith('https://twitter.com/'):
-                        return href
-            parent = parent.parent if parent else None
+    for href in time_link_hrefs:
+        url = _to_full_url(href)
+        if url:
+            return url
 
     # 方法3: ツイート全体からstatusを含む最初のリンクを探す
-    for link in all_links:
-        href = link.get('href', '')
+    for href in hrefs:
         if href and 'status' in href:
             if href.startswith('/'):
                 return f"https://x.com{href}"
@@ -53,239 +123,1208 @@ def extract_tweet_url(tweet_element):
     # URLが見つからない場合
     return ""
 
-def extract_tweets_from_html(html_file_path):
-    """HTMLファイルからツイートデータを抽出"""
+def _time_link_hrefs(time_element, get_parent, get_tag):
+    """time要素の親を3レベルまで遡り、aタグのhrefを集める"""
+    hrefs = []
+    if time_element is None:
+        return hrefs
+    parent = get_parent(time_element)
+    for _ in range(3):  # 3レベルまで遡る
+        if parent is not None and get_tag(parent) == 'a':
+            hrefs.append(parent.get('href', ''))
+        parent = get_parent(parent) if parent is not None else None
+    return hrefs
 
-    # HTMLファイルを読み込み
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+def extract_tweet_url(tweet_element):
+    """ツイート要素からツイートURLを抽出"""
+    return _tweet_url_from_fields(_collect_article_fields(tweet_element))
 
-    # BeautifulSoupでパース
-    soup = BeautifulSoup(html_content, 'html.parser')
+def _tweet_url_from_fields(fields):
+    """収集済みフィールドからツイートURLを決定する"""
+    time_element = fields['time']
+    if LXML_AVAILABLE and isinstance(time_element, etree._Element):
+        time_link_hrefs = _time_link_hrefs(time_element, lambda e: e.getparent(), lambda e: e.tag)
+    else:
+        time_link_hrefs = _time_link_hrefs(time_element, lambda e: e.parent, lambda e: e.name)
+    return _resolve_tweet_url(fields['hrefs'], time_link_hrefs)
+
+# 走査イベントの種類（lxmlのiterwalkと同じ名前）
+_START, _END, _TEXT = 'start', 'end', 'text'
+
+# get_text() が対象とする文字列の型（コメント等は含めない）
+_BS4_TEXT_TYPES = (NavigableString, CData)
+
+def _iter_bs4_events(root):
+    """BeautifulSoupの要素を1回走査し、開始・終了・テキストイベントを返す"""
+    yield _START, root
+    stack = [(root, iter(root.contents))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if isinstance(child, Tag):
+                yield _START, child
+                stack.append((child, iter(child.contents)))
+                break
+            if type(child) in _BS4_TEXT_TYPES:
+                yield _TEXT, child
+        else:
+            stack.pop()
+            yield _END, node
 
-    tweets = []
+def _collect_article_fields(tweet_element, collect_auto_spans=True):
+    """ツイート要素を1回だけ走査し、抽出に必要な要素をまとめて集める
 
-    # ツイート要素を探す（初期の4つのみ）
-    tweet_selectors = [
-        'article[data-testid="tweet"]',
-        'div[data-testid="tweet"]',
-        'article',
-        'div[role="article"]'
-    ]
+    Args:
+        tweet_element: ツイート要素（lxmlまたはBeautifulSoupの要素）
+        collect_auto_spans (bool): 本文の代替用に span[dir="auto"] も集める場合はTrue
 
-    for selector in tweet_selectors:
-        tweet_elements = soup.select(selector)
-        if tweet_elements:
-            print(f"セレクタ '{selector}' で {len(tweet_elements)} 件のツイート要素を発見")
-            break
+    Returns:
+        dict: user_name, handle, text, links, tco_links, auto_spans, time, hrefs, has_show_more,
+            reply_count, retweet_count, like_count, media_urls
+    """
+    # lxmlはiterwalk（テキストは要素終了時にXPathで取得）、BeautifulSoupは独自の走査
+    is_lxml = LXML_AVAILABLE and isinstance(tweet_element, etree._Element)
+    if is_lxml:
+        events = etree.iterwalk(tweet_element, events=(_START, _END))
+    else:
+        events = _iter_bs4_events(tweet_element)
+
+    fields = {
+        'user_name': None,     # [data-testid="User-Name"] span のテキスト
+        'text': None,          # 最初の [data-testid="tweetText"] のテキスト
+        'links': [],           # tweetText内の a[href^="http"]
+        'tco_links': [],       # ツイート全体の a[href^="https://t.co/"]
+        'auto_spans': [],      # span[dir="auto"]（本文の代替用）
+        'time': None,          # 最初のtime要素
+        'hrefs': [],           # ツイート全体の a[href]
+        'has_show_more': False, # [data-testid="tweet-text-show-more-link"] の有無
+        'handle': None,        # [data-testid="User-Name"] 内で最初の @ から始まる span のテキスト
+        'reply_count': None,   # 最初の [data-testid="reply"] の件数
+        'retweet_count': None, # 最初の [data-testid="retweet"]（unretweet）の件数
+        'like_count': None,    # 最初の [data-testid="like"]（unlike）の件数
+        'media_urls': []       # img[src]・video[poster/src] のうち添付メディアのURL
+    }
+    # 反応数とメディアは、引用ツイートなど入れ子のツイート要素（article・[data-testid="tweet"]）の中から取らない
+    nested_depth = 0
+    engagement_count = 0
+    media_count = 0
+    user_name_depth = 0
+    user_span = None
+    user_parts = None
+    text_container = None
+    text_parts = None
+
+    for event, node in events:
+        if event == _TEXT:
+            if user_parts is not None:
+                user_parts.append(node)
+            if text_parts is not None:
+                text_parts.append(node)
+            continue
+        if node is tweet_element:
+            continue
 
-    if not tweet_elements:
-        print("ツイート要素が見つかりませんでした。HTMLの構造を確認します...")
-        # HTMLの構造を出力
-        print("HTMLの最初の1000文字:")
-        print(html_content[:1000])
-        return []
+        tag = node.tag if is_lxml else node.name
+        testid = node.get('data-testid')
+        if event == _START:
+            if tag == 'article' or testid == 'tweet':
+                nested_depth += 1
+            if tag == 'span':
+                if user_name_depth:
+                    if user_span is None:
+                        user_span = node
+                        user_parts = []
+                    if fields['handle'] is None:
+                        fields['handle'] = handle_from_text(str(_LXML_STRING(node)) if is_lxml else node.get_text())
+                if collect_auto_spans and node.get('dir') == 'auto':
+                    fields['auto_spans'].append(node)
+            elif tag == 'a':
+                href = node.get('href')
+                if href is not None:
+                    fields['hrefs'].append(href)
+                    if href.startswith('http') and text_parts is not None:
+                        fields['links'].append(href)
+                    if href.startswith('https://t.co/'):
+                        fields['tco_links'].append(href)
+            elif tag == 'time' and fields['time'] is None:
+                fields['time'] = node
+            elif (tag == 'img' or tag == 'video') and not nested_depth:
+                media_count += 1
+                for url in (node.get('src'),) if tag == 'img' else (node.get('poster'), node.get('src')):
+                    if is_media_url(url) and url not in fields['media_urls']:
+                        fields['media_urls'].append(url)
+
+            if testid in ENGAGEMENT_FIELDS and not nested_depth:
+                engagement_count += 1
+                name = ENGAGEMENT_FIELDS[testid]
+                if fields[name] is None:
+                    # aria-label に数値がない場合だけ表示テキストを読む
+                    count = count_from_label(node.get('aria-label'))
+                    if count is None:
+                        count = count_from_text(str(_LXML_STRING(node)) if is_lxml else node.get_text())
+                    fields[name] = count
+            elif testid == 'User-Name':
+                user_name_depth += 1
+            elif testid == 'tweetText' and text_container is None:
+                text_container = node
+                text_parts = []
+            elif testid == 'tweet-text-show-more-link':
+                fields['has_show_more'] = True
+        else:
+            if tag == 'article' or testid == 'tweet':
+                nested_depth -= 1
+            if testid == 'User-Name':
+                user_name_depth -= 1
+            if node is user_span:
+                fields['user_name'] = str(_LXML_STRING(node)) if is_lxml else ''.join(user_parts)
+                user_parts = None
+            if node is text_container:
+                fields['text'] = str(_LXML_STRING(node)) if is_lxml else ''.join(text_parts)
+                text_parts = None
+
+    # 走査で見つかった要素の数をセレクタごとに集計
+    SELECTORS['user_name'].record(0 if user_span is None else 1)
+    SELECTORS['tweet_text'].record(0 if text_container is None else 1)
+    SELECTORS['text_links'].record(len(fields['links']))
+    SELECTORS['tco_links'].record(len(fields['tco_links']))
+    if collect_auto_spans:
+        SELECTORS['auto_spans'].record(len(fields['auto_spans']))
+    SELECTORS['time'].record(0 if fields['time'] is None else 1)
+    SELECTORS['links'].record(len(fields['hrefs']))
+    SELECTORS['show_more'].record(1 if fields['has_show_more'] else 0)
+    SELECTORS['engagement'].record(engagement_count)
+    SELECTORS['media'].record(media_count)
+
+    return fields
+
+def _collect_lxml_link_fields(tweet_element):
+    """lxmlのツイート要素から、_WALKED_FIELDS・「さらに表示」・span[dir="auto"] 以外のフィールドを集める
+
+    _collect_article_fields と同じ値を、要素を1つずつ走査せずにXPathで求める。
+    _WALKED_FIELDS を出力しない項目の指定（fields）で抽出する場合に使う。
+    """
+    container = _LXML_FIRST_TWEET_TEXT(tweet_element)
+    container = container[0] if container else None
+    time_element = _LXML_FIRST_TIME(tweet_element)
+    hrefs = _LXML_HREFS(tweet_element)
+    fields = {
+        'user_name': None,
+        'text': str(_LXML_STRING(container)) if container is not None else None,
+        'links': _LXML_HTTP_HREFS(container) if container is not None else [],
+        'tco_links': [href for href in hrefs if href.startswith('https://t.co/')],
+        'auto_spans': [],
+        'time': time_element[0] if time_element else None,
+        'hrefs': hrefs,
+        'has_show_more': False,
+        'handle': None,
+        'reply_count': None,
+        'retweet_count': None,
+        'like_count': None,
+        'media_urls': []
+    }
+
+    SELECTORS['tweet_text'].record(0 if container is None else 1)
+    SELECTORS['text_links'].record(len(fields['links']))
+    SELECTORS['tco_links'].record(len(fields['tco_links']))
+    SELECTORS['time'].record(0 if fields['time'] is None else 1)
+    SELECTORS['links'].record(len(hrefs))
+
+    return fields
+
+def _build_text(text, links, tco_links):
+    """本文テキストに未掲載のリンクを追加し、空白を整理する"""
+    # すでに本文に含まれていないリンクのみ追加
+    all_links = []
+    for l in links + tco_links:
+        if l and l not in text and l not in all_links:
+            all_links.append(l)
+    if all_links:
+        text = text.strip() + ' ' + ' '.join(all_links)
+    # 改行を削除し、複数のスペースを1つに
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _unbuilt_text(text, links, tco_links):
+    """本文を出力しない場合に、_build_text の代わりに使う値（空かどうかは _build_text の結果と同じ）
+
+    本文が空白だけの場合は、_build_text が追加する最初のリンクを返す。整形は省く。
+    """
+    if text.strip():
+        return text
+    return (links or tco_links or [''])[0]
+
+def _pick_fallback_text(span_texts):
+    """テキスト要素がない場合に、span[dir="auto"] から本文らしいテキストを選ぶ"""
+    for text in span_texts:
+        text = re.sub(r'\s+', ' ', text).strip()
+        if len(text) > 10 and not text.startswith('@') and not text.startswith('#'):
+            return text
+    return ''
+
+# 制限付きパース用：コメント・生テキスト要素を読み飛ばしつつ article の開始/終了タグを探す
+# （先頭の '<' をくくり出しておくと、正規表現の検索が速い）
+_ARTICLE_TAG_PATTERN = re.compile(
+    r'''<(?:!--.*?-->'''
+    r'''|(script|style|textarea|title)\b(?:[^>"']|"[^"]*"|'[^']*')*>.*?</\1\s*>'''
+    r'''|(/?)article(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>)''',
+    re.S | re.I)
+# 並列パースの分割用（bytes版）
+_ARTICLE_TAG_BYTES_PATTERN = re.compile(_ARTICLE_TAG_PATTERN.pattern.encode('ascii'), re.S | re.I)
+
+def _iter_article_regions(html_content):
+    """一番外側のarticle要素の範囲 (開始, 終了) を文書順に返す（str・bytes・メモリマップのいずれも可）
+
+    閉じられていないarticle要素は文書の末尾までを範囲とする。
+    """
+    pattern = _ARTICLE_TAG_PATTERN if isinstance(html_content, str) else _ARTICLE_TAG_BYTES_PATTERN
+    depth = 0
+    start = 0
+    for match in pattern.finditer(html_content):
+        closing = match.group(2)
+        if closing is None:
+            continue  # コメント・script・style等
+        if closing:
+            if depth == 0:
+                continue  # 対応する開始タグのない終了タグ
+            depth -= 1
+            if depth == 0:
+                yield start, match.end()
+        else:
+            if depth == 0:
+                start = match.start()
+            depth += 1
+    if depth:
+        yield start, len(html_content)
+
+# time要素と、ツイートURLになるリンク（_to_full_url が変換できる a[href]）を探す（コメントは読み飛ばす）
+_TIME_OR_STATUS_LINK_PATTERN = re.compile(
+    r'''<(?:!--.*?-->|(time)(?=[\s/>])|(a)(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*?\shref\s*=\s*["']?(?:/|https://(?:x|twitter)\.com/)[^"'\s>]*status/)''',
+    re.S | re.I)
+_TIME_OR_STATUS_LINK_BYTES_PATTERN = re.compile(_TIME_OR_STATUS_LINK_PATTERN.pattern.encode('ascii'), re.S | re.I)
+
+def _region_needs_time_link_ancestors(html_content, start, end):
+    """start〜end のarticle要素が、time要素を持ちツイートURLになるリンクを持たないかどうか
+
+    その場合のツイートURLは time要素の親（ツイート要素の外を含む）のリンクで決まるため、
+    範囲だけをパースすると祖先の要素が失われる。
+    """
+    pattern = _TIME_OR_STATUS_LINK_PATTERN if isinstance(html_content, str) else _TIME_OR_STATUS_LINK_BYTES_PATTERN
+    has_time = False
+    for match in pattern.finditer(html_content, start, end):
+        if match.group(1) is not None:
+            has_time = True
+        elif match.group(2) is not None:
+            return False
+    return has_time
+
+def restrict_to_tweet_markup(html_content):
+    """HTMLから一番外側のarticle要素の範囲だけを取り出し、最小限の文書にする
+
+    ナビゲーション・SVG・style・サイドバーなどツイート以外のマークアップを
+    パーサーに渡さないことで、パース時間とツリーのメモリを削減する。
 
-    for i, tweet_element in enumerate(tweet_elements):
-        tweet_data = {
-            'id': i + 1,
-            'text': '',
-            'datetime': '',
-            'quote_url': '',
-            'user_name': '',
-            'raw_html': str(tweet_element)[:500]  # デバッグ用
-        }
+    Args:
+        html_content (str | bytes | mmap.mmap): HTML全体
+
+    ツイートURLを time要素の親（ツイート要素の外を含む）のリンクで決めるarticle要素がある場合は、
+    祖先の要素を残せないため取り出さない（文書全体をパースした場合と結果が変わらないようにする）。
 
+    Returns:
+        str | bytes: article要素だけを含むHTML（str の場合は str、それ以外は bytes）。
+            article要素がない場合、または祖先の要素が必要なarticle要素がある場合はNone
+    """
+    regions = list(_iter_article_regions(html_content))
+    if not regions or any(_region_needs_time_link_ancestors(html_content, start, end) for start, end in regions):
+        return None
+    parts = [html_content[start:end] for start, end in regions]
+    if isinstance(html_content, str):
+        return '<html><body>\n' + '\n'.join(parts) + '\n</body></html>'
+    return b'<html><body>\n' + b'\n'.join(parts) + b'\n</body></html>'
+
+def _parse_html(html_content, engine):
+    """HTMLをパースしてルート要素を返す（lxmlエンジンまたはBeautifulSoup）
+
+    バイト列・メモリマップはデコードせずにパーサーに渡す（UTF-8として解釈する）。
+    """
+    if engine == ENGINE_LXML:
         try:
-            # ユーザー名（表示名）を抽出
-            user_name_elem = tweet_element.select_one('[data-testid="User-Name"] span')
-            if user_name_elem:
-                tweet_data['user_name'] = user_name_elem.get_text().strip()
-
-            # ツイートテキストを抽出
-            text_elements = tweet_element.select('[data-testid="tweetText"]')
-            if text_elements:
-                # テキストを取得し、改行と余分なスペースを整理
-                text = text_elements[0].get_text()
-                # <a href="https://..."> のリンクも抽出してテキスト末尾に追加
-                link_tags = text_elements[0].select('a[href^="http"]')
-                links = [a.get('href') for a in link_tags if a.get('href')]
-                # ツイート要素全体からt.coリンクも抽出
-                tco_links = [a.get('href') for a in tweet_element.select('a[href^="https://t.co/"]') if a.get('href')]
-                # すでに本文に含まれていないリンクのみ追加
-                all_links = []
-                for l in links + tco_links:
-                    if l and l not in text and l not in all_links:
-                        all_links.append(l)
-                if all_links:
-                    text = text.strip() + ' ' + ' '.join(all_links)
-                # 改行を削除し、複数のスペースを1つに
-                text = re.sub(r'\s+', ' ', text).strip()
-                tweet_data['text'] = text
+            if isinstance(html_content, mmap.mmap):
+                # メモリマップは先頭から少しずつ読み込んでパースする（全体をbytesにコピーしない）
+                html_content.seek(0)
+                root = etree.parse(html_content, _LXML_PARSER).getroot()
             else:
-                # 代替方法：テキストを含む要素を探す
-                text_spans = tweet_element.select('span[dir="auto"]')
-                for span in text_spans:
-                    text = span.get_text()
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    if len(text) > 10 and not text.startswith('@') and not text.startswith('#'):
-                        tweet_data['text'] = text
-                        break
+                root = etree.fromstring(html_content, _LXML_PARSER)
+        except (etree.ParserError, etree.XMLSyntaxError, ValueError):
+            root = None
+        if root is not None:
+            return root
+        # 空のHTMLなど、lxmlでパースできない場合はBeautifulSoupで処理
+    # BeautifulSoupは内部でstrに変換するため、バイト列はコピーせずに直接デコードして渡す
+    return BeautifulSoup(html_content if isinstance(html_content, str) else str(html_content, 'utf-8'), 'html.parser')
+
+def _find_tweet_elements(html_content, engine, restrict=False, plan=None):
+    """HTMLをパースし、最初にマッチしたセレクタのツイート要素を返す
 
-            # 日時を抽出
-            time_elements = tweet_element.select('time')
-            if time_elements:
-                datetime_attr = time_elements[0].get('datetime')
-                if datetime_attr:
-                    # ISO形式の日時をJSTに変換
-                    try:
-                        # UTC時間としてパース
-                        dt = datetime.fromisoformat(datetime_attr.replace('Z', '+00:00'))
-                        # JSTに変換（UTC+9）
-                        jst = timezone(timedelta(hours=9))
-                        dt_jst = dt.astimezone(jst)
-                        tweet_data['datetime'] = dt_jst.strftime('%Y/%m/%d %H:%M:%S')
-                    except:
-                        tweet_data['datetime'] = datetime_attr
-
-            # ツイートURLを抽出（完全なURLに変換）
-            link_elements = tweet_element.select('a[href*="/status/"]')
-            for link in link_elements:
-                href = link.get('href')
-                if href and '/status/' in href:
-                    # 相対URLを完全なURLに変換
-                    if href.startswith('/'):
-                        tweet_data['quote_url'] = f"https://x.com{href}"
-                    elif href.startswith('http'):
-                        tweet_data['quote_url'] = href
-                    else:
-                        tweet_data['quote_url'] = f"https://x.com/{href}"
-                    break
-
-            # ツイートURLを抽出
-            tweet_data['quote_url'] = extract_tweet_url(tweet_element)
-
-            # 有効なツイートのみ追加（テキストが存在する場合）
-            if tweet_data['text']:
-                tweets.append(tweet_data)
-                print(f"ツイート {i+1}: {tweet_data['text'][:50]}... ユーザー: {tweet_data['user_name']}")
+    Args:
+        html_content (str | bytes | mmap.mmap): HTML全体
+        engine (str): 抽出エンジン
+        restrict (bool): Trueの場合はarticle要素の範囲だけをパースする。
+            article[data-testid="tweet"] が見つからない場合や、ツイートURLに祖先の要素が必要な場合は文書全体をパースする
+            （セレクタの優先順を文書全体のパースと同じに保つため）
+        plan (dict): 抽出プラン。指定した場合はプランのセレクタだけを評価する
+            （判定を誤ってマッチしない場合に限り、すべてのセレクタを順に試す）
+
+    Returns:
+        tuple: (セレクタ, ツイート要素のリスト)
+    """
+    if restrict and (plan is None or plan['container'] == TWEET_SELECTOR_NAMES[0]):
+        restricted = restrict_to_tweet_markup(html_content)
+        if restricted is not None:
+            selector, tweet_elements = _find_tweet_elements(restricted, engine, plan=plan)
+            if selector == TWEET_SELECTORS[0]:
+                return selector, tweet_elements
+
+    root = _parse_html(html_content, engine)
+
+    if plan is not None:
+        tweet_elements = SELECTORS[plan['container']].select(root)
+        if tweet_elements:
+            return SELECTORS[plan['container']].css, tweet_elements
+        print(f"警告: 抽出プラン {plan['variant']} のセレクタでツイート要素が見つからないため、すべてのセレクタを試します")
+
+    for name in TWEET_SELECTOR_NAMES:
+        tweet_elements = SELECTORS[name].select(root)
+        if tweet_elements:
+            return SELECTORS[name].css, tweet_elements
+    return None, []
+
+def _plan_for_selector(plan, selector):
+    """見つかったツイート要素のセレクタがプランと異なる場合（判定の誤り）はプランを使わない"""
+    if plan is not None and selector != SELECTORS[plan['container']].css:
+        return None
+    return plan
+
+# ツイート要素を走査して集める項目（出力しない場合は _collect_lxml_link_fields で集める）
+_WALKED_FIELDS = frozenset({'user_name', 'handle', 'media_urls', *COUNT_FIELDS})
+
+def _extract_tweet_data(tweet_element, index, check_show_more=False, plan=None, projection=None):
+    """ツイート要素から1件分のツイートデータを抽出する
+
+    Args:
+        tweet_element: ツイート要素（lxmlまたはBeautifulSoupの要素）
+        index (int): ツイート要素の通し番号（0始まり）
+        check_show_more (bool): 「さらに表示」ボタンの有無も記録する場合はTrue
+        plan (dict): 抽出プラン。tweetTextのある画面構成では span[dir="auto"] を走査中に集めず、
+            tweetText のないツイート要素（メディアのみ・引用のみなど）だけ改めて探す
+        projection (frozenset): 出力する項目（Noneの場合はすべて）。出力しない項目の処理は省く
+
+    Returns:
+        Tweet: ツイートデータ
+    """
+    use_auto_spans = _uses_auto_spans(plan)
+    if (projection is not None and projection.isdisjoint(_WALKED_FIELDS) and not (check_show_more and 'has_show_more' in projection)
+            and not use_auto_spans and LXML_AVAILABLE and isinstance(tweet_element, etree._Element)):
+        # ユーザー名・反応数などを出力しない場合は、要素を走査せずにXPathで集める
+        fields = _collect_lxml_link_fields(tweet_element)
+    else:
+        # ツイート要素を1回だけ走査して必要な要素を集める
+        fields = _collect_article_fields(tweet_element, collect_auto_spans=use_auto_spans)
+
+    # 代替方法：テキスト要素がない場合はテキストを含む要素を探す
+    fallback_text = ''
+    if fields['text'] is None:
+        auto_spans = fields['auto_spans'] if use_auto_spans else _find_auto_spans(tweet_element)
+        fallback_text = _pick_fallback_text(
+            str(_LXML_STRING(span)) if LXML_AVAILABLE and isinstance(span, etree._Element) else span.get_text()
+            for span in auto_spans)
+
+    time_element = fields['time']
+    datetime_attr = time_element.get('datetime') if time_element is not None else None
+
+    return _build_tweet_data(index, fields, datetime_attr, _tweet_url_from_fields(fields), fallback_text, check_show_more, projection)
+
+def _build_tweet_data(index, fields, datetime_attr, quote_url, fallback_text='', check_show_more=False, projection=None):
+    """収集済みフィールドから1件分のツイートデータを作る（DOM・高速パス共通）
+
+    projection を指定した場合は、出力しない項目の整形・変換を省く。本文（有効なツイートの判定）と
+    ツイートID（重複の除去）は常に設定し、出力しない項目は _project_tweet で除く。
+    """
+    tweet_data = Tweet()
+    tweet_data.id = index + 1
+
+    # ツイートテキスト（本文中のリンクとt.coリンクを末尾に追加）
+    if fields['text'] is None:
+        tweet_data.text = fallback_text
+    elif projection is None or 'text' in projection:
+        tweet_data.text = _build_text(fields['text'], fields['links'], fields['tco_links'])
+    else:
+        tweet_data.text = _unbuilt_text(fields['text'], fields['links'], fields['tco_links'])
+
+    # 日時（JSTの表示形式と、ツイートIDから復元できない場合の投稿時刻）
+    iso_epoch_ms = None
+    if projection is None or 'datetime' in projection or 'epoch_ms' in projection:
+        if datetime_attr:
+            tweet_data.datetime, iso_epoch_ms = normalize_iso_datetime(datetime_attr)
+        else:
+            tweet_data.datetime = ''
+
+    # ツイートURL
+    tweet_data.quote_url = quote_url
+
+    # ユーザー名（表示名）とハンドル
+    if projection is None or 'user_name' in projection:
+        tweet_data.user_name = fields['user_name'].strip() if fields['user_name'] is not None else ''
+    if projection is None or 'handle' in projection:
+        tweet_data.handle = fields['handle'] or ''
+
+    # 「さらに表示」ボタンの有無
+    if check_show_more:
+        tweet_data.has_show_more = fields['has_show_more']
+
+    # 返信・リポスト・いいねの件数（ボタンがない場合はNone）と添付メディアのURL
+    for name in COUNT_FIELDS:
+        if projection is None or name in projection:
+            setattr(tweet_data, name, fields[name])
+    if projection is None or 'media_urls' in projection:
+        tweet_data.media_urls = fields['media_urls']
+
+    # ツイートIDと投稿時刻（並べ替え・重複除去用の整数。IDから復元できない場合はtime要素の日時）
+    tweet_data.status_id = status_id_from_url(quote_url)
+    if projection is None or 'epoch_ms' in projection:
+        epoch_ms = snowflake_epoch_ms(tweet_data.status_id)
+        tweet_data.epoch_ms = epoch_ms if epoch_ms is not None else iso_epoch_ms
+
+    return tweet_data
+
+def _projection(fields, capture_raw_html=False):
+    """出力する項目の指定を検証し、_project_tweet に渡す集合にする（Noneの場合はすべての項目）
+
+    id は常に出力する。capture_raw_html の場合は raw_html_offset も出力する。
+
+    Raises:
+        ValueError: ツイートの項目にない名前を指定した場合
+    """
+    if fields is None:
+        return None
+    unknown = [name for name in fields if name not in TWEET_FIELDS]
+    if unknown:
+        raise ValueError(f"不明な項目: {', '.join(unknown)}（指定できる項目: {', '.join(TWEET_FIELDS)}）")
+    projection = set(fields) | {'id'}
+    if capture_raw_html:
+        projection.add('raw_html_offset')
+    return frozenset(projection)
+
+def _project_tweet(tweet_data, projection):
+    """出力しない項目をツイートデータから除く"""
+    if projection is not None:
+        for name in list(tweet_data):
+            if name not in projection:
+                delattr(tweet_data, name)
+    return tweet_data
+
+def _uses_auto_spans(plan):
+    """走査中に本文の代替用の span[dir="auto"] も集めるかどうか（プランがない場合は集める）"""
+    return plan is None or plan['text'] == TEXT_AUTO_SPANS
+
+def _find_auto_spans(tweet_element):
+    """tweetText のないツイート要素から、本文の代替用の span[dir="auto"] を探す（走査中に集めなかった場合）"""
+    if LXML_AVAILABLE and isinstance(tweet_element, etree._Element):
+        spans = [node for node in tweet_element.iter('span') if node.get('dir') == 'auto']
+    else:
+        spans = tweet_element.find_all('span', attrs={'dir': 'auto'})
+    SELECTORS['auto_spans'].record(len(spans))
+    return spans
+
+def _first_status_id(hrefs):
+    """リンクのhrefの列から、最初のstatus URLのツイートIDを返す（_resolve_tweet_url の方法1と同じ順）"""
+    for href in hrefs:
+        url = _to_full_url(href)
+        if url:
+            return status_id_from_url(url)
+    return None
+
+def _element_status_id(tweet_element):
+    """フィールドを集める前に、ツイート要素の最初のstatusリンクからツイートIDを求める"""
+    if LXML_AVAILABLE and isinstance(tweet_element, etree._Element):
+        return _first_status_id(_LXML_STATUS_HREFS(tweet_element))
+    anchors = (node for node in tweet_element.descendants if isinstance(node, Tag) and node.name == 'a')
+    return _first_status_id(anchor.get('href') for anchor in anchors)
+
+def _is_descendant(element, ancestor):
+    """element が ancestor の子孫要素かどうか"""
+    if LXML_AVAILABLE and isinstance(element, etree._Element):
+        parents = element.iterancestors()
+    else:
+        parents = element.parents
+    return any(parent is ancestor for parent in parents)
+
+class _SeenStatuses:
+    """1つのキャプチャで抽出済みのツイートIDを記録し、入れ子・重複のツイート要素を除く
+
+    ツイートIDは要素の最初のstatusリンクから求め、フィールドを集める前に判定する。
+    skip_nested がTrueの場合（代替セレクタ）は、先に見つかった要素の中の要素も除く。
+    """
+
+    def __init__(self, skip_nested=False):
+        self.status_ids = set()
+        self.skip_nested = skip_nested
+        self.skipped = 0
+        self._outer = None
+
+    def skip_status(self, status_id):
+        """抽出済みのツイートIDの場合はTrue（スキップ数に数える）"""
+        if status_id is not None and status_id in self.status_ids:
+            self.skipped += 1
+            return True
+        return False
+
+    def skip_element(self, tweet_element):
+        """DOMのツイート要素を抽出せずに除く場合はTrue"""
+        if self.skip_nested:
+            if self._outer is not None and _is_descendant(tweet_element, self._outer):
+                self.skipped += 1
+                return True
+            self._outer = tweet_element
+        return self.skip_status(_element_status_id(tweet_element))
+
+    def add(self, tweet_data):
+        """抽出したツイートのIDを記録する（抽出済みのツイートIDの場合はFalse）"""
+        status_id = tweet_data.status_id
+        if self.skip_status(status_id):
+            return False
+        if status_id is not None:
+            self.status_ids.add(status_id)
+        return True
+
+    def report(self):
+        """スキップした要素の数を表示する"""
+        if self.skipped:
+            print(f"入れ子・重複のため {self.skipped} 件のツイート要素をスキップしました")
+
+def _seen_statuses_for(selector):
+    """見つかったツイート要素のセレクタに応じた _SeenStatuses（代替セレクタでは入れ子の要素も除く）"""
+    return _SeenStatuses(skip_nested=selector != SELECTORS[TWEET_SELECTOR_NAMES[0]].css)
+
+def _needs_time_link_ancestors(fields):
+    """高速パスで集めたフィールドから、ツイートURLを time要素の親（ツイート要素の外を含む）のリンクで決める要素かどうかを返す"""
+    return fields['datetime'] is not None and not any(_to_full_url(href) for href in fields['hrefs'])
+
+def _scanned_tweet_data(fields, index, check_show_more=False, plan=None, projection=None):
+    """高速パスで集めたフィールドからツイートデータを作る（DOMで抽出すべき場合はNone）"""
+    if fields is None or fields['text'] is None:
+        return None  # 本文の代替（span[dir="auto"]）はDOMで探す
+    if _needs_time_link_ancestors(fields):
+        return None  # time要素の親（ツイート要素の外を含む）のリンクは文書全体のDOMで探す
+    quote_url = _resolve_tweet_url(fields['hrefs'], [])
+    return _build_tweet_data(index, fields, fields['datetime'], quote_url, check_show_more=check_show_more, projection=projection)
+
+def _scan_tweet_data(data, check_show_more=False, max_tweets=None, capture_raw_html=False, plan=None, base_offset=0, counts=None, seen=None, projection=None):
+    """HTMLのバイト列を高速パスで走査し、テキストのあるツイートデータを順に返す
+
+    高速パスで確実に解析できないツイート要素は、その要素を含む範囲だけを
+    BeautifulSoupでパースして抽出する。ツイートURLを time要素の親（ツイート要素の外を含む）の
+    リンクで決める要素は、祖先の要素も必要なため data 全体をパースして抽出する。
+
+    Args:
+        data (bytes): HTML（文書全体、または並列パースで分割した一部）
+        base_offset (int): data の先頭のファイル上のバイトオフセット（raw_html_offset 用）
+        counts (dict): 'elements'（ツイート要素数）, 'scanned', 'parsed' を加算する（省略可）
+        seen (_SeenStatuses): 抽出済みのツイートID（重複した要素を除く。省略可）
+        projection (frozenset): 出力する項目（Noneの場合はすべて）
+    """
+    if counts is None:
+        counts = {}
+    for key in ('elements', 'scanned', 'parsed'):
+        counts.setdefault(key, 0)
+    if seen is None:
+        seen = _SeenStatuses()
+    count = 0
+    document_elements = None
+    for region_start, region_end, articles in scan_tweet_articles(data):
+        region_elements = None
+        for position, (offset, fields) in enumerate(articles):
+            if max_tweets is not None and count >= max_tweets:
+                return
+            i = counts['elements']
+            counts['elements'] += 1
+            if fields is not None and seen.skip_status(_first_status_id(fields['hrefs'])):
+                continue
+            try:
+                tweet_data = _scanned_tweet_data(fields, i, check_show_more, plan, projection)
+                if tweet_data is None and (_needs_time_link_ancestors(fields) if fields is not None
+                                           else _region_needs_time_link_ancestors(data, region_start, region_end)):
+                    if document_elements is None:
+                        document_elements = _tweet_elements_by_offset(data)
+                    if offset in document_elements:
+                        tweet_data = _extract_tweet_data(document_elements[offset], i, check_show_more, plan, projection)
+                        counts['parsed'] += 1
+                if tweet_data is None:
+                    if region_elements is None:
+                        region = BeautifulSoup(data[region_start:region_end].decode('utf-8'), 'html.parser')
+                        region_elements = SELECTORS['tweet_article'].select(region)
+                    tweet_data = _extract_tweet_data(region_elements[position], i, check_show_more, plan, projection)
+                    counts['parsed'] += 1
+                else:
+                    counts['scanned'] += 1
+                if capture_raw_html:
+                    tweet_data.raw_html_offset = base_offset + offset
+            except Exception as e:
+                print(f"ツイート {i+1} の抽出でエラー: {e}")
+                continue
+
+            # 有効なツイートのみ返す（テキストが存在する場合）
+            if tweet_data.text and seen.add(tweet_data):
+                count += 1
+                yield _project_tweet(tweet_data, projection)
+
+def _tweet_elements_by_offset(data):
+    """data 全体をパースし、ソース上の開始タグのオフセット -> article[data-testid="tweet"] の要素 の辞書を返す
+
+    article要素の数がソースと一致しない場合（パーサーが要素を補完・除去した場合）は空の辞書を返す。
+    """
+    root = _parse_html(data, _dom_engine())
+    if LXML_AVAILABLE and isinstance(root, etree._Element):
+        articles = list(root.iter('article'))
+    else:
+        articles = root.find_all('article')
+    offsets = _start_tag_offsets(data, 'article')
+    if len(offsets) != len(articles):
+        return {}
+    offset_of = {id(article): offset for article, offset in zip(articles, offsets)}
+    return {offset_of[id(element)]: element for element in SELECTORS[TWEET_SELECTOR_NAMES[0]].select(root)}
+
+def _iter_scanned_tweet_data(html_file_path, check_show_more=False, max_tweets=None, capture_raw_html=False, plan=None, projection=None):
+    """DOMを構築しない高速パスで、テキストのあるツイートデータを順に返す
+
+    article[data-testid="tweet"] がない場合は文書全体をパースして従来のセレクタ順で抽出する。
+    """
+    counts = {}
+    seen = _SeenStatuses()
+    with open_html_bytes(html_file_path) as data:
+        yield from _scan_tweet_data(data, check_show_more, max_tweets, capture_raw_html, plan, counts=counts, seen=seen, projection=projection)
+    if counts['elements']:
+        print(f"高速パスで {counts['scanned']} 件、BeautifulSoupで {counts['parsed']} 件のツイート要素を抽出")
+        seen.report()
+        return
 
+    # 文書全体をパースして抽出
+    yield from _iter_dom_tweet_data(html_file_path, _dom_engine(), max_tweets, check_show_more, capture_raw_html=capture_raw_html, plan=plan, projection=projection)
+
+def verify_scan_extraction(html_file_path, engine=None, check_show_more=False):
+    """高速パスとDOMによる抽出を両方実行し、結果の違いを報告する
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        engine (str): 比較に使うDOMのエンジン（Noneまたは 'scan' の場合は lxml）
+        check_show_more (bool): 「さらに表示」ボタンの有無も比較する場合はTrue
+
+    Returns:
+        list: 違い（{'id', 'field', 'scan', 'dom'}）のリスト
+    """
+    with open_html_bytes(html_file_path) as data:
+        scanned_fields = [fields for _, _, articles in scan_tweet_articles(data) for _, fields in articles]
+        selector, tweet_elements = _find_tweet_elements(data, _dom_engine(engine))
+    if selector != TWEET_SELECTORS[0]:
+        tweet_elements = []
+
+    mismatches = []
+    if len(scanned_fields) != len(tweet_elements):
+        mismatches.append({'id': None, 'field': '件数', 'scan': len(scanned_fields), 'dom': len(tweet_elements)})
+
+    compared = 0
+    for i, (fields, tweet_element) in enumerate(zip(scanned_fields, tweet_elements)):
+        scan_data = _scanned_tweet_data(fields, i, check_show_more)
+        if scan_data is None:
+            continue  # 高速パスでは抽出しない要素
+        compared += 1
+        dom_data = _extract_tweet_data(tweet_element, i, check_show_more)
+        for key in dom_data:
+            if scan_data.get(key) != dom_data[key]:
+                mismatches.append({'id': i + 1, 'field': key, 'scan': scan_data.get(key), 'dom': dom_data[key]})
+
+    print(f"検証: {len(scanned_fields)} 件中 {compared} 件を高速パスとDOMで比較、不一致 {len(mismatches)} 件")
+    for mismatch in mismatches:
+        print(f"  ツイート {mismatch['id']} の {mismatch['field']}: 高速パス={mismatch['scan']!r} DOM={mismatch['dom']!r}")
+    return mismatches
+
+def _start_tag_offset_pattern(tag):
+    """指定したタグの開始タグを探す正規表現（bytes用、コメント・生テキスト要素は読み飛ばす）"""
+    return re.compile(
+        rb'''<!--.*?-->'''
+        rb'''|<(?:script|style|textarea|title)(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>.*?</(?:script|style|textarea|title)\s*>'''
+        rb'''|(<''' + re.escape(tag.encode('ascii')) + rb''')(?=[\s/>])''',
+        re.S | re.I)
+
+def scan_start_tag_offsets(html_file_path, tag):
+    """ソースファイル中の開始タグのバイトオフセットを文書順に返す
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        tag (str): タグ名（例: 'article'）
+
+    Returns:
+        list: 開始タグ '<' のバイトオフセット
+    """
+    with open_html_bytes(html_file_path) as data:
+        return _start_tag_offsets(data, tag)
+
+def _start_tag_offsets(data, tag, base_offset=0):
+    """バイト列中の開始タグのオフセット（base_offset を加えたもの）を文書順に返す"""
+    return [base_offset + match.start(1) for match in _start_tag_offset_pattern(tag).finditer(data) if match.group(1)]
+
+def _offset_at(offsets, ordinal):
+    """順番に対応するオフセットを返す（対応が取れない場合はNone）"""
+    if ordinal is None or ordinal >= len(offsets):
+        return None
+    return offsets[ordinal]
+
+def _raw_html_offset_finder(html_source, tweet_elements, offsets=None):
+    """ツイート要素 -> ソース上のバイトオフセット を返す関数を作る
+
+    同じタグ名の要素の文書内での順番と、ソース中の開始タグの順番を対応させる。
+    数が一致しない場合（パーサーが要素を補完・除去した場合）はオフセットを記録しない。
+    html_source はHTMLファイルのパスまたはHTMLの内容。offsets を指定した場合は走査せずにその開始タグのオフセットを使う。
+    """
+    if not tweet_elements:
+        return None
+    first = tweet_elements[0]
+    if LXML_AVAILABLE and isinstance(first, etree._Element):
+        tag = first.tag
+        same_tag_elements = list(first.getroottree().getroot().iter(tag))
+    else:
+        tag = first.name
+        root = first
+        while root.parent is not None:
+            root = root.parent
+        same_tag_elements = root.find_all(tag)
+
+    if offsets is None:
+        offsets = scan_start_tag_offsets(html_source, tag)
+    if len(offsets) != len(same_tag_elements):
+        print(f"警告: <{tag}> の数がソースと一致しないため、raw_htmlの位置を記録しません")
+        return lambda element: None
+    ordinals = {id(element): i for i, element in enumerate(same_tag_elements)}
+    return lambda element: _offset_at(offsets, ordinals.get(id(element)))
+
+def load_raw_html(html_file_path, tweet, length=500):
+    """記録したバイトオフセットから、ツイート要素のHTMLを必要な時だけ読み込む
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): 抽出元のHTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        tweet (dict): 'raw_html_offset' を含むツイートデータ
+        length (int): 読み込む文字数
+
+    Returns:
+        str: ツイート要素の先頭 length 文字（オフセットがない場合は空文字）
+    """
+    offset = tweet.get('raw_html_offset')
+    if offset is None:
+        return ''
+    # UTF-8は1文字最大4バイト
+    if is_html_data(html_file_path):
+        data = html_file_path[offset:offset + length * 4]
+    else:
+        with open(html_file_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length * 4)
+    return data.decode('utf-8', errors='ignore')[:length]
+
+def _iter_streamed_tweet_elements(html_file_path, ordinals=None):
+    """article[data-testid="tweet"] を終了タグのパース直後に1件ずつ返す（lxml専用）
+
+    処理済みの部分木は破棄するため、メモリ使用量は1件分のツイート要素の大きさで済む。
+    引用ツイートのように入れ子になったツイート要素は、外側の要素が閉じた時点で
+    文書順（外側 → 内側）に返す。
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        ordinals (dict): 指定した場合、id(要素) -> 全article要素中の順番 を記録する
+
+    Yields:
+        tuple: (通し番号, ツイート要素)
+    """
+    with open_html_stream(html_file_path) as f:
+        context = etree.iterparse(f, events=('start', 'end'), tag='article', html=True, encoding='utf-8')
+        open_count = 0   # 開いているツイート要素の数
+        pending = []     # 一番外側のツイート要素が閉じるまで保留する (通し番号, 要素)
+        index = 0
+        article_count = 0
+        try:
+            for event, element in context:
+                if event == 'start':
+                    article_count += 1
+                if element.get('data-testid') != 'tweet':
+                    continue
+                if event == 'start':
+                    if ordinals is not None:
+                        ordinals[id(element)] = article_count - 1
+                    pending.append((index, element))
+                    index += 1
+                    open_count += 1
+                    continue
+
+                open_count -= 1
+                if open_count:
+                    continue
+
+                # 一番外側のツイート要素が閉じたので、保留分をまとめて返す
+                yield from pending
+                pending = []
+
+                # 処理済みの部分木と、それより前の兄弟要素を破棄する
+                element.clear(keep_tail=True)
+                for node in itertools.chain([element], element.iterancestors()):
+                    while node.getprevious() is not None:
+                        del node.getparent()[0]
+        except etree.XMLSyntaxError as e:
+            if index:
+                print(f"警告: HTMLの逐次パースを途中で終了しました: {e}")
+
+def _iter_tweet_data(indexed_elements, check_show_more=False, max_tweets=None, raw_html_offset=None, plan=None, seen=None, projection=None):
+    """(通し番号, ツイート要素) の列から、テキストのあるツイートデータを順に返す
+
+    raw_html_offset を指定した場合は、要素 -> ソース上のバイトオフセット を返す関数として
+    'raw_html_offset' を記録する（load_raw_html で後から読み込む）。
+    入れ子・重複のツイート要素は seen（省略した場合はこの呼び出し内）で除き、スキップ数を表示する。
+    projection を指定した場合は、その項目だけを返す。
+    """
+    report = seen is None
+    if seen is None:
+        seen = _SeenStatuses()
+    count = 0
+    for i, tweet_element in indexed_elements:
+        if max_tweets is not None and count >= max_tweets:
+            break
+        if seen.skip_element(tweet_element):
+            continue
+        try:
+            tweet_data = _extract_tweet_data(tweet_element, i, check_show_more, plan, projection)
+            if raw_html_offset is not None:
+                tweet_data.raw_html_offset = raw_html_offset(tweet_element)
         except Exception as e:
             print(f"ツイート {i+1} の抽出でエラー: {e}")
             continue
 
-    return tweets
+        # 有効なツイートのみ返す（テキストが存在する場合）
+        if tweet_data.text and seen.add(tweet_data):
+            count += 1
+            yield _project_tweet(tweet_data, projection)
+    if report:
+        seen.report()
 
-def extract_tweets_from_html_with_detail_pages(html_file_path, search_box_pos=None, extension_button_pos=None, date_str=None, keyword_type='default'):
-    """HTMLファイルからツイートデータを抽出し、詳細ページ処理も実行する
+def iter_tweets_from_html(html_file_path, engine=None, max_tweets=None, check_show_more=False, restrict=False, capture_raw_html=False, plan=None, workers=None, fields=None):
+    """HTMLファイルからツイートデータを1件ずつ抽出するジェネレータ
+
+    lxmlエンジンでは article[data-testid="tweet"] の終了タグをパースした時点で
+    ツイートを返し、その部分木を破棄する。scanエンジンではDOMを構築せずに抽出する。
+    該当する要素がない画面構成やbs4エンジンでは、文書全体をパースしてプランのセレクタで抽出する。
 
     Args:
-        html_file_path (str): HTMLファイルのパス
-        search_box_pos (dict): 検索ボックスの位置情報（詳細ページ処理用）
-        extension_button_pos (dict): 拡張ボタンの位置情報（詳細ページ処理用）
-        date_str (str): 日付文字列（詳細ページ処理用）
-        keyword_type (str): キーワードタイプ（詳細ページ処理用）
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        engine (str): 抽出エンジン（'lxml'、'bs4' または 'scan'、Noneの場合は設定値）
+        max_tweets (int): 指定した件数を返した時点で終了する（Noneの場合は全件）
+        check_show_more (bool): 「さらに表示」ボタンの有無も記録する場合はTrue
+        restrict (bool): 文書全体をパースする場合に、article要素の範囲だけをパースする
+        capture_raw_html (bool): Trueの場合は要素のバイトオフセットを 'raw_html_offset' に記録する
+        plan (dict): 抽出プラン（Noneの場合はHTMLのマークアップを判定して決める）
+        workers (int): 2以上の場合は article要素の境界でHTMLを分割し、複数プロセスで並列にパースする
+            （article[data-testid="tweet"] の画面構成のみ。ファイルが小さい場合は分割しない）
+        fields (list): 出力する項目の名前（Noneの場合はすべて）。出力しない項目の整形・変換は省く
+
+    Yields:
+        Tweet: ツイートデータ
+    """
+    engine = resolve_engine(engine)
+    projection = _projection(fields, capture_raw_html)
+    if plan is None:
+        plan = plan_for_file(html_file_path)
+    if (workers or 1) > 1 and plan is not None and plan['container'] == TWEET_SELECTOR_NAMES[0]:
+        chunks = _split_article_chunks(html_file_path, workers * _CHUNKS_PER_WORKER)
+        if len(chunks) > 1:
+            yield from _iter_parallel_tweet_data(html_file_path, chunks, engine, workers, max_tweets, check_show_more, capture_raw_html, plan, projection)
+            return
+    if engine == ENGINE_SCAN:
+        if plan is None or (plan['container'] == TWEET_SELECTOR_NAMES[0] and not _uses_auto_spans(plan)):
+            yield from _iter_scanned_tweet_data(html_file_path, check_show_more, max_tweets, capture_raw_html, plan, projection)
+            return
+        # article[data-testid="tweet"] と tweetText のない画面構成はDOMで抽出する
+        engine = _dom_engine()
+    yield from _iter_dom_tweet_data(html_file_path, engine, max_tweets, check_show_more, restrict, capture_raw_html, plan, projection)
+
+def _iter_dom_tweet_data(html_file_path, engine, max_tweets=None, check_show_more=False, restrict=False, capture_raw_html=False, plan=None, projection=None):
+    """DOMを構築してツイートデータを1件ずつ返す（lxmlの逐次パースまたは文書全体のパース）"""
+    if engine == ENGINE_LXML and (plan is None or plan['container'] == TWEET_SELECTOR_NAMES[0]):
+        ordinals = {} if capture_raw_html else None
+        streamed = _iter_streamed_tweet_elements(html_file_path, ordinals)
+        first = next(streamed, None)
+        if first is not None:
+            raw_html_offset = None
+            if capture_raw_html:
+                offsets = scan_start_tag_offsets(html_file_path, 'article')
+                raw_html_offset = lambda element: _offset_at(offsets, ordinals.pop(id(element), None))
+            yield from _iter_tweet_data(itertools.chain([first], streamed), check_show_more, max_tweets, raw_html_offset, plan, projection=projection)
+            return
+
+    # 文書全体をパースして抽出
+    with open_html_bytes(html_file_path) as data:
+        selector, tweet_elements = _find_tweet_elements(data, engine, restrict, plan)
+        raw_html_offset = _raw_html_offset_finder(data, tweet_elements) if capture_raw_html else None
+    plan = _plan_for_selector(plan, selector)
+    seen = _seen_statuses_for(selector)
+    yield from _iter_tweet_data(enumerate(tweet_elements), check_show_more, max_tweets, raw_html_offset, plan, seen, projection)
+    seen.report()
+
+# 並列パース：プロセスあたりのチャンク数（処理時間のばらつきを均す）と、チャンクの最小サイズ
+_CHUNKS_PER_WORKER = 4
+_PARALLEL_MIN_CHUNK_BYTES = 1 << 20
+
+def _split_article_chunks(html_file_path, chunk_count):
+    """HTMLファイルを一番外側のarticle要素の境界で、バイト数がおよそ等しいチャンクに分ける
+
+    ツイートURLを time要素の親（ツイート要素の外を含む）のリンクで決めるarticle要素がある場合は、
+    チャンクに祖先の要素を含められないため分割しない（1プロセスで文書全体から抽出する）。
 
     Returns:
-        list: 統合されたツイートデータ
+        list: チャンクのファイル上の範囲 (開始, 終了)。各チャンクは1つ以上のarticle要素の範囲を含む
+    """
+    with open_html_bytes(html_file_path) as data:
+        regions = list(_iter_article_regions(data))
+        if any(_region_needs_time_link_ancestors(data, start, end) for start, end in regions):
+            return []
+    if not regions:
+        return []
+    chunk_size = max((regions[-1][1] - regions[0][0]) / chunk_count, _PARALLEL_MIN_CHUNK_BYTES)
+
+    chunks = []
+    chunk_start = None
+    for start, end in regions:
+        if chunk_start is None:
+            chunk_start = start
+        if end - chunk_start >= chunk_size:
+            chunks.append((chunk_start, end))
+            chunk_start = None
+    if chunk_start is not None:
+        chunks.append((chunk_start, regions[-1][1]))
+    return chunks
+
+def _extract_chunk(source, start, end, engine, check_show_more, capture_raw_html, plan, max_tweets=None, projection=None):
+    """チャンク1つ分のツイートデータを抽出する（ワーカープロセスで実行）
+
+    チャンク内のarticle要素の範囲だけをパースし、article[data-testid="tweet"] を抽出する。
+    id はチャンク内の通し番号で返し、呼び出し側で前のチャンクまでの要素数を加える。
+    source はHTMLファイルのパス（start〜end を読み込む）、またはチャンクの内容のバイト列。
+
+    Returns:
+        tuple: (チャンク内のツイート要素数, 入れ子・重複でスキップした要素数, ツイートデータのリスト, 抽出前後の selector_stats())
     """
-    # HTMLファイルを読み込み
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    stats_before = selector_stats()
+    if is_html_data(source):
+        data = source
+    else:
+        with open(source, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+    seen = _SeenStatuses()
+    if engine == ENGINE_SCAN and not _uses_auto_spans(plan):
+        counts = {}
+        tweets = list(_scan_tweet_data(data, check_show_more, max_tweets, capture_raw_html, plan, base_offset=start, counts=counts, seen=seen, projection=projection))
+        return counts['elements'], seen.skipped, tweets, (stats_before, selector_stats())
+
+    root = _parse_html(restrict_to_tweet_markup(data) or data, _dom_engine(engine))
+    tweet_elements = SELECTORS[TWEET_SELECTOR_NAMES[0]].select(root)
+    raw_html_offset = None
+    if capture_raw_html:
+        raw_html_offset = _raw_html_offset_finder(data, tweet_elements, _start_tag_offsets(data, 'article', start))
+    tweets = list(_iter_tweet_data(enumerate(tweet_elements), check_show_more, max_tweets, raw_html_offset, plan, seen, projection))
+    return len(tweet_elements), seen.skipped, tweets, (stats_before, selector_stats())
+
+def _iter_parallel_tweet_data(html_file_path, chunks, engine, workers, max_tweets=None, check_show_more=False, capture_raw_html=False, plan=None, projection=None):
+    """チャンクを複数プロセスでパースし、ツイートデータを文書順・通し番号の id で返す
+
+    チャンク内の重複はワーカーで除き、チャンクをまたぐ重複はここでツイートIDから除く。
+    HTMLの内容（バイト列・メモリマップ）を渡した場合は、ワーカーにはチャンクの内容だけを渡す。
+    """
+    print(f"{len(chunks)} 個のチャンクを {workers} プロセスで並列に抽出します")
+    count = 0
+    base_index = 0
+    seen = _SeenStatuses()
+    # チャンクをまたぐ重複の除去に使うため、ワーカーからはツイートIDも返す
+    chunk_projection = projection | {'status_id'} if projection is not None else None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_chunk, html_file_path[start:end] if is_html_data(html_file_path) else html_file_path, start, end, engine, check_show_more, capture_raw_html, plan, max_tweets, chunk_projection)
+            for start, end in chunks
+        ]
+        try:
+            for future in futures:
+                element_count, skipped, tweets, (stats_before, stats_after) = future.result()
+                merge_selector_stats(stats_after, stats_before)
+                seen.skipped += skipped
+                for tweet_data in tweets:
+                    if max_tweets is not None and count >= max_tweets:
+                        return
+                    if not seen.add(tweet_data):
+                        continue
+                    tweet_data.id += base_index
+                    count += 1
+                    yield _project_tweet(tweet_data, projection)
+                base_index += element_count
+            seen.report()
+        finally:
+            # 上限件数に達した場合などは、未着手のチャンクを取り消す
+            for future in futures:
+                future.cancel()
+
+def _extract_with_cache(cache, html_file_path, options, extract):
+    """cache に同じHTML・抽出処理・オプションの結果があれば返し、なければ extract() の結果を保存して返す"""
+    if cache is None:
+        return extract()
+    key = cache.key(html_file_path, **options)
+    tweets = cache.get(key)
+    if tweets is not None:
+        print(f"キャッシュから {len(tweets)} 件のツイートを読み込みました（HTMLと抽出処理に変更なし）")
+        return tweets
+    tweets = extract()
+    cache.put(key, tweets)
+    return tweets
 
-    # BeautifulSoupでパース
-    soup = BeautifulSoup(html_content, 'html.parser')
+def _print_extracted(tweet_data):
+    """抽出したツイートを1行で表示する（出力しない項目は空欄）"""
+    print(f"ツイート {tweet_data['id']}: {tweet_data.get('text', '')[:50]}... ユーザー: {tweet_data.get('user_name', '')}")
 
-    tweets = []
+def extract_tweets_from_html(html_file_path, engine=None, stream=False, max_tweets=None, restrict=False, capture_raw_html=False, plan=None, workers=None, cache=None, fields=None):
+    """HTMLファイルからツイートデータを抽出
 
-    # ツイート要素を探す
-    tweet_selectors = [
-        'article[data-testid="tweet"]',
-        'div[data-testid="tweet"]',
-        'article',
-        'div[role="article"]'
-    ]
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        engine (str): 抽出エンジン（'lxml'、'bs4' または 'scan'、Noneの場合は設定値）
+        stream (bool): Trueの場合はツイート要素ごとに逐次パースする（iter_tweets_from_html）
+        max_tweets (int): 抽出するツイートの上限（Noneの場合は全件）
+        restrict (bool): Trueの場合はarticle要素の範囲だけをパースする
+        capture_raw_html (bool): Trueの場合は要素のバイトオフセットを 'raw_html_offset' に記録する
+        plan (dict): 抽出プラン（Noneの場合はHTMLのマークアップを判定して決める）
+        workers (int): 2以上の場合は複数プロセスで並列にパースする（iter_tweets_from_html）
+        cache (ResultCache): 抽出結果のキャッシュ（HTMLと抽出処理が変わっていなければパースしない）
+        fields (list): 出力する項目の名前（Noneの場合はすべて）。出力しない項目の整形・変換は省く
 
-    for selector in tweet_selectors:
-        tweet_elements = soup.select(selector)
-        if tweet_elements:
-            print(f"セレクタ '{selector}' で {len(tweet_elements)} 件のツイート要素を発見")
-            break
+    Returns:
+        list: ツイートデータ（Tweet）
+    """
+    engine = resolve_engine(engine)
+    projection = _projection(fields, capture_raw_html)
+    if cache is not None:
+        options = {'engine': engine, 'check_show_more': False, 'max_tweets': max_tweets, 'capture_raw_html': capture_raw_html,
+                   'fields': sorted(projection) if projection is not None else None}
+        return _extract_with_cache(cache, html_file_path, options, lambda: extract_tweets_from_html(
+            html_file_path, engine, stream, max_tweets, restrict, capture_raw_html, plan, workers, fields=fields))
+    if plan is None:
+        plan = plan_for_file(html_file_path)
+    if stream or engine == ENGINE_SCAN or (workers or 1) > 1:
+        tweets = []
+        for tweet_data in iter_tweets_from_html(html_file_path, engine, max_tweets, restrict=restrict, capture_raw_html=capture_raw_html, plan=plan, workers=workers, fields=fields):
+            tweets.append(tweet_data)
+            _print_extracted(tweet_data)
+        if not tweets:
+            print("ツイート要素が見つかりませんでした。")
+        return tweets
+
+    # HTMLをバイト列のまま（パスの場合はメモリマップして）パースし、ツイート要素を探す
+    with open_html_bytes(html_file_path) as data:
+        selector, tweet_elements = _find_tweet_elements(data, engine, restrict, plan)
+        raw_html_offset = _raw_html_offset_finder(data, tweet_elements) if capture_raw_html else None
+    plan = _plan_for_selector(plan, selector)
 
     if not tweet_elements:
         print("ツイート要素が見つかりませんでした。HTMLの構造を確認します...")
+        # HTMLの構造を出力
+        print("HTMLの最初の1000文字:")
+        print(html_prefix(html_file_path))
         return []
 
-    for i, tweet_element in enumerate(tweet_elements):
-        tweet_data = {
-            'id': i + 1,
-            'text': '',
-            'datetime': '',
-            'quote_url': '',
-            'user_name': '',
-            'raw_html': str(tweet_element)[:500]
-        }
+    print(f"セレクタ '{selector}' で {len(tweet_elements)} 件のツイート要素を発見")
 
-        try:
-            # ユーザー名を抽出
-            user_name_elem = tweet_element.select_one('[data-testid="User-Name"] span')
-            if user_name_elem:
-                tweet_data['user_name'] = user_name_elem.get_text().strip()
-
-            # ツイートテキストを抽出
-            text_elements = tweet_element.select('[data-testid="tweetText"]')
-            if text_elements:
-                text = text_elements[0].get_text()
-                link_tags = text_elements[0].select('a[href^="http"]')
-                links = [a.get('href') for a in link_tags if a.get('href')]
-                tco_links = [a.get('href') for a in tweet_element.select('a[href^="https://t.co/"]') if a.get('href')]
-                all_links = []
-                for l in links + tco_links:
-                    if l and l not in text and l not in all_links:
-                        all_links.append(l)
-                if all_links:
-                    text = text.strip() + ' ' + ' '.join(all_links)
-                text = re.sub(r'\s+', ' ', text).strip()
-                tweet_data['text'] = text
-            else:
-                text_spans = tweet_element.select('span[dir="auto"]')
-                for span in text_spans:
-                    text = span.get_text()
-                    text = re.sub(r'\s+', ' ', text).strip()
-                    if len(text) > 10 and not text.startswith('@') and not text.startswith('#'):
-                        tweet_data['text'] = text
-                        break
+    tweets = []
+    seen = _seen_statuses_for(selector)
+    for tweet_data in _iter_tweet_data(enumerate(tweet_elements), max_tweets=max_tweets, raw_html_offset=raw_html_offset, plan=plan, seen=seen, projection=projection):
+        tweets.append(tweet_data)
+        _print_extracted(tweet_data)
+    seen.report()
 
-            # 日時を抽出
-            time_elements = tweet_element.select('time')
-            if time_elements:
-                datetime_attr = time_elements[0].get('datetime')
-                if datetime_attr:
-                    try:
-                        dt = datetime.fromisoformat(datetime_attr.replace('Z', '+00:00'))
-                        jst = timezone(timedelta(hours=9))
-                        dt_jst = dt.astimezone(jst)
-                        tweet_data['datetime'] = dt_jst.strftime('%Y/%m/%d %H:%M:%S')
-                    except:
-                        tweet_data['datetime'] = datetime_attr
-
-            # 「さらに表示」ボタンの有無をチェック
-            show_more_button = tweet_element.select_one('[data-testid="tweet-text-show-more-link"]')
-            tweet_data['has_show_more'] = show_more_button is not None
-
-            # ツイートURLを抽出
-            tweet_data['quote_url'] = extract_tweet_url(tweet_element)
-
-            if tweet_data['text']:
-                tweets.append(tweet_data)
+    return tweets
 
-        except Exception as e:
-            print(f"ツイート {i+1} の抽出でエラー: {e}")
-            continue
+# 詳細ページ処理（process_detail_pages）で使う項目
+_DETAIL_PAGE_FIELDS = frozenset({'text', 'quote_url', 'has_show_more'})
+
+def _iter_tweets_for_detail_pages(html_file_path, engine, stream=False, max_tweets=None, restrict=False, capture_raw_html=False, plan=None, workers=None, projection=None):
+    """詳細ページ処理の前の抽出（「さらに表示」ボタンの有無を含む）を行い、ツイートを1件ずつ返す"""
+    if plan is None:
+        plan = plan_for_file(html_file_path)
+    if stream or engine == ENGINE_SCAN or (workers or 1) > 1:
+        count = 0
+        for tweet_data in iter_tweets_from_html(html_file_path, engine, max_tweets, check_show_more=True, restrict=restrict, capture_raw_html=capture_raw_html, plan=plan, workers=workers, fields=projection):
+            count += 1
+            yield tweet_data
+        if not count:
+            print("ツイート要素が見つかりませんでした。")
+            return
+        print(f"{count} 件のツイートを{'逐次' if stream else ''}抽出しました")
+    else:
+        # HTMLをバイト列のまま（パスの場合はメモリマップして）パースし、ツイート要素を探す
+        with open_html_bytes(html_file_path) as data:
+            selector, tweet_elements = _find_tweet_elements(data, engine, restrict, plan)
+            raw_html_offset = _raw_html_offset_finder(data, tweet_elements) if capture_raw_html else None
+        plan = _plan_for_selector(plan, selector)
+
+        if not tweet_elements:
+            print("ツイート要素が見つかりませんでした。HTMLの構造を確認します...")
+            return
+
+        print(f"セレクタ '{selector}' で {len(tweet_elements)} 件のツイート要素を発見")
+        seen = _seen_statuses_for(selector)
+        yield from _iter_tweet_data(enumerate(tweet_elements), check_show_more=True, max_tweets=max_tweets, raw_html_offset=raw_html_offset, plan=plan, seen=seen, projection=projection)
+        seen.report()
+
+def _extract_tweets_for_detail_pages(html_file_path, engine, stream=False, max_tweets=None, restrict=False, capture_raw_html=False, plan=None, workers=None, projection=None):
+    """詳細ページ処理の前の抽出（「さらに表示」ボタンの有無を含む）を行う"""
+    return list(_iter_tweets_for_detail_pages(html_file_path, engine, stream, max_tweets, restrict, capture_raw_html, plan, workers, projection))
+
+def extract_tweets_from_html_with_detail_pages(html_file_path, search_box_pos=None, extension_button_pos=None, date_str=None, keyword_type='default', engine=None, stream=False, max_tweets=None, restrict=False, capture_raw_html=False, plan=None, workers=None, cache=None, fields=None):
+    """HTMLファイルからツイートデータを抽出し、詳細ページ処理も実行する
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+        search_box_pos (dict): 検索ボックスの位置情報（詳細ページ処理用）
+        extension_button_pos (dict): 拡張ボタンの位置情報（詳細ページ処理用）
+        date_str (str): 日付文字列（詳細ページ処理用）
+        keyword_type (str): キーワードタイプ（詳細ページ処理用）
+        engine (str): 抽出エンジン（'lxml'、'bs4' または 'scan'、Noneの場合は設定値）
+        stream (bool): Trueの場合はツイート要素ごとに逐次パースする（iter_tweets_from_html）
+        max_tweets (int): 抽出するツイートの上限（Noneの場合は全件）
+        restrict (bool): Trueの場合はarticle要素の範囲だけをパースする
+        capture_raw_html (bool): Trueの場合は要素のバイトオフセットを 'raw_html_offset' に記録する
+        plan (dict): 抽出プラン（Noneの場合はHTMLのマークアップを判定して決める）
+        workers (int): 2以上の場合は複数プロセスで並列にパースする（iter_tweets_from_html）
+        cache (ResultCache): 抽出結果のキャッシュ（詳細ページの結果を統合する前の抽出結果を保存する）
+        fields (list): 出力する項目の名前（Noneの場合はすべて）
+
+    Returns:
+        list: 統合されたツイートデータ
+    """
+    engine = resolve_engine(engine)
+    projection = _projection(fields, capture_raw_html)
+    detail_pages = bool(search_box_pos and extension_button_pos)
+    # 詳細ページ処理で使う項目は、出力しない場合も抽出し、統合した後で除く
+    extract_projection = projection | _DETAIL_PAGE_FIELDS if projection is not None and detail_pages else projection
+    options = {'engine': engine, 'check_show_more': True, 'max_tweets': max_tweets, 'capture_raw_html': capture_raw_html,
+               'fields': sorted(extract_projection) if extract_projection is not None else None}
+    tweets = _extract_with_cache(cache, html_file_path, options, lambda: _extract_tweets_for_detail_pages(
+        html_file_path, engine, stream, max_tweets, restrict, capture_raw_html, plan, workers, extract_projection))
+    if not tweets:
+        return []
 
     # 詳細ページ処理を実行（必要な情報が揃っている場合）
     complete_texts = {}
-    if search_box_pos and extension_button_pos:
+    if detail_pages:
         try:
             from src.create_twitter_html_all import process_detail_pages
             complete_texts = process_detail_pages(tweets, search_box_pos, extension_button_pos, date_str, keyword_type)
@@ -298,27 +1337,69 @@ def extract_tweets_from_html_with_detail_pages(html_file_path, search_box_pos=No
         if tweet_url and tweet_url in complete_texts:
             tweet['text'] = complete_texts[tweet_url]
             tweet['is_complete'] = True
+    if extract_projection is not projection:
+        for tweet in tweets:
+            _project_tweet(tweet, projection)
 
     return tweets
 
-def format_tweet_text(text):
-    """ツイートテキストをフォーマット（箇条書き対応）"""
-    # 箇条書き（・）を検出して改行を追加
-    lines = text.split(' ')
-    formatted_lines = []
+def iter_tweets_for_output(html_file_path, engine=None, stream=False, max_tweets=None, restrict=False, capture_raw_html=False, plan=None, workers=None, cache=None, fields=None):
+    """詳細ページ処理を行わない抽出を、ツイートを1件ずつ返すジェネレータとして行う（抽出しながら書き出す場合に使う）
 
-    for line in lines:
-        if line.startswith('・'):
-            # 箇条書きの場合は改行を追加
-            formatted_lines.append('\n' + line)
-        else:
-            formatted_lines.append(line)
+    extract_tweets_from_html_with_detail_pages と同じ結果を同じ順に返し、抽出結果のキャッシュも共有する。
+    キャッシュには最後まで抽出した場合だけ保存する。引数は extract_tweets_from_html_with_detail_pages と同じ。
 
-    return ' '.join(formatted_lines)
+    Yields:
+        Tweet: ツイートデータ
+    """
+    engine = resolve_engine(engine)
+    projection = _projection(fields, capture_raw_html)
+    key = None
+    if cache is not None:
+        key = cache.key(html_file_path, engine=engine, check_show_more=True, max_tweets=max_tweets, capture_raw_html=capture_raw_html,
+                        fields=sorted(projection) if projection is not None else None)
+        tweets = cache.get(key)
+        if tweets is not None:
+            print(f"キャッシュから {len(tweets)} 件のツイートを読み込みました（HTMLと抽出処理に変更なし）")
+            yield from tweets
+            return
 
-def save_tweets_to_files(tweets, base_filename="extracted_tweets", keyword_type=None):
-    """ツイートデータをファイルに保存"""
+    tweets = []
+    for tweet_data in _iter_tweets_for_detail_pages(html_file_path, engine, stream, max_tweets, restrict, capture_raw_html, plan, workers, projection):
+        tweets.append(tweet_data)
+        yield tweet_data
+    if key is not None:
+        cache.put(key, tweets)
+
+# 出力形式（json: 全件をまとめた整形済みのJSON、ndjson: 1行に1件のツイート）
+OUTPUT_JSON = 'json'
+OUTPUT_NDJSON = 'ndjson'
+OUTPUT_FORMATS = (OUTPUT_JSON, OUTPUT_NDJSON)
+
+def resolve_output_format(output_format=None):
+    """出力形式を決める（Noneの場合は config.OUTPUT_FORMAT）"""
+    output_format = output_format or getattr(config, 'OUTPUT_FORMAT', OUTPUT_JSON)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不明な出力形式: {output_format}（{', '.join(OUTPUT_FORMATS)} のいずれか）")
+    return output_format
+
+def open_tweet_writer(base_filename="extracted_tweets", keyword_type=None, output_format=None, stream=None):
+    """キーワードタイプの出力フォルダにtxt・json/ndjsonを書き出す TweetWriter を作る
+
+    Args:
+        base_filename (str): 出力ファイル名（拡張子なし）
+        keyword_type (str): キーワードタイプ（出力フォルダを決める）
+        output_format (str): 'json' または 'ndjson'（Noneの場合は config.OUTPUT_FORMAT）
+        stream: ndjson の書き出し先（標準出力など）。指定した場合はファイルに保存せず、1行ごとにフラッシュする
+
+    Returns:
+        TweetWriter: 書き出しスレッドを開始したライター
+    """
+    output_format = resolve_output_format(output_format)
+    if stream is not None:
+        return TweetWriter(ndjson=True, stream=stream)
 
+    json_ext = 'ndjson' if output_format == OUTPUT_NDJSON else 'json'
     # 出力先ディレクトリの設定
     if keyword_type in config.KEYWORD_PREFIX_MAPPING:
         prefix = config.KEYWORD_PREFIX_MAPPING[keyword_type]
@@ -334,45 +1415,40 @@ def save_tweets_to_files(tweets, base_filename="extracted_tweets", keyword_type=
 
             # 出力パスを設定
             txt_path = os.path.join(txt_output_folder, f"{base_filename}.txt")
-            json_path = os.path.join(json_output_folder, f"{base_filename}.json")
+            json_path = os.path.join(json_output_folder, f"{base_filename}.{json_ext}")
         else:
             # デフォルトの出力フォルダを使用
             folders = config.get_prefix_folders(None)  # デフォルトのフォルダを取得
             txt_path = os.path.join(folders['txt'], f"{base_filename}.txt")
-            json_path = os.path.join(folders['json'], f"{base_filename}.json")
+            json_path = os.path.join(folders['json'], f"{base_filename}.{json_ext}")
     else:
         # デフォルトの出力フォルダを使用
         folders = config.get_prefix_folders(None)  # デフォルトのフォルダを取得
         txt_path = os.path.join(folders['txt'], f"{base_filename}.txt")
-        json_path = os.path.join(folders['json'], f"{base_filename}.json")
+        json_path = os.path.join(folders['json'], f"{base_filename}.{json_ext}")
 
-    # テキストファイルに保存
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(f"抽出日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"抽出ツイート数: {len(tweets)}\n")
-        f.write("=" * 50 + "\n")
+    # 設定で有効にした場合は、SQLiteのストアにも保存する（キーワードタイプとツイートIDで更新または追加）
+    store_path = tweet_store.default_store_path() if tweet_store.store_enabled() else None
+    store_keyword_type = keyword_type if keyword_type in config.KEYWORD_PREFIX_MAPPING else 'default'
+    return TweetWriter(txt_path, json_path, ndjson=output_format == OUTPUT_NDJSON, indent=not getattr(config, 'JSON_COMPACT', False),
+                       store_path=store_path, keyword_type=store_keyword_type)
 
-        for tweet in tweets:
-            f.write(f"{tweet['id']}.\n")
-            if tweet['user_name']:
-                f.write(f"ユーザー名: {tweet['user_name']}\n")
-            if tweet['datetime']:
-                f.write(f"日時: {tweet['datetime']}\n")
-            if tweet['quote_url']:
-                f.write(f"ツイートURL: {tweet['quote_url']}\n")
-            # 箇条書きをフォーマット
-            formatted_text = format_tweet_text(tweet['text'])
-            f.write(f"{formatted_text}\n")
-            f.write("-" * 30 + "\n")
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump({
-            'extraction_time': datetime.now().isoformat(),
-            'tweet_count': len(tweets),
-            'tweets': tweets
-        }, f, ensure_ascii=False, indent=2)
-
-    print(f"結果を {txt_path} と {json_path} に保存しました。")
+def save_tweets_to_files(tweets, base_filename="extracted_tweets", keyword_type=None, output_format=None, stream=None):
+    """ツイートデータをファイルに保存
+
+    本文の整形とファイルへの書き込みは書き出しスレッドで行うため、tweets にジェネレータを渡すと抽出と並行して進む。
+    ツイートが1件もない場合は何も保存しない。
+
+    Args:
+        tweets (iterable): ツイートデータ
+        その他の引数は open_tweet_writer と同じ
+
+    Returns:
+        list: 保存したツイートデータ
+    """
+    with open_tweet_writer(base_filename, keyword_type, output_format, stream) as writer:
+        writer.write_all(tweets)
+    return writer.tweets
 
 def main():
     """メイン処理"""
@@ -387,8 +1463,41 @@ def main():
     parser.add_argument('--search-box-y', type=int, help='検索ボックスのY座標')
     parser.add_argument('--extension-button-x', type=int, help='拡張ボタンのX座標')
     parser.add_argument('--extension-button-y', type=int, help='拡張ボタンのY座標')
+    parser.add_argument('--engine', choices=ENGINES, help='抽出エンジン（デフォルト: config.EXTRACT_ENGINE）')
+    parser.add_argument('--stream', action='store_true', help='ツイート要素ごとに逐次パースしてメモリ使用量を抑える')
+    parser.add_argument('--max-tweets', type=int, help='指定した件数を抽出した時点で終了する')
+    parser.add_argument('--restrict-parse', action='store_true', help='article要素の範囲だけをパースする')
+    parser.add_argument('--capture-raw-html', action='store_true', help='ツイート要素のHTMLの位置（バイトオフセット）を記録する')
+    parser.add_argument('--verify-scan', action='store_true', help='高速パス（scan）とDOMの抽出結果を比較して違いを表示する')
+    parser.add_argument('--workers', type=int, default=getattr(config, 'EXTRACT_WORKERS', 1), help='大きなHTMLを分割して並列にパースするプロセス数（デフォルト: config.EXTRACT_WORKERS）')
+    parser.add_argument('--no-cache', action='store_true', help='抽出結果のキャッシュを使わずにHTMLをパースする')
+    parser.add_argument('--fields', help=f"出力する項目をカンマ区切りで指定し、それ以外の項目の処理を省く（{', '.join(TWEET_FIELDS)}。id は常に出力）")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help='jsonの出力形式（ndjson は1行に1件のツイートを抽出しながら書き出す。デフォルト: config.OUTPUT_FORMAT）')
+    parser.add_argument('--stdout', action='store_true', help='ツイートをNDJSONで標準出力に書き出す（ファイルには保存せず、メッセージは標準エラー出力に表示する）')
 
     args = parser.parse_args()
+    fields = None
+    if args.fields:
+        fields = [name.strip() for name in args.fields.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in TWEET_FIELDS]
+        if unknown:
+            parser.error(f"不明な項目: {', '.join(unknown)}")
+
+    if args.stdout:
+        # 標準出力にはNDJSONだけを書き出す
+        ndjson_stream = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                return _run_extract(args, fields, ndjson_stream)
+            except BrokenPipeError:
+                # 出力先（head など）が先に終了した場合は、残りを書き出さずに終了する
+                # （終了時のフラッシュでエラーにならないよう、標準出力を /dev/null に向ける）
+                os.dup2(os.open(os.devnull, os.O_WRONLY), ndjson_stream.fileno())
+                return True
+    return _run_extract(args, fields)
+
+def _run_extract(args, fields, ndjson_stream=None):
+    """コマンドライン引数に従って抽出・保存する（ndjson_stream を指定した場合はNDJSONをそこに書き出す）"""
     html_file = None
     prefix = None
 
@@ -501,27 +1610,65 @@ def main():
         print("マウス位置情報を指定するか、--enable-detail-extractionを無効にしてください")
         return False
 
+    # 高速パスの検証のみ行う場合
+    if args.verify_scan:
+        print(f"{html_file} で高速パスとDOMの抽出結果を比較しています...")
+        mismatches = verify_scan_extraction(html_file, engine=args.engine, check_show_more=True)
+        return not mismatches
+
     print(f"{html_file} からツイートを抽出しています...")
 
-    # 統合された抽出処理を実行（マウス位置情報を渡す）
-    tweets = extract_tweets_from_html_with_detail_pages(html_file, search_box_pos, extension_button_pos, output_filename, args.keyword_type)
+    # マークアップの種類に応じた抽出プランを決める（判定結果はキャッシュから再利用）
+    plan_cache = PlanCache(config.PLAN_CACHE_PATH)
+    plan = plan_cache.plan_for(html_file)
+    if args.verbose:
+        print(f"抽出プラン: {plan['variant'] if plan else 'なし（すべてのセレクタを試す）'}")
+    stats_before = selector_stats()
+
+    # HTMLと抽出処理が変わっていなければ、キャッシュした抽出結果を使う
+    result_cache = None
+    if getattr(config, 'RESULT_CACHE_ENABLED', True) and not args.no_cache:
+        result_cache = ResultCache(config.RESULT_CACHE_DIR)
+
+    # 本文の整形とtxt・jsonの書き込みは書き出しスレッドで行う
+    with open_tweet_writer(output_filename, args.keyword_type, args.format, stream=ndjson_stream) as writer:
+        if search_box_pos and extension_button_pos:
+            # 統合された抽出処理を実行（マウス位置情報を渡す）
+            writer.write_all(extract_tweets_from_html_with_detail_pages(html_file, search_box_pos, extension_button_pos, output_filename, args.keyword_type, engine=args.engine, stream=args.stream, max_tweets=args.max_tweets, restrict=args.restrict_parse, capture_raw_html=args.capture_raw_html, plan=plan, workers=args.workers, cache=result_cache, fields=fields))
+        else:
+            # 詳細ページ処理がなければ、抽出したツイートから順に書き出しスレッドに渡し、パースと並行して書き出す
+            writer.write_all(iter_tweets_for_output(html_file, engine=args.engine, stream=args.stream, max_tweets=args.max_tweets, restrict=args.restrict_parse, capture_raw_html=args.capture_raw_html, plan=plan, workers=args.workers, cache=result_cache, fields=fields))
+    tweets = writer.tweets
+
+    # プランごとのセレクタのマッチ数をキャッシュに記録
+    plan_cache.record(plan, selector_stats(), stats_before)
+    plan_cache.save()
 
     if tweets:
         print(f"\n抽出完了: {len(tweets)} 件のツイートを抽出しました")
 
-        # ツイートを抽出して保存
-        save_tweets_to_files(tweets, output_filename, args.keyword_type)
+        # セレクタごとのマッチ数を表示
+        if args.verbose:
+            print("\nセレクタの使用状況:")
+            for name, stats in selector_stats().items():
+                if stats['calls']:
+                    print(f"  {name} ({stats['css']}): 評価 {stats['calls']} 回, マッチ {stats['hits']} 件")
+            if plan:
+                hit_rates = plan_cache.hit_rates(plan['variant'])
+                print(f"\n抽出プラン {plan['variant']} の平均マッチ数（これまでの抽出）:")
+                for name, rate in hit_rates.items():
+                    print(f"  {name}: {rate:.2f} 件/回")
 
         # 結果を表示
         print("\n抽出されたツイート:")
         print("=" * 50)
-        for tweet in tweets:
+        for tweet, formatted_text in zip(tweets, writer.formatted_texts):
             print(f"{tweet['id']}.")
-            if tweet['user_name']:
+            if tweet.get('user_name'):
                 print(f"ユーザー名: {tweet['user_name']}")
-            if tweet['datetime']:
+            if tweet.get('datetime'):
                 print(f"日時: {tweet['datetime']}")
-            if tweet['quote_url']:
+            if tweet.get('quote_url'):
                 print(f"ツイートURL: {tweet['quote_url']}")
 
             # 「さらに表示」ボタンの情報を追加
@@ -529,7 +1676,7 @@ def main():
                 print("さらに表示ボタン: あり")
             if tweet.get('is_complete', False):
                 print("完全なテキスト: あり")
-            formatted_text = format_tweet_text(tweet['text'])
+            # 本文は書き出しスレッドで整形したものを使う
             print(f"{formatted_text}")
             print("-" * 30)
         # 最後のツイートの日時をuntil形式で表示
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+マークアップの種類に応じた抽出プラン
+HTMLを軽く走査して X の画面構成（ツイート要素・本文要素の書き方）の種類を判定し、
+その種類だけに対応したプランで抽出する。判定結果とセレクタのマッチ数はファイルにキャッシュする。
+"""
+
+import os
+import re
+
+from src import json_backend
+from src.atomic_file import write_if_changed
+from src.html_source import open_html_bytes
+from src.tweet_selectors import TWEET_SELECTOR_NAMES
+
+# 本文の取得元
+TEXT_TWEET_TEXT = 'tweetText'    # [data-testid="tweetText"]
+TEXT_AUTO_SPANS = 'auto_spans'   # span[dir="auto"]（tweetTextのない画面構成）
+
+# タグ内の属性部分（引用符で囲まれた > を許容する）
+_ATTRS = rb'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+
+# 判定に使うタグ：コメントと生テキスト要素（script など）は読み飛ばし（src/tweet_scanner.py と同じ）、
+# article要素と、data-testid="tweet…" か role="article" を持つ開始タグだけを group(2)〜(3) で返す
+_MARKUP_TAG_PATTERN = re.compile(
+    rb'<(?:!--.*?-->'
+    rb'|(script|style|textarea|title)(?=[\s/>])' + _ATTRS + rb'>.*?</\1\s*>'
+    rb'|([a-zA-Z][a-zA-Z0-9-]*)(?=[\s/>])(?:(?=[^>]*?\s(?:data-testid="tweet|role="article"))|(?<=article))(' + _ATTRS + rb')>)',
+    re.S | re.I)
+_TWEET_ATTR_PATTERN = re.compile(rb'\sdata-testid="tweet"')
+_TWEET_TEXT_ATTR_PATTERN = re.compile(rb'\sdata-testid="tweetText"')
+_ROLE_ARTICLE_ATTR_PATTERN = re.compile(rb'\srole="article"')
+
+# キャッシュの形式が変わった場合は値を上げる
+PLAN_CACHE_VERSION = 1
+
+def fingerprint_markup(html_file_path):
+    """HTMLファイルのマークアップの種類を判定する
+
+    ツイート要素のセレクタは TWEET_SELECTOR_NAMES の優先順で決める。
+    article[data-testid="tweet"] と tweetText が見つかった時点で読み込みを終える。
+    コメントと生テキスト要素（script・style など）の中の記述は数えない。
+
+    Args:
+        html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+
+    Returns:
+        str: 'セレクタ名/本文の取得元'（例: 'tweet_article/tweetText'）。ツイート要素がない場合はNone
+    """
+    found = set()
+    has_tweet_text = False
+    with open_html_bytes(html_file_path) as html:
+        for match in _MARKUP_TAG_PATTERN.finditer(html):
+            tag = match.group(2)
+            if tag is None:
+                continue  # コメント・生テキスト要素
+            tag = tag.lower()
+            attrs = match.group(3)
+            is_tweet = _TWEET_ATTR_PATTERN.search(attrs) is not None
+            if tag == b'article':
+                found.add('tweet_article' if is_tweet else 'article')
+            elif tag == b'div':
+                if is_tweet:
+                    found.add('tweet_div')
+                if _ROLE_ARTICLE_ATTR_PATTERN.search(attrs):
+                    found.add('role_article')
+            if not has_tweet_text and _TWEET_TEXT_ATTR_PATTERN.search(attrs):
+                has_tweet_text = True
+            if has_tweet_text and TWEET_SELECTOR_NAMES[0] in found:
+                break
+
+    for name in TWEET_SELECTOR_NAMES:
+        if name in found:
+            return f"{name}/{TEXT_TWEET_TEXT if has_tweet_text else TEXT_AUTO_SPANS}"
+    return None
+
+def plan_for_variant(variant):
+    """マークアップの種類から抽出プランを作る
+
+    Returns:
+        dict: variant（種類）, container（ツイート要素のセレクタ名）, text（本文の取得元）。
+            種類が不明な場合はNone（すべてのセレクタを順に試す）
+    """
+    if not variant:
+        return None
+    container, text = variant.split('/')
+    return {'variant': variant, 'container': container, 'text': text}
+
+def plan_for_file(html_file_path):
+    """HTMLファイル（またはHTMLのバイト列・メモリマップ）を判定して抽出プランを返す（キャッシュなし）"""
+    return plan_for_variant(fingerprint_markup(html_file_path))
+
+class PlanCache:
+    """ファイルごとの判定結果と、種類ごとのセレクタのマッチ数を保存するキャッシュ
+
+    ファイルの内容は変わらない前提で、パス・サイズ・更新日時が同じなら判定を省く。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'version': PLAN_CACHE_VERSION, 'files': {}, 'variants': {}}
+        try:
+            with open(path, 'rb') as f:
+                data = json_backend.load(f)
+            if data.get('version') == PLAN_CACHE_VERSION:
+                self.data = data
+        except (OSError, ValueError):
+            pass
+
+    def plan_for(self, html_file_path):
+        """HTMLファイルの抽出プランを返す（キャッシュがなければ判定して記録する）"""
+        key = os.path.abspath(html_file_path)
+        stat = os.stat(html_file_path)
+        entry = self.data['files'].get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return plan_for_variant(entry['variant'])
+
+        variant = fingerprint_markup(html_file_path)
+        self.data['files'][key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'variant': variant}
+        return plan_for_variant(variant)
+
+    def record(self, plan, stats_after, stats_before=None):
+        """抽出1回分のセレクタのマッチ数を、種類ごとの集計に加える
+
+        Args:
+            plan (dict): 抽出に使ったプラン
+            stats_after (dict): 抽出後の selector_stats()
+            stats_before (dict): 抽出前の selector_stats()（差分を記録する）
+        """
+        variant = plan['variant'] if plan else 'unknown'
+        entry = self.data['variants'].setdefault(variant, {'extractions': 0, 'selectors': {}})
+        entry['extractions'] += 1
+        for name, stats in stats_after.items():
+            before = (stats_before or {}).get(name, {'calls': 0, 'hits': 0})
+            calls = stats['calls'] - before['calls']
+            if not calls:
+                continue
+            total = entry['selectors'].setdefault(name, {'calls': 0, 'hits': 0})
+            total['calls'] += calls
+            total['hits'] += stats['hits'] - before['hits']
+
+    def hit_rates(self, variant):
+        """種類ごとの、セレクタの評価1回あたりのマッチ数を返す"""
+        selectors = self.data['variants'].get(variant, {}).get('selectors', {})
+        return {name: stats['hits'] / stats['calls'] for name, stats in selectors.items() if stats['calls']}
+
+    def save(self):
+        """キャッシュをファイルに保存する（一時ファイルから置き換えるため、並行して保存しても壊れない）"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            write_if_changed(self.path, json_backend.dumps_bytes(self.data, indent=True))
+        except OSError as e:
+            print(f"警告: 抽出プランのキャッシュを保存できませんでした: {e}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+抽出するHTMLの入力
+抽出処理には、HTMLファイルのパス・バイト列（bytes）・メモリマップ（mmap.mmap）のいずれかを渡せる。
+パスの場合はファイルを読み込まずにメモリマップする。文書全体をstrにデコードしたコピーは作らず、
+パーサーにはバイト列のまま渡して、抽出したフィールドだけをデコードする。
+"""
+
+import io
+import mmap
+from contextlib import contextmanager
+
+# パスではなくHTMLの内容として扱う型
+HTML_DATA_TYPES = (bytes, bytearray, mmap.mmap)
+
+def is_html_data(source):
+    """source がHTMLの内容（パスでない）かどうか"""
+    return isinstance(source, HTML_DATA_TYPES)
+
+@contextmanager
+def open_html_bytes(source):
+    """HTMLの入力を、バイト列と同じように検索・スライスできるオブジェクトとして開く
+
+    パスの場合は読み取り専用でメモリマップし、with を抜けると閉じる。
+    mmap の find/rfind は既定の開始位置がファイル位置になるため、範囲は常に指定すること。
+
+    Yields:
+        bytes | bytearray | mmap.mmap: HTMLの内容（空のファイルは b''）
+    """
+    if is_html_data(source):
+        yield source
+        return
+    with open(source, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''  # 空のファイルはメモリマップできない
+            return
+        with data:
+            yield data
+
+@contextmanager
+def open_html_stream(source):
+    """HTMLの入力を、先頭から読み込むファイルオブジェクトとして開く（逐次パース用）"""
+    if isinstance(source, mmap.mmap):
+        source.seek(0)
+        yield source
+    elif is_html_data(source):
+        yield io.BytesIO(source)
+    else:
+        with open(source, 'rb') as f:
+            yield f
+
+def html_prefix(source, length=1000):
+    """HTMLの先頭 length 文字を返す（診断表示用。途中で切れた文字は除く）"""
+    with open_html_bytes(source) as data:
+        return data[:length * 4].decode('utf-8', errors='ignore')[:length]  # UTF-8は1文字最大4バイト
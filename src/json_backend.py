@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+JSONの読み書き
+抽出・マージで読み書きするJSON（json・ndjson・抽出結果のキャッシュ・抽出プランのキャッシュ）は、
+インストールされている中で最も速いライブラリ（orjson、ujson、標準の json の順）で変換する。
+どのライブラリでも非ASCII文字はエスケープせずにUTF-8のまま書き出し、indent=False の場合は空白を入れない。
+"""
+
+import io
+import json
+import os
+import sys
+
+# 設定ファイルをインポート
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ujson
+    UJSON_AVAILABLE = True
+except ImportError:
+    UJSON_AVAILABLE = False
+
+BACKEND_ORJSON = 'orjson'
+BACKEND_UJSON = 'ujson'
+BACKEND_JSON = 'json'
+BACKENDS = (BACKEND_ORJSON, BACKEND_UJSON, BACKEND_JSON)
+
+_AVAILABLE = {BACKEND_ORJSON: ORJSON_AVAILABLE, BACKEND_UJSON: UJSON_AVAILABLE, BACKEND_JSON: True}
+
+def resolve_backend(backend=None):
+    """使用するライブラリを決める
+
+    Args:
+        backend (str): 'orjson'、'ujson' または 'json'（Noneの場合は config.JSON_BACKEND、それもNoneの場合は利用できる中で最も速いもの）
+
+    Returns:
+        str: 実際に使用するライブラリ名（指定したものが使えない場合は利用できる中で最も速いもの）
+    """
+    backend = backend or getattr(config, 'JSON_BACKEND', None)
+    if backend is not None:
+        if backend not in BACKENDS:
+            raise ValueError(f"不明なJSONライブラリ: {backend}（{', '.join(BACKENDS)} のいずれか）")
+        if _AVAILABLE[backend]:
+            return backend
+        print(f"警告: {backend}が利用できないため、他のライブラリでJSONを変換します")
+    return next(name for name in BACKENDS if _AVAILABLE[name])
+
+_backend = resolve_backend()
+
+def backend_name():
+    """使用しているライブラリ名を返す"""
+    return _backend
+
+def set_backend(backend=None):
+    """使用するライブラリを切り替える（引数は resolve_backend と同じ）。切り替えたライブラリ名を返す"""
+    global _backend
+    _backend = resolve_backend(backend)
+    return _backend
+
+def dumps_bytes(obj, indent=False, default=None):
+    """obj をUTF-8のJSONのバイト列にする
+
+    Args:
+        obj: 変換する値
+        indent (bool): Trueの場合は2文字の字下げで整形する（Falseの場合は空白を入れない）
+        default (callable): 変換できない値を変換する関数（json.dump の default と同じ）
+    """
+    if _backend == BACKEND_ORJSON:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_INDENT_2 if indent else 0)
+    return dumps(obj, indent, default).encode('utf-8')
+
+def dumps(obj, indent=False, default=None):
+    """obj をJSONの文字列にする（引数は dumps_bytes と同じ）"""
+    if _backend == BACKEND_ORJSON:
+        return dumps_bytes(obj, indent, default).decode('utf-8')
+    if _backend == BACKEND_UJSON:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=2 if indent else 0, default=default)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default)
+
+def dump(obj, f, indent=False, default=None):
+    """obj をJSONとしてファイルに書き出す（f がバイナリモードの場合はバイト列を書き出す）"""
+    if isinstance(f, io.TextIOBase):
+        f.write(dumps(obj, indent, default))
+    else:
+        f.write(dumps_bytes(obj, indent, default))
+
+def loads(data):
+    """JSONの文字列またはバイト列を読み込む（不正なJSONの場合はValueError）"""
+    if _backend == BACKEND_ORJSON:
+        return orjson.loads(data)
+    if _backend == BACKEND_UJSON:
+        return ujson.loads(data)
+    return json.loads(data)
+
+def load(f):
+    """ファイル（テキスト・バイナリのどちらのモードでもよい）からJSONを読み込む"""
+    return loads(f.read())
@@ -3,44 +3,90 @@ import re
 import os
 import glob
 import sys
-from datetime import datetime
 
 # 設定ファイルをインポート
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src import json_backend, tweet_store
+from src.atomic_file import AtomicFile
+from src.snowflake import snowflake_epoch_ms, status_id_from_url, tweet_sort_key
+from src.tweet_time import display_datetime_epoch_ms
+from src.tweet_record import TWEET_FIELDS, Tweet
+from src.tweet_metrics import COUNT_FIELDS, format_reactions, handle_from_text, is_media_url, parse_reactions
+
+# txtの1項目で本文より前に書き出す見出しの行（tweet_writer.format_txt_entry が書き出す順）
+_HEADER_PREFIXES = ('ユーザー名: ', 'ハンドル: ', '日時: ', 'ツイートURL: ', '反応: ', 'メディア: ')
+
+def _header_prefix(line, tweet, header_position):
+    """ハンドル・反応数・メディアの見出しの行であれば、その見出しを返す（そうでなければNone）
+
+    本文がこれらの見出しで始まる場合に本文を読み落とさないよう、本文より前で、
+    前の見出しの行より後に書き出す位置にあり、値が書き出す表記どおりの行だけを見出しとする。
+    """
+    if 'text' in tweet:
+        return None
+    for position, prefix in enumerate(_HEADER_PREFIXES):
+        if position > header_position and line.startswith(prefix):
+            value = line[len(prefix):]
+            if prefix == 'ハンドル: ':
+                valid = handle_from_text(value) == value
+            elif prefix == '反応: ':
+                valid = bool(value) and format_reactions(parse_reactions(value)) == value
+            elif prefix == 'メディア: ':
+                valid = bool(value) and all(is_media_url(url) for url in value.split())
+            else:
+                return None
+            return prefix if valid else None
+    return None
 
 def parse_txt_to_tweets(txt_file_path):
     """txtファイルを解析してツイートデータを抽出"""
 
     tweets = []
-    current_tweet = {}
+    current_tweet = Tweet()
+    # 現在のツイートで最後に読んだ見出しの行の位置（_HEADER_PREFIXES の添字）
+    header_position = -1
 
     with open(txt_file_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
     for line in lines:
         line = line.strip()
+        header = _header_prefix(line, current_tweet, header_position)
 
         # ユーザー名の行を検出
         if line.startswith('ユーザー名: '):
             user_name = line.replace('ユーザー名: ', '')
             current_tweet['user_name'] = user_name
+            header_position = _HEADER_PREFIXES.index('ユーザー名: ')
+
+        # ハンドルの行を検出（本文より前の行のみ）
+        elif header == 'ハンドル: ':
+            current_tweet['handle'] = line[len(header):]
+            header_position = _HEADER_PREFIXES.index(header)
 
         # 日時の行を検出
         elif line.startswith('日時: '):
             datetime_str = line.replace('日時: ', '')
             current_tweet['datetime'] = datetime_str
-            # 日時をパースしてソート用のタイムスタンプを作成
-            try:
-                dt = datetime.strptime(datetime_str, '%Y/%m/%d %H:%M:%S')
-                current_tweet['timestamp'] = dt
-            except:
-                current_tweet['timestamp'] = datetime.min
+            header_position = _HEADER_PREFIXES.index('日時: ')
 
         # URLの行を検出
         elif line.startswith('ツイートURL: '):
             url = line.replace('ツイートURL: ', '')
             current_tweet['url'] = url
+            # ツイートIDと、IDから復元した投稿時刻（並べ替え・重複除去用）
+            current_tweet['status_id'] = status_id_from_url(url)
+            current_tweet['epoch_ms'] = snowflake_epoch_ms(current_tweet['status_id'])
+            header_position = _HEADER_PREFIXES.index('ツイートURL: ')
+
+        # 反応数・添付メディアの行を検出（本文より前の行のみ）
+        elif header == '反応: ':
+            current_tweet.update(parse_reactions(line[len(header):]))
+            header_position = _HEADER_PREFIXES.index(header)
+        elif header == 'メディア: ':
+            current_tweet['media_urls'] = line[len(header):].split()
+            header_position = _HEADER_PREFIXES.index(header)
 
         # ツイート内容の行を検出（日時、URL、区切り線以外の行）
         elif (line and
@@ -63,21 +109,73 @@ def parse_txt_to_tweets(txt_file_path):
             if current_tweet and 'text' in current_tweet:
                 # ファイル名を追加
                 current_tweet['source_file'] = os.path.basename(txt_file_path)
-                tweets.append(current_tweet.copy())
-            current_tweet = {}
+                tweets.append(_with_sort_fields(current_tweet))
+            current_tweet = Tweet()
+            header_position = -1
 
     # 最後のツイートも追加
     if current_tweet and 'text' in current_tweet:
         current_tweet['source_file'] = os.path.basename(txt_file_path)
-        tweets.append(current_tweet)
+        tweets.append(_with_sort_fields(current_tweet))
 
     return tweets
 
-def merge_all_txt_to_csv(keyword_type='default'):
-    """指定されたキーワードタイプのtxtファイルをマージしてCSVファイルを作成"""
+def parse_ndjson_to_tweets(ndjson_file_path):
+    """ndjsonファイル（1行に1件のツイート）を1行ずつ読み込んでツイートデータを抽出
 
-    all_tweets = []
-    processed_files = []
+    txtと同じく、本文のないツイートは除く。抽出時のツイートURL（quote_url）をCSVのURLにする。
+    """
+
+    tweets = []
+    source_file = os.path.basename(ndjson_file_path)
+    with open(ndjson_file_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            tweet = Tweet({name: value for name, value in json_backend.loads(line).items() if name in TWEET_FIELDS})
+            if not tweet.get('text'):
+                continue
+            url = tweet.get('quote_url')
+            if url:
+                tweet['url'] = url
+                if tweet.get('status_id') is None:
+                    tweet['status_id'] = status_id_from_url(url)
+                    tweet['epoch_ms'] = snowflake_epoch_ms(tweet['status_id'])
+            tweet['source_file'] = source_file
+            tweets.append(_with_sort_fields(tweet))
+
+    return tweets
+
+def _with_sort_fields(tweet):
+    """ツイートIDと投稿時刻を設定する（IDから時刻を復元できない場合のみ日時の文字列を解析）"""
+    tweet.setdefault('status_id', None)
+    if tweet.get('epoch_ms') is None:
+        tweet['epoch_ms'] = display_datetime_epoch_ms(tweet.get('datetime'))
+    return tweet
+
+def dedupe_tweets(tweets):
+    """ツイートIDが同じツイートを除く（最初に出現したものを残す。IDのないツイートは除かない）
+
+    Returns:
+        tuple: (重複を除いたツイートのリスト, 除いた件数)
+    """
+    seen = set()
+    unique = []
+    for tweet in tweets:
+        status_id = tweet.get('status_id')
+        if status_id is not None:
+            if status_id in seen:
+                continue
+            seen.add(status_id)
+        unique.append(tweet)
+    return unique, len(tweets) - len(unique)
+
+def merge_all_txt_to_csv(keyword_type='default', from_store=False):
+    """指定されたキーワードタイプのtxtファイルをマージしてCSVファイルを作成
+
+    同じ日付のndjsonファイル（extract --format ndjson）がある場合は、txtの代わりにそれを読み込む。
+    from_store がTrueの場合は、ファイルを読み込まずにSQLiteのストア（config.TWEET_STORE_PATH）から作成する。
+    """
 
     # キーワードタイプの検証
     if keyword_type not in config.KEYWORD_PREFIX_MAPPING:
@@ -85,31 +183,71 @@ def merge_all_txt_to_csv(keyword_type='default'):
         print(f"使用可能なキーワードタイプ: {', '.join(config.KEYWORD_PREFIX_MAPPING.keys())}")
         return
 
-    # 指定されたキーワードタイプのフォルダからtxtファイルを取得
+    # 指定されたキーワードタイプのフォルダを取得
     prefix = config.KEYWORD_PREFIX_MAPPING.get(keyword_type)
     folders = config.get_prefix_folders(prefix)
+    duplicates = 0
+
+    if from_store:
+        # ストアはキーワードタイプとツイートIDで重複なく保存しており、投稿時刻の順に読み込める
+        store_path = tweet_store.default_store_path()
+        if not os.path.exists(store_path):
+            print(f"ストアが見つかりません: {store_path}")
+            print("config.TWEET_STORE_ENABLED を True にして抽出すると作成されます。")
+            return
+        print(f"{keyword_type}のツイートをストア {store_path} から読み込みます")
+        all_tweets = list(tweet_store.iter_tweets(keyword_type, path=store_path))
+        if not all_tweets:
+            print(f"ストアに{keyword_type}のツイートがありません。")
+            return
+    else:
+        all_tweets, processed_files, duplicates = _read_output_files(keyword_type, folders)
+        if not processed_files:
+            return
+
+    _write_csv(keyword_type, folders, all_tweets)
+    print(f"総ツイート数: {len(all_tweets)}")
+    if duplicates:
+        print(f"重複を除いたツイート数: {duplicates}")
+    if not from_store:
+        print(f"処理したファイル数: {len(processed_files)}")
+
+def _read_output_files(keyword_type, folders):
+    """キーワードタイプのtxt（またはndjson）ファイルを読み込み、重複を除いて投稿時刻の順に並べる
+
+    Returns:
+        tuple: (ツイートのリスト, 読み込んだtxtファイルのリスト, 除いた重複の件数)
+    """
+    all_tweets = []
+    processed_files = []
     txt_folder = folders['txt']
-    txt_files = glob.glob(os.path.join(txt_folder, "*.txt"))
+    # 指定されたキーワードタイプのフォルダからtxtファイルを取得
+    txt_files = sorted(glob.glob(os.path.join(txt_folder, "*.txt")))
 
     if txt_files:
         print(f"{keyword_type}フォルダから {len(txt_files)} ファイルを処理:")
         for txt_file in txt_files:
-            print(f"  処理中: {os.path.basename(txt_file)}")
-            tweets = parse_txt_to_tweets(txt_file)
+            ndjson_file = os.path.join(folders['json'], os.path.splitext(os.path.basename(txt_file))[0] + '.ndjson')
+            if os.path.exists(ndjson_file):
+                print(f"  処理中: {os.path.basename(ndjson_file)}")
+                tweets = parse_ndjson_to_tweets(ndjson_file)
+            else:
+                print(f"  処理中: {os.path.basename(txt_file)}")
+                tweets = parse_txt_to_tweets(txt_file)
             all_tweets.extend(tweets)
             processed_files.append(txt_file)
     else:
         print(f"{keyword_type}フォルダにtxtファイルが見つかりません。")
         print(f"確認してください: {txt_folder}/")
-        return
-
-    if not processed_files:
-        print("txtファイルが見つかりません。")
-        return
+        return [], [], 0
 
-    # 日時の昇順でソート
-    all_tweets.sort(key=lambda x: x.get('timestamp', datetime.min))
+    # 同じツイートID（重複して取得したツイート）を除き、投稿時刻の昇順でソート
+    all_tweets, duplicates = dedupe_tweets(all_tweets)
+    all_tweets.sort(key=tweet_sort_key)
+    return all_tweets, processed_files, duplicates
 
+def _write_csv(keyword_type, folders, all_tweets):
+    """キーワードタイプのCSVファイルに書き出す"""
     # CSVファイル名を決定
     if keyword_type == 'default':
         csv_filename = "all_tweets.csv"
@@ -123,9 +261,10 @@ def merge_all_txt_to_csv(keyword_type='default'):
 
     csv_file = os.path.join(csv_folder, csv_filename)
 
-    with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+    # 一時ファイルに書き込んで置き換える（内容が同じ場合は書き換えない）
+    with AtomicFile(csv_file, 'w', encoding='utf-8', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['ユーザー名', '日時', 'URL', 'ツイート内容', '元ファイル'])
+        writer.writerow(['ユーザー名', '日時', 'URL', 'ツイート内容', '元ファイル', 'ハンドル', '返信数', 'リポスト数', 'いいね数', 'メディア'])
 
         for tweet in all_tweets:
             writer.writerow([
@@ -133,12 +272,15 @@ def merge_all_txt_to_csv(keyword_type='default'):
                 tweet.get('datetime', ''),
                 tweet.get('url', ''),
                 tweet.get('text', ''),
-                tweet.get('source_file', '')
+                tweet.get('source_file', ''),
+                tweet.get('handle', ''),
+                *(tweet.get(name, '') for name in COUNT_FIELDS),
+                ' '.join(tweet.get('media_urls', []))
             ])
 
     print(f"マージ完了: {csv_file}")
-    print(f"総ツイート数: {len(all_tweets)}")
-    print(f"処理したファイル数: {len(processed_files)}")
+    if not f.changed:
+        print("（内容に変更がないため、CSVファイルは書き換えませんでした）")
 
 if __name__ == "__main__":
     merge_all_txt_to_csv()
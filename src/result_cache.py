@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+抽出結果のキャッシュ
+HTMLファイルの内容のハッシュと抽出処理のバージョンをキーに、抽出したツイートを保存する。
+同じHTMLを同じ抽出処理で再度抽出する場合は、パースせずに保存した結果を返す。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from src import json_backend
+from src.html_source import open_html_bytes
+from src.tweet_record import Tweet
+
+# 抽出結果の形式・規則を変えた場合は値を上げる（抽出処理のソースが変わった場合は自動的に無効になる）
+EXTRACTOR_VERSION = 1
+
+# バージョンの計算に使う抽出処理のソースファイル
+_EXTRACTOR_SOURCES = ('extract_tweets_from_html.py', 'tweet_scanner.py', 'tweet_selectors.py', 'extraction_plan.py', 'snowflake.py', 'tweet_time.py', 'tweet_record.py', 'tweet_metrics.py')
+
+_extractor_version = None
+
+def extractor_version():
+    """抽出処理のバージョン（EXTRACTOR_VERSION と抽出処理のソースのハッシュ）を返す"""
+    global _extractor_version
+    if _extractor_version is None:
+        digest = hashlib.sha256()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in _EXTRACTOR_SOURCES:
+            with open(os.path.join(src_dir, name), 'rb') as f:
+                digest.update(f.read())
+        _extractor_version = f"{EXTRACTOR_VERSION}-{digest.hexdigest()[:12]}"
+    return _extractor_version
+
+def file_content_hash(path):
+    """ファイル（またはHTMLのバイト列・メモリマップ）の内容のSHA-256を返す"""
+    with open_html_bytes(path) as data:
+        return hashlib.sha256(data).hexdigest()
+
+class ResultCache:
+    """HTMLファイルの内容のハッシュごとに、抽出したツイートを保存するキャッシュ
+
+    1件の結果を1ファイル（gzip圧縮したJSON）に保存する。ツイートは列名と値の配列に分けて
+    保存し、ツイートごとにキーを繰り返さない。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def key(self, html_file_path, **options):
+        """HTMLファイルの内容・抽出処理のバージョン・抽出オプションからキーを作る
+
+        Args:
+            html_file_path (str | bytes | mmap.mmap): HTMLファイルのパス、またはHTMLのバイト列・メモリマップ
+            **options: 結果が変わる抽出オプション（エンジン・件数の上限など）
+        """
+        digest = hashlib.sha256()
+        digest.update(file_content_hash(html_file_path).encode('ascii'))
+        digest.update(extractor_version().encode('ascii'))
+        # キーはJSONライブラリによらず同じになるよう、標準の json で作る
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key):
+        """保存した抽出結果を返す（ない場合や読み込めない場合はNone）"""
+        try:
+            with gzip.open(self._path(key), 'rb') as f:
+                data = json_backend.load(f)
+        except (OSError, ValueError, EOFError):
+            return None
+        columns = data['columns']
+        return [
+            Tweet({column: value for column, value in zip(columns, row) if value is not None or column in data['required']})
+            for row in data['rows']
+        ]
+
+    def put(self, key, tweets):
+        """抽出結果を保存する（保存できない場合は警告を表示して続行する）"""
+        columns = []
+        for tweet in tweets:
+            for column in tweet:
+                if column not in columns:
+                    columns.append(column)
+        # すべてのツイートにある列は、値がNoneでも復元する
+        required = [column for column in columns if all(column in tweet for tweet in tweets)]
+        data = {
+            'columns': columns,
+            'required': required,
+            'rows': [[tweet.get(column) for column in columns] for tweet in tweets]
+        }
+
+        path = self._path(key)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with gzip.open(tmp_path, 'wb') as f:
+                json_backend.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"警告: 抽出結果のキャッシュを保存できませんでした: {e}")
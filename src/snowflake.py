@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+ツイートID（Snowflake ID）の解析
+ツイートURLの /status/<ID> から整数のIDを取り出し、IDの上位ビットに含まれる投稿時刻
+（ミリ秒）を復元する。並べ替え・重複除去には日時の文字列ではなくこの整数を使う。
+"""
+
+import re
+
+# Snowflake ID の時刻の基準（2010-11-04 01:42:54.657 UTC、Unix時間のミリ秒）
+TWITTER_EPOCH_MS = 1288834974657
+
+# これより小さいIDは Snowflake 導入前の連番で、時刻を含まない
+_MIN_SNOWFLAKE_ID = 29700859247
+
+_STATUS_ID_PATTERN = re.compile(r'/status(?:es)?/(\d+)')
+
+def status_id_from_url(url):
+    """ツイートURLからツイートIDを取り出す（見つからない場合はNone）"""
+    if not url:
+        return None
+    match = _STATUS_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+def snowflake_epoch_ms(status_id):
+    """ツイートIDから投稿時刻（Unix時間のミリ秒）を復元する（Snowflake IDでない場合はNone）"""
+    if status_id is None or status_id < _MIN_SNOWFLAKE_ID:
+        return None
+    return (status_id >> 22) + TWITTER_EPOCH_MS
+
+def tweet_sort_key(tweet):
+    """ツイートを投稿時刻の昇順に並べるためのキー（時刻のないツイートは先頭）
+
+    Args:
+        tweet (dict): 'epoch_ms' と 'status_id' を持つツイートデータ
+
+    Returns:
+        tuple: (投稿時刻のミリ秒, ツイートID)
+    """
+    return (tweet.get('epoch_ms') or 0, tweet.get('status_id') or 0)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+ツイートのハンドル・反応数・メディアの判定
+DOMによる抽出（_collect_article_fields）と高速パス（tweet_scanner）で同じ規則を使うため、
+値の判定・変換だけをまとめる。txtの「反応:」行の書き出し（抽出）と読み込み（マージ）も同じ表記を使う。
+"""
+
+import re
+
+# 反応数のボタンの data-testid -> ツイートの項目（自分が反応済みの場合は un〜 になる）
+ENGAGEMENT_FIELDS = {
+    'reply': 'reply_count',
+    'retweet': 'retweet_count',
+    'unretweet': 'retweet_count',
+    'like': 'like_count',
+    'unlike': 'like_count',
+}
+
+# 反応数の項目（txt・CSVに出力する順）
+COUNT_FIELDS = ('reply_count', 'retweet_count', 'like_count')
+
+# txtの「反応:」行での反応数の表記（項目, 表記）
+REACTION_LABELS = (('reply_count', '返信'), ('retweet_count', 'リポスト'), ('like_count', 'いいね'))
+_REACTION_PATTERN = re.compile(r'(' + '|'.join(label for _, label in REACTION_LABELS) + r') (\d+)')
+
+# 添付メディア（画像・動画のサムネイル・GIF動画）のURL
+MEDIA_URL_PREFIXES = (
+    'https://pbs.twimg.com/media/',
+    'https://pbs.twimg.com/ext_tw_video_thumb/',
+    'https://pbs.twimg.com/amplify_video_thumb/',
+    'https://pbs.twimg.com/tweet_video_thumb/',
+    'https://video.twimg.com/',
+)
+
+# aria-label の数値（例: '1,234 件のいいね。いいねする'、'12 Replies. Reply'）
+_LABEL_COUNT_PATTERN = re.compile(r'\d[\d,]*')
+# ボタンに表示される数値（例: '12'、'1.2万'、'3.4K'）
+_TEXT_COUNT_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([KkMm万億]?)')
+_COUNT_UNITS = {'': 1, 'K': 1000, 'k': 1000, 'M': 1000000, 'm': 1000000, '万': 10000, '億': 100000000}
+
+def handle_from_text(text):
+    """User-Name内のspanのテキストがハンドル（@から始まる）であれば返す（そうでなければNone）"""
+    text = text.strip()
+    if len(text) > 1 and text.startswith('@'):
+        return text
+    return None
+
+def count_from_label(label):
+    """反応数のボタンの aria-label から件数（省略されない値）を求める（数値がなければNone）"""
+    if label:
+        match = _LABEL_COUNT_PATTERN.search(label)
+        if match:
+            return int(match.group().replace(',', ''))
+    return None
+
+def count_from_text(text):
+    """反応数のボタンの表示テキスト（'1.2万' などの略記）から件数を求める
+
+    aria-label に数値がない場合に使う。件数が0の場合は数値が表示されないため、空の場合は0とする。
+
+    Returns:
+        int: 件数（数値として解釈できない場合はNone）
+    """
+    text = text.strip()
+    if not text:
+        return 0
+    match = _TEXT_COUNT_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    return round(float(match.group(1).replace(',', '')) * _COUNT_UNITS[match.group(2)])
+
+def is_media_url(url):
+    """img要素の src・video要素の poster/src が添付メディアのURLかどうか"""
+    return url is not None and url.startswith(MEDIA_URL_PREFIXES)
+
+def format_reactions(tweet):
+    """反応数をtxtの「反応:」行の表記（例: '返信 1 / リポスト 2 / いいね 3'）にする（反応数がない場合は空）"""
+    return ' / '.join(f"{label} {tweet[name]}" for name, label in REACTION_LABELS if tweet.get(name) is not None)
+
+def parse_reactions(value):
+    """txtの「反応:」行の表記から反応数を読み取る
+
+    Returns:
+        dict: 項目名 -> 件数（表記にない項目は含めない）
+    """
+    names = {label: name for name, label in REACTION_LABELS}
+    return {names[label]: int(count) for label, count in _REACTION_PATTERN.findall(value)}
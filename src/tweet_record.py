@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+ツイート1件分のデータ
+抽出・詳細ページ処理・保存・マージの間で受け渡すツイートを、辞書の代わりに __slots__ の
+レコードで持つ。辞書と同じように tweet['text'] や tweet.get('quote_url') で読み書きでき、
+値を設定していない項目は辞書にないキーと同じ扱いになる。
+"""
+
+from collections.abc import MutableMapping
+
+# 項目（JSONに保存する順）
+TWEET_FIELDS = (
+    'id',               # ツイート要素の通し番号（1始まり）
+    'text',             # 本文
+    'datetime',         # 表示用の日時（JST）
+    'quote_url',        # ツイートURL（抽出時）
+    'user_name',        # ユーザー名（表示名）
+    'handle',           # ハンドル（@から始まるユーザー名）
+    'has_show_more',    # 「さらに表示」ボタンの有無
+    'reply_count',      # 返信数
+    'retweet_count',    # リポスト数
+    'like_count',       # いいね数
+    'media_urls',       # 添付メディアのURL（リスト）
+    'status_id',        # ツイートID
+    'epoch_ms',         # 投稿時刻（Unix時間のミリ秒）
+    'raw_html_offset',  # ツイート要素のソース上のバイトオフセット
+    'is_complete',      # 詳細ページの全文に置き換えた場合はTrue
+    'url',              # ツイートURL（txtから読み込んだ場合）
+    'source_file',      # 読み込んだtxtファイル名
+)
+
+_FIELD_SET = frozenset(TWEET_FIELDS)
+
+class Tweet(MutableMapping):
+    """ツイート1件分のレコード（辞書と互換の読み書きができる）
+
+    ツイートごとに辞書を作らないため、大量のツイートを保持する場合のメモリ使用量が少ない。
+    TWEET_FIELDS 以外のキーは設定できない（KeyError）。
+    """
+
+    __slots__ = TWEET_FIELDS
+
+    id: int
+    text: str
+    datetime: str
+    quote_url: str
+    user_name: str
+    handle: str
+    has_show_more: bool
+    reply_count: int
+    retweet_count: int
+    like_count: int
+    media_urls: list
+    status_id: int
+    epoch_ms: int
+    raw_html_offset: int
+    is_complete: bool
+    url: str
+    source_file: str
+
+    def __init__(self, fields=None, **kwargs):
+        if fields:
+            self.update(fields)
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __iter__(self):
+        return (name for name in TWEET_FIELDS if hasattr(self, name))
+
+    def __len__(self):
+        return sum(1 for name in TWEET_FIELDS if hasattr(self, name))
+
+    def __repr__(self):
+        return f"Tweet({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        if key not in _FIELD_SET:
+            return default
+        return getattr(self, key, default)
+
+    def copy(self):
+        """同じ値を持つ新しいレコードを返す"""
+        return Tweet(self)
+
+    def to_dict(self):
+        """設定済みの項目を TWEET_FIELDS の順に並べた辞書を返す（JSONへの保存用）"""
+        return {name: getattr(self, name) for name in TWEET_FIELDS if hasattr(self, name)}
+
+def tweet_json_default(obj):
+    """JSONに変換する際の default 引数用（Tweet を辞書にする）"""
+    if isinstance(obj, Tweet):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
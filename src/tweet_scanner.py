@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+DOMを構築せずにツイート要素を抽出する高速パス
+article[data-testid="tweet"] の範囲をバイト列のまま正規表現で走査し、抽出に必要な値
+（User-Name、tweetText、リンク、time要素の日時、反応数のボタン、メディア）だけを取り出す。
+確実に解析できない要素は None を返し、呼び出し側でDOMによる抽出に切り替える。
+"""
+
+import bisect
+import html
+import re
+
+from src.tweet_metrics import ENGAGEMENT_FIELDS, count_from_label, count_from_text, handle_from_text, is_media_url
+
+# タグ内の属性部分（引用符で囲まれた > を許容する）
+_ATTRS = rb'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+
+# 文書全体：コメントを読み飛ばしつつ article の開始/終了タグを探す。
+# 正規表現では確実に解析できない記述（生テキスト要素・宣言・処理命令）は group(1) で検出する
+# （いずれのパターンも先頭の '<' をくくり出しておくと、正規表現の検索が速い）
+_ARTICLE_TAG_PATTERN = re.compile(
+    rb'<(?:!--.*?-->'
+    rb'|((script|style|textarea|title)(?=[\s/>])' + _ATTRS + rb'>.*?</\2\s*>'
+    rb'|[!?]|/?(?:xmp|plaintext|noscript|noembed|noframes|iframe|template)(?=[\s/>]))'
+    rb'|(/?)article(?=[\s/>])(' + _ATTRS + rb')>)',
+    re.S | re.I)
+
+# article要素内のタグ（いずれもコメントを先に照合し、コメント内のタグは無視する）
+_COMMENT_PATTERN = re.compile(rb'<!--.*?-->', re.S)
+_A_TAG_PATTERN = re.compile(rb'<(?:!--.*?-->|a(?=[\s/>])(' + _ATTRS + rb')>)', re.S | re.I)
+_TIME_TAG_PATTERN = re.compile(rb'<(?:!--.*?-->|time(?=[\s/>])(' + _ATTRS + rb')>)', re.S | re.I)
+_MEDIA_TAG_PATTERN = re.compile(rb'<(?:!--.*?-->|(img|video)(?=[\s/>])(' + _ATTRS + rb')>)', re.S | re.I)
+# 抽出に使う data-testid 属性（ブラウザが保存したHTMLの属性名は小文字）と、それを含む開始タグ
+_TESTID_ATTR_PATTERN = re.compile(
+    rb'''data-testid\s*=\s*(["']?)(User-Name|tweetText|tweet-text-show-more-link|tweet|reply|un(?:retweet|like)|retweet|like)\1(?=[\s/>])''')
+# 最初の属性がhrefの場合（X のaタグはほとんどがこの形）は属性の分解を省く
+_FIRST_HREF_PATTERN = re.compile(rb'\s+href="([^"]*)"')
+_START_TAG_PATTERN = re.compile(rb'<([a-zA-Z][a-zA-Z0-9-]*)(' + _ATTRS + rb')>')
+_SPAN_TAG_PATTERN = re.compile(rb'<(?:!--.*?-->|span(?=[\s/>])' + _ATTRS + rb'>)', re.S | re.I)
+
+# テキスト取得時に取り除くタグとコメント
+_STRIP_TAG_PATTERN = re.compile(rb'<(?:!--.*?-->|/?[a-zA-Z]' + _ATTRS + rb'>)', re.S)
+
+_ATTR_PATTERN = re.compile(rb'''([^\s/>"'=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+
+# 要素の終了位置を探すためのタグ名ごとの正規表現
+_ELEMENT_TAG_PATTERNS = {}
+
+class UnscannableArticle(Exception):
+    """高速パスで確実に解析できないarticle要素"""
+
+def _attr(attrs, name):
+    """属性部分から指定した属性の値を返す（最初の出現を優先、なければNone）"""
+    for match in _ATTR_PATTERN.finditer(attrs):
+        if match.group(1).lower() == name:
+            value = match.group(2) or match.group(3) or match.group(4) or b''
+            return _decode(value)
+    return None
+
+def _decode(data):
+    """バイト列を文字列に変換し、文字参照を展開する"""
+    text = data.decode('utf-8')
+    return html.unescape(text) if '&' in text else text
+
+def _text_between(data, start, end):
+    """start〜end のテキスト（タグを除いたもの）を返す"""
+    return _decode(_STRIP_TAG_PATTERN.sub(b'', data[start:end]))
+
+def _element_end(data, tag, start, end):
+    """start（開始タグの直後）から始まる要素の終了タグの位置を返す"""
+    pattern = _ELEMENT_TAG_PATTERNS.get(tag)
+    if pattern is None:
+        pattern = re.compile(
+            rb'<(?:!--.*?-->|(/?)' + re.escape(tag) + rb'(?=[\s/>])(' + _ATTRS + rb')>)', re.S | re.I)
+        _ELEMENT_TAG_PATTERNS[tag] = pattern
+    depth = 1
+    for match in pattern.finditer(data, start, end):
+        closing = match.group(1)
+        if closing is None:
+            continue  # コメント
+        if closing:
+            depth -= 1
+            if depth == 0:
+                return match.start()
+        elif not match.group(2).endswith(b'/'):
+            depth += 1
+    raise UnscannableArticle(f'<{tag.decode()}> が閉じられていない')
+
+def _iter_testid_tags(data, start, end):
+    """start〜end にある data-testid 属性を持つ開始タグを文書順に返す
+
+    Yields:
+        tuple: (タグ名, data-testid, 属性部分, 開始タグの直後の位置, 自己終了タグかどうか)
+    """
+    comments = []
+    if data.find(b'<!--', start, end) != -1:
+        comments = [(match.start(), match.end()) for match in _COMMENT_PATTERN.finditer(data, start, end)]
+        comment_starts = [comment_start for comment_start, _ in comments]
+
+    # 抽出に使う属性値を文字列検索し、直前の '<' から開始タグを照合する（速い）
+    for match in _TESTID_ATTR_PATTERN.finditer(data, start, end):
+        if not data[match.start() - 1:match.start()].isspace():
+            continue  # aria-data-testid などの別の属性
+        if comments:
+            i = bisect.bisect_right(comment_starts, match.start()) - 1
+            if i >= 0 and match.start() < comments[i][1]:
+                continue  # コメント内
+        tag_start = data.rfind(b'<', start, match.start())
+        tag_match = _START_TAG_PATTERN.match(data, tag_start) if tag_start != -1 else None
+        if tag_match is None or tag_match.end() <= match.end():
+            continue  # タグの外（テキスト）
+        testid = match.group(2).decode('ascii')
+        if tag_match.group(2).count(b'data-testid') > 1 and _attr(tag_match.group(2), b'data-testid') != testid:
+            continue  # 同じタグの最初の data-testid が別の値
+        yield tag_match.group(1).lower(), testid, tag_match.group(2), tag_match.end(), tag_match.group(2).endswith(b'/')
+
+def _user_name_spans(data, start, end):
+    """start〜end にあるspan要素から、最初のspanのテキストとハンドル（@から始まる最初のテキスト）を返す
+
+    Returns:
+        tuple: (最初のspanのテキスト, ハンドル)。見つからない値はNone
+    """
+    first = None
+    for match in _SPAN_TAG_PATTERN.finditer(data, start, end):
+        if match.group().startswith(b'<!--'):
+            continue
+        if match.group().endswith(b'/>'):
+            text = ''
+        else:
+            text = _text_between(data, match.end(), _element_end(data, b'span', match.end(), end))
+        if first is None:
+            first = text
+        handle = handle_from_text(text)
+        if handle is not None:
+            return first, handle
+    return first, None
+
+def _in_ranges(position, ranges, starts):
+    """position が ranges（開始位置の順に並んだ (開始, 終了) のリスト）のいずれかに含まれるかどうか"""
+    i = bisect.bisect_right(starts, position) - 1
+    return i >= 0 and position < ranges[i][1]
+
+def _scan_article(data, start, end, nested=()):
+    """article要素（start〜end）から抽出に必要な値を集める
+
+    _collect_article_fields と同じ規則で値を集める。要素の対応は同じタグ名の
+    開始/終了タグを数えて求めるため、崩れたマークアップは解析できないものとして扱う。
+    生テキスト要素・宣言・処理命令を含まないことは呼び出し側で確認する。
+    反応数とメディアは、nested（入れ子のarticle要素の (開始, 終了) を文書順に並べたもの）の中から取らない。
+
+    Returns:
+        dict: user_name, handle, text, links, tco_links, datetime, hrefs, has_show_more,
+            reply_count, retweet_count, like_count, media_urls
+
+    Raises:
+        UnscannableArticle: 確実に解析できない場合
+    """
+    fields = {
+        'user_name': None,      # [data-testid="User-Name"] span のテキスト
+        'text': None,           # 最初の [data-testid="tweetText"] のテキスト
+        'links': [],            # tweetText内の a[href^="http"]
+        'tco_links': [],        # ツイート全体の a[href^="https://t.co/"]
+        'datetime': None,       # 最初のtime要素のdatetime属性（time要素がなければNone）
+        'hrefs': [],            # ツイート全体の a[href]
+        'has_show_more': False, # [data-testid="tweet-text-show-more-link"] の有無
+        'handle': None,         # [data-testid="User-Name"] 内で最初の @ から始まる span のテキスト
+        'reply_count': None,    # 最初の [data-testid="reply"] の件数
+        'retweet_count': None,  # 最初の [data-testid="retweet"]（unretweet）の件数
+        'like_count': None,     # 最初の [data-testid="like"]（unlike）の件数
+        'media_urls': []        # img[src]・video[poster/src] のうち添付メディアのURL
+    }
+    nested_starts = [nested_start for nested_start, _ in nested]
+    text_range = None
+    for tag, testid, attrs, content_start, self_closing in _iter_testid_tags(data, start, end):
+        if testid == 'tweet':
+            if tag != b'article':
+                raise UnscannableArticle('article以外のツイート要素が入れ子になっている')
+        elif testid == 'User-Name' and (fields['user_name'] is None or fields['handle'] is None) and not self_closing:
+            user_name, handle = _user_name_spans(data, content_start, _element_end(data, tag, content_start, end))
+            if fields['user_name'] is None:
+                fields['user_name'] = user_name
+            if fields['handle'] is None:
+                fields['handle'] = handle
+        elif testid == 'tweetText' and text_range is None:
+            if self_closing:
+                text_range = (content_start, content_start)
+            else:
+                text_range = (content_start, _element_end(data, tag, content_start, end))
+            fields['text'] = _text_between(data, *text_range)
+        elif testid == 'tweet-text-show-more-link':
+            fields['has_show_more'] = True
+        elif testid in ENGAGEMENT_FIELDS and fields[ENGAGEMENT_FIELDS[testid]] is None and not _in_ranges(content_start, nested, nested_starts):
+            # aria-label に数値がない場合だけ表示テキストを読む
+            count = count_from_label(_attr(attrs, b'aria-label'))
+            if count is None:
+                count = count_from_text('' if self_closing else _text_between(data, content_start, _element_end(data, tag, content_start, end)))
+            fields[ENGAGEMENT_FIELDS[testid]] = count
+
+    for match in _A_TAG_PATTERN.finditer(data, start, end):
+        attrs = match.group(1)
+        if attrs is None:
+            continue  # コメント
+        first = _FIRST_HREF_PATTERN.match(attrs)
+        href = _decode(first.group(1)) if first else _attr(attrs, b'href')
+        if href is None:
+            continue
+        fields['hrefs'].append(href)
+        if href.startswith('http') and text_range is not None and text_range[0] <= match.start() < text_range[1]:
+            fields['links'].append(href)
+        if href.startswith('https://t.co/'):
+            fields['tco_links'].append(href)
+
+    for match in _TIME_TAG_PATTERN.finditer(data, start, end):
+        if match.group(1) is not None:
+            fields['datetime'] = _attr(match.group(1), b'datetime')
+            break
+
+    for match in _MEDIA_TAG_PATTERN.finditer(data, start, end):
+        attrs = match.group(2)
+        if attrs is None or _in_ranges(match.start(), nested, nested_starts):
+            continue  # コメント・入れ子のarticle要素
+        names = (b'src',) if match.group(1).lower() == b'img' else (b'poster', b'src')
+        for name in names:
+            url = _attr(attrs, name)
+            if is_media_url(url) and url not in fields['media_urls']:
+                fields['media_urls'].append(url)
+
+    return fields
+
+def _scan_or_none(data, start, end, nested=()):
+    """_scan_article を実行し、解析できない場合はNoneを返す"""
+    try:
+        return _scan_article(data, start, end, nested)
+    except (UnscannableArticle, UnicodeDecodeError):
+        return None
+
+def scan_tweet_articles(data):
+    """HTMLのバイト列から article[data-testid="tweet"] を文書順に走査する
+
+    一番外側のarticle要素の範囲ごとに、含まれるツイート要素（引用ツイートなど入れ子の
+    要素を含む）のフィールドを返す。
+
+    Args:
+        data (bytes): HTML全体
+
+    Yields:
+        tuple: (範囲の開始, 範囲の終了, [(ツイート要素のオフセット, フィールドまたはNone), ...])
+    """
+    region_start = 0
+    open_articles = []  # 開いているarticle要素 [オフセット, ツイート要素の場合はリスト上の位置, 解析できるか, 子のarticle要素の範囲]
+    articles = []       # 範囲内のツイート要素（オフセット, フィールド）
+    for match in _ARTICLE_TAG_PATTERN.finditer(data):
+        if match.group(1) is not None:
+            # 生テキスト要素・宣言等を含むarticle要素はDOMで抽出する
+            for article in open_articles:
+                article[2] = False
+            continue
+        closing = match.group(3)
+        if closing is None:
+            continue  # コメント
+        if closing:
+            if not open_articles:
+                continue  # 対応する開始タグのない終了タグ
+            offset, position, scannable, children = open_articles.pop()
+            if position is not None and scannable:
+                articles[position] = (offset, _scan_or_none(data, offset, match.end(), children))
+            if open_articles:
+                open_articles[-1][3].append((offset, match.end()))
+            if not open_articles and articles:
+                yield region_start, match.end(), articles
+        else:
+            if not open_articles:
+                region_start = match.start()
+                articles = []
+            position = None
+            attrs = match.group(4)
+            try:
+                if b'data-testid' in attrs and _attr(attrs, b'data-testid') == 'tweet':
+                    position = len(articles)
+                    articles.append((match.start(), None))
+            except UnicodeDecodeError:
+                pass
+            open_articles.append([match.start(), position, True, []])
+
+    # 閉じられていないarticle要素はDOMで抽出する
+    if open_articles and articles:
+        yield region_start, len(data), articles
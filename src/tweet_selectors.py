@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+ツイート抽出で使うセレクタの登録簿
+CSSセレクタ（BeautifulSoup用）とXPath（lxml用）をインポート時に一度だけコンパイルし、
+すべての抽出処理で共有する。セレクタごとの使用回数・マッチ数も集計する。
+"""
+
+import soupsieve as sv
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+class CompiledSelector:
+    """コンパイル済みのCSSセレクタとXPathの組"""
+
+    def __init__(self, name, css, xpath):
+        self.name = name
+        self.css = css
+        self.xpath = xpath
+        self._css = sv.compile(css)
+        self._xpath = etree.XPath(xpath) if LXML_AVAILABLE else None
+        self.calls = 0  # 評価した回数
+        self.hits = 0   # マッチした要素の総数
+
+    def select(self, root):
+        """root配下でマッチする要素をすべて返す（lxml・BeautifulSoupの両方に対応）"""
+        if self._xpath is not None and isinstance(root, etree._Element):
+            result = self._xpath(root)
+        else:
+            result = self._css.select(root)
+        self.record(len(result))
+        return result
+
+    def select_one(self, root):
+        """root配下で最初にマッチする要素を返す（なければNone）"""
+        if self._xpath is not None and isinstance(root, etree._Element):
+            result = self._xpath(root)
+            element = result[0] if result else None
+        else:
+            element = self._css.select_one(root)
+        self.record(0 if element is None else 1)
+        return element
+
+    def record(self, count):
+        """評価結果を集計に加える（独自の走査でマッチを数えた場合にも使用）"""
+        self.calls += 1
+        self.hits += count
+
+def _register(name, css, xpath):
+    SELECTORS[name] = CompiledSelector(name, css, xpath)
+
+# セレクタの登録簿（名前 -> CompiledSelector）
+SELECTORS = {}
+
+# ツイート要素（TWEET_SELECTOR_NAMES の順に試す）
+_register('tweet_article', 'article[data-testid="tweet"]', './/article[@data-testid="tweet"]')
+_register('tweet_div', 'div[data-testid="tweet"]', './/div[@data-testid="tweet"]')
+_register('article', 'article', './/article')
+_register('role_article', 'div[role="article"]', './/div[@role="article"]')
+
+# ツイート要素内のフィールド
+_register('user_name', '[data-testid="User-Name"] span', './/*[@data-testid="User-Name"]//span')
+_register('tweet_text', '[data-testid="tweetText"]', './/*[@data-testid="tweetText"]')
+_register('text_links', 'a[href^="http"]', './/a[starts-with(@href, "http")]')
+_register('tco_links', 'a[href^="https://t.co/"]', './/a[starts-with(@href, "https://t.co/")]')
+_register('auto_spans', 'span[dir="auto"]', './/span[@dir="auto"]')
+_register('time', 'time', './/time')
+_register('links', 'a[href]', './/a[@href]')
+_register('show_more', '[data-testid="tweet-text-show-more-link"]', './/*[@data-testid="tweet-text-show-more-link"]')
+_register('engagement', '[data-testid="reply"], [data-testid="retweet"], [data-testid="unretweet"], [data-testid="like"], [data-testid="unlike"]',
+          './/*[@data-testid="reply" or @data-testid="retweet" or @data-testid="unretweet" or @data-testid="like" or @data-testid="unlike"]')
+_register('media', 'img, video', './/img | .//video')
+
+# ツイート要素を探す順序
+TWEET_SELECTOR_NAMES = ['tweet_article', 'tweet_div', 'article', 'role_article']
+
+def selector_stats():
+    """セレクタごとの集計を返す
+
+    Returns:
+        dict: 名前 -> {'css': CSSセレクタ, 'calls': 評価回数, 'hits': マッチ数}
+    """
+    return {
+        name: {'css': selector.css, 'calls': selector.calls, 'hits': selector.hits}
+        for name, selector in SELECTORS.items()
+    }
+
+def reset_selector_stats():
+    """集計をリセットする"""
+    for selector in SELECTORS.values():
+        selector.calls = 0
+        selector.hits = 0
+
+def merge_selector_stats(stats_after, stats_before=None):
+    """別プロセスでの評価回数・マッチ数（stats_after - stats_before）を集計に加える"""
+    for name, stats in stats_after.items():
+        before = (stats_before or {}).get(name, {'calls': 0, 'hits': 0})
+        SELECTORS[name].calls += stats['calls'] - before['calls']
+        SELECTORS[name].hits += stats['hits'] - before['hits']
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+ツイートのSQLiteストア
+抽出したツイートをキーワードタイプとツイートIDをキーに1つのデータベースに保存（更新または追加）する。
+同じツイートを何度抽出しても1行にまとまり、キーワードタイプ・投稿時刻の範囲やユーザーで
+日付ごとのファイルを読み直さずに取り出せる。本文は FTS5 の全文検索の索引（trigram）で検索できる。
+標準ライブラリの sqlite3 だけを使う。
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+
+# 設定ファイルをインポート
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.snowflake import snowflake_epoch_ms, status_id_from_url
+from src.tweet_metrics import COUNT_FIELDS
+from src.tweet_record import Tweet
+from src.tweet_time import display_datetime_epoch_ms
+
+# 他のプロセス（一括抽出の並列処理）が書き込み中の場合に待つ秒数
+_BUSY_TIMEOUT = 30
+
+# 1日のミリ秒（JSTは夏時間がないため一定）
+_DAY_MS = 24 * 60 * 60 * 1000
+
+# スキーマのバージョン（PRAGMA user_version。0の場合はテーブルと全文検索の索引を作る）
+SCHEMA_VERSION = 1
+
+# 同じツイートでもキーワードタイプごとに1行（キーワードタイプ別のマージが、ファイルから結合した場合と同じになる）
+# id は全文検索の索引の行番号（INTEGER PRIMARY KEY のため VACUUM しても変わらない）
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS tweets (
+        id            INTEGER PRIMARY KEY,
+        keyword_type  TEXT    NOT NULL,
+        status_id     INTEGER NOT NULL,
+        epoch_ms      INTEGER,
+        datetime      TEXT,
+        user_name     TEXT,
+        handle        TEXT,
+        url           TEXT,
+        text          TEXT,
+        reply_count   INTEGER,
+        retweet_count INTEGER,
+        like_count    INTEGER,
+        media_urls    TEXT,
+        is_complete   INTEGER,
+        source_file   TEXT,
+        UNIQUE (keyword_type, status_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS tweets_status_id ON tweets (status_id)",
+    "CREATE INDEX IF NOT EXISTS tweets_keyword_type_epoch ON tweets (keyword_type, epoch_ms)",
+    "CREATE INDEX IF NOT EXISTS tweets_handle ON tweets (handle)",
+    "CREATE INDEX IF NOT EXISTS tweets_user_name ON tweets (user_name)",
+)
+
+# 本文の全文検索の索引（trigram で3文字ずつ区切るため、形態素解析なしで日本語も部分一致で検索できる）
+# 行番号は tweets の行のID（tweets.rowid）で、キーワードタイプごとの行がそれぞれの本文を持つ。
+# 索引はトリガーで行の追加・本文の変更・削除のたびに更新する。
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE tweets_fts USING fts5(text, tokenize='trigram')",
+    """CREATE TRIGGER tweets_fts_insert AFTER INSERT ON tweets BEGIN
+        INSERT INTO tweets_fts (rowid, text) VALUES (new.rowid, new.text);
+    END""",
+    """CREATE TRIGGER tweets_fts_update AFTER UPDATE OF text ON tweets WHEN old.text IS NOT new.text BEGIN
+        DELETE FROM tweets_fts WHERE rowid = old.rowid;
+        INSERT INTO tweets_fts (rowid, text) VALUES (new.rowid, new.text);
+    END""",
+    """CREATE TRIGGER tweets_fts_delete AFTER DELETE ON tweets BEGIN
+        DELETE FROM tweets_fts WHERE rowid = old.rowid;
+    END""",
+)
+
+# ツイートの項目に対応する列（キーワードタイプ以外）
+_COLUMNS = ('status_id', 'epoch_ms', 'datetime', 'user_name', 'handle', 'url', 'text', *COUNT_FIELDS, 'media_urls', 'is_complete', 'source_file')
+
+# 保存済みの行を更新する列と、その値を持つツイートの項目（--fields で一部の項目だけ抽出したツイートは、
+# 項目のない列を更新しない。is_complete は本文と一緒に更新する。epoch_ms・source_file は常に更新する）
+_UPDATE_FIELDS = {
+    'datetime': ('datetime',),
+    'user_name': ('user_name',),
+    'handle': ('handle',),
+    'url': ('quote_url', 'url'),
+    'text': ('text',),
+    **{name: (name,) for name in COUNT_FIELDS},
+    'media_urls': ('media_urls',),
+    'is_complete': ('text',),
+}
+
+def _upsert_statement(columns):
+    """行を追加し、保存済みの場合は columns の列だけを新しい値で置き換えるSQL"""
+    return (
+        f"INSERT INTO tweets (keyword_type, {', '.join(_COLUMNS)}) VALUES ({', '.join('?' * (len(_COLUMNS) + 1))}) "
+        f"ON CONFLICT (keyword_type, status_id) DO UPDATE SET "
+        + ', '.join(f"{name} = excluded.{name}" for name in columns)
+    )
+
+def _update_columns(tweet):
+    """ツイートの項目から、保存済みの行で更新する列を返す"""
+    return tuple(name for name in _COLUMNS[1:]
+                 if name not in _UPDATE_FIELDS or any(field in tweet for field in _UPDATE_FIELDS[name]))
+
+def store_enabled():
+    """抽出結果をストアに保存する設定かどうか"""
+    return getattr(config, 'TWEET_STORE_ENABLED', False)
+
+def default_store_path():
+    """ストアのデータベースファイルのパス（config.TWEET_STORE_PATH）"""
+    return getattr(config, 'TWEET_STORE_PATH', os.path.join('data', 'tweets.sqlite3'))
+
+def connect(path=None):
+    """ストアを開く（なければ作る）
+
+    Args:
+        path (str): データベースファイルのパス（Noneの場合は config.TWEET_STORE_PATH）
+
+    Returns:
+        sqlite3.Connection: 接続（with で使うとトランザクションをコミットする。閉じるのは呼び出し側）
+    """
+    path = path or default_store_path()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            # 読み込みと書き込みを並行できるようにする（設定はデータベースファイルに残る）
+            conn.execute('PRAGMA journal_mode=WAL')
+            _create_schema(conn)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+def _create_schema(conn):
+    """テーブル・インデックス・全文検索の索引を作る"""
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        # 他のプロセスが同時に作る場合に備えて、書き込みのロックを取ってからバージョンを確かめる
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                _create_fts(conn)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.isolation_level = isolation_level
+
+def _create_fts(conn):
+    """全文検索の索引を作る（FTS5・trigram が使えない SQLite の場合は作らず、検索は LIKE で行う）"""
+    conn.execute('SAVEPOINT create_fts')
+    try:
+        for statement in _FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError as e:
+        conn.execute('ROLLBACK TO create_fts')
+        print(f"警告: 全文検索の索引を作成できません（SQLite {sqlite3.sqlite_version}）: {e}")
+    conn.execute('RELEASE create_fts')
+
+def has_fts(conn):
+    """ストアに全文検索の索引があるかどうか"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tweets_fts'").fetchone() is not None
+
+def _row_for(tweet, keyword_type, source_file):
+    """ツイートをストアの1行の値にする（ツイートIDがない場合はNone）"""
+    status_id = tweet.get('status_id')
+    url = tweet.get('quote_url') or tweet.get('url')
+    if status_id is None:
+        # 詳細ページの処理を経ていないツイートはIDを持たないため、URLから求める
+        status_id = status_id_from_url(url)
+        if status_id is None:
+            return None
+    epoch_ms = tweet.get('epoch_ms')
+    if epoch_ms is None:
+        epoch_ms = snowflake_epoch_ms(status_id) or display_datetime_epoch_ms(tweet.get('datetime'))
+    is_complete = tweet.get('is_complete')
+    return (
+        keyword_type, status_id, epoch_ms, tweet.get('datetime'), tweet.get('user_name'), tweet.get('handle'),
+        url, tweet.get('text'), *(tweet.get(name) for name in COUNT_FIELDS),
+        ' '.join(tweet.get('media_urls') or []), None if is_complete is None else int(is_complete),
+        source_file or tweet.get('source_file'),
+    )
+
+def upsert_tweets(tweets, keyword_type='default', source_file=None, path=None):
+    """ツイートをストアに保存する（同じキーワードタイプ・ツイートIDの行は、ツイートにある項目の列を新しい内容で置き換える）
+
+    Args:
+        tweets (iterable): ツイートデータ
+        keyword_type (str): キーワードタイプ
+        source_file (str): 元ファイル名（Noneの場合はツイートの source_file）
+        path (str): データベースファイルのパス（Noneの場合は config.TWEET_STORE_PATH）
+
+    Returns:
+        int: 保存したツイート数（ツイートIDのないツイートは保存しない）
+    """
+    # 更新する列が同じツイートをまとめて保存する（通常の抽出ではすべてのツイートが同じ）
+    statements = {}
+    count = 0
+    conn = connect(path)
+    try:
+        with conn:
+            for columns, group in itertools.groupby(tweets, key=_update_columns):
+                rows = [row for row in (_row_for(tweet, keyword_type, source_file) for tweet in group) if row is not None]
+                if columns not in statements:
+                    statements[columns] = _upsert_statement(columns)
+                conn.executemany(statements[columns], rows)
+                count += len(rows)
+    finally:
+        conn.close()
+    return count
+
+def _tweet_from_row(row):
+    """ストアの1行（_COLUMNS の順）をツイートデータにする（NULLの項目は設定しない）"""
+    tweet = Tweet()
+    for name, value in zip(_COLUMNS, row):
+        if value is None:
+            continue
+        if name == 'media_urls':
+            value = value.split()
+        elif name == 'is_complete':
+            value = bool(value)
+        tweet[name] = value
+    return tweet
+
+def iter_tweets(keyword_type='default', since_ms=None, until_ms=None, handle=None, path=None):
+    """ストアのツイートを投稿時刻の昇順に読み込む（本文のないツイートは除く）
+
+    Args:
+        keyword_type (str): キーワードタイプ
+        since_ms (int): この投稿時刻（Unix時間のミリ秒）以降のツイートだけにする
+        until_ms (int): この投稿時刻より前のツイートだけにする
+        handle (str): このハンドルのツイートだけにする
+        path (str): データベースファイルのパス（Noneの場合は config.TWEET_STORE_PATH）
+
+    Yields:
+        Tweet: ツイートデータ（URLは url、元ファイル名は source_file）
+    """
+    conditions = ["keyword_type = ?", "text != ''"]
+    params = [keyword_type]
+    if since_ms is not None:
+        conditions.append("epoch_ms >= ?")
+        params.append(since_ms)
+    if until_ms is not None:
+        conditions.append("epoch_ms < ?")
+        params.append(until_ms)
+    if handle is not None:
+        conditions.append("handle = ?")
+        params.append(handle)
+    conn = connect(path)
+    try:
+        query = f"SELECT {', '.join(_COLUMNS)} FROM tweets WHERE {' AND '.join(conditions)} ORDER BY epoch_ms, status_id"
+        for row in conn.execute(query, params):
+            yield _tweet_from_row(row)
+    finally:
+        conn.close()
+
+def date_epoch_ms(date_str, next_day=False):
+    """YYMMDD または YYYY-MM-DD の日付（JST）の0時をUnix時間のミリ秒にする（解析できない場合はNone）
+
+    next_day がTrueの場合は翌日の0時にする（日付までを含む範囲の終わりに使う）。
+    """
+    if date_str and len(date_str) == 6:
+        date_str = f"20{date_str[0:2]}-{date_str[2:4]}-{date_str[4:6]}"
+    if not date_str or len(date_str) != 10:
+        return None
+    epoch_ms = display_datetime_epoch_ms(f"{date_str[0:4]}/{date_str[5:7]}/{date_str[8:10]} 00:00:00")
+    if epoch_ms is not None and next_day:
+        epoch_ms += _DAY_MS
+    return epoch_ms
+
+def _like_pattern(term):
+    """term を含む文字列に一致する LIKE のパターン（% と _ はエスケープする）"""
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def search_tweets(terms, keyword_types=None, since_ms=None, until_ms=None, limit=50, path=None):
+    """本文にすべての検索語を含むツイートを、ツイートIDの降順（投稿時刻の新しい順）に検索する（大文字・小文字は区別しない）
+
+    3文字以上の検索語は全文検索の索引（trigram）で探す。trigram は3文字単位のため、2文字以下の検索語
+    （「ビザ」など）は、索引で絞り込んだ行（3文字以上の検索語がない場合はキーワードタイプ・投稿時刻の範囲の行）の
+    本文を LIKE で調べる。索引がない場合は、すべての検索語を LIKE で調べる。
+
+    Args:
+        terms (list): 検索語
+        keyword_types (list): このキーワードタイプのツイートだけにする（Noneの場合はすべて）
+        since_ms (int): この投稿時刻（Unix時間のミリ秒）以降のツイートだけにする
+        until_ms (int): この投稿時刻より前のツイートだけにする
+        limit (int): 最大件数（Noneの場合は制限なし）
+        path (str): データベースファイルのパス（Noneの場合は config.TWEET_STORE_PATH）
+
+    Returns:
+        list: (キーワードタイプ, ツイートデータ) のリスト
+    """
+    conn = connect(path)
+    try:
+        query, params = _search_query(terms, keyword_types, since_ms, until_ms, limit, has_fts(conn))
+        return [(row[0], _tweet_from_row(row[1:])) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+def _search_query(terms, keyword_types, since_ms, until_ms, limit, use_fts):
+    """search_tweets のSQLとパラメータを作る"""
+    terms = [term for term in terms if term]
+    indexed_terms = [term for term in terms if len(term) >= 3] if use_fts else []
+    conditions = []
+    params = []
+    if indexed_terms:
+        # 各検索語を1つのフレーズとして、すべてを含む行を索引で探し、行のIDで tweets を引く
+        # （CROSS JOIN で索引を外側にし、キーワードタイプのインデックスから読まないようにする）
+        source = "tweets_fts CROSS JOIN tweets ON tweets.rowid = tweets_fts.rowid"
+        conditions.append("tweets_fts MATCH ?")
+        params.append(' AND '.join('"' + term.replace('"', '""') + '"' for term in indexed_terms))
+    else:
+        source = "tweets"
+    for term in terms:
+        if term not in indexed_terms:
+            conditions.append("tweets.text LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(term))
+    if keyword_types:
+        conditions.append(f"tweets.keyword_type IN ({', '.join('?' * len(keyword_types))})")
+        params.extend(keyword_types)
+    if since_ms is not None:
+        conditions.append("tweets.epoch_ms >= ?")
+        params.append(since_ms)
+    if until_ms is not None:
+        conditions.append("tweets.epoch_ms < ?")
+        params.append(until_ms)
+    conditions.append("tweets.text != ''")
+
+    query = (f"SELECT tweets.keyword_type, {', '.join('tweets.' + name for name in _COLUMNS)} FROM {source} "
+             f"WHERE {' AND '.join(conditions)} ORDER BY tweets.status_id DESC, tweets.keyword_type")
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+ツイートの日時の変換
+time要素のISO形式の日時（X では 'YYYY-MM-DDTHH:MM:SS.000Z' の固定形式）を、
+JSTの表示形式とUnix時間のミリ秒に変換する。ツイートごとに呼ばれるため、固定形式は
+文字列の切り出しで解析し、同じ値の変換結果は再利用する。
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+# 表示用の日時はJST（UTC+9）
+_JST_OFFSET_HOURS = 9
+_JST_OFFSET = timedelta(hours=_JST_OFFSET_HOURS)
+_UNIX_EPOCH = datetime(1970, 1, 1)
+_UNIX_EPOCH_ORDINAL = _UNIX_EPOCH.toordinal()
+_MILLISECOND = timedelta(milliseconds=1)
+
+# 変換結果を保持する件数（同じ日時の再変換を省く）
+_CACHE_SIZE = 4096
+
+def _normalize_fixed_iso(value):
+    """'YYYY-MM-DDTHH:MM:SSZ' または 'YYYY-MM-DDTHH:MM:SS.fffZ' を切り出しで変換する
+
+    日付部分だけを序数に変換し、時刻は整数の計算で求める。JSTで日付が変わらない場合は、
+    表示形式も入力の文字列を切り出して作る。
+
+    Returns:
+        tuple: (表示用の日時, Unix時間のミリ秒)。固定形式でない場合はNone
+
+    Raises:
+        ValueError: 固定形式だが日付・時刻として正しくない場合
+    """
+    if len(value) == 24:
+        if value[19] != '.':
+            return None
+        millis = value[20:23]
+    elif len(value) == 20:
+        millis = '0'
+    else:
+        return None
+    if (value[-1] != 'Z' or value[4] != '-' or value[7] != '-' or value[10] != 'T'
+            or value[13] != ':' or value[16] != ':'):
+        return None
+    digits = value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19] + millis
+    if not (digits.isdigit() and digits.isascii()):
+        return None
+
+    hour, minute, second = int(value[11:13]), int(value[14:16]), int(value[17:19])
+    if hour > 23 or minute > 59 or second > 59:
+        raise ValueError(f"時刻が正しくありません: {value}")
+    day = date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+    epoch_ms = ((((day - _UNIX_EPOCH_ORDINAL) * 24 + hour) * 60 + minute) * 60 + second) * 1000 + int(millis)
+
+    jst_hour = hour + _JST_OFFSET_HOURS
+    if jst_hour < 24:
+        return f"{value[0:4]}/{value[5:7]}/{value[8:10]} {jst_hour:02d}{value[13:19]}", epoch_ms
+    jst_date = date.fromordinal(day + 1)
+    return f"{jst_date.year:04d}/{jst_date.month:02d}/{jst_date.day:02d} {jst_hour - 24:02d}{value[13:19]}", epoch_ms
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def normalize_iso_datetime(value):
+    """ISO形式の日時を、JSTの表示形式とUnix時間のミリ秒に変換する
+
+    固定形式以外（タイムゾーンの表記が異なるものなど）は datetime.fromisoformat で解析する。
+    タイムゾーンのない日時はUTCとみなす。
+
+    Args:
+        value (str): time要素の datetime 属性の値
+
+    Returns:
+        tuple: (表示用の日時 'YYYY/MM/DD HH:MM:SS', Unix時間のミリ秒)。解析できない場合は (value, None)
+    """
+    try:
+        normalized = _normalize_fixed_iso(value)
+        if normalized is not None:
+            return normalized
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        jst = dt + _JST_OFFSET
+    except (TypeError, ValueError, AttributeError, OverflowError):
+        return value, None
+    return jst.strftime('%Y/%m/%d %H:%M:%S'), (dt - _UNIX_EPOCH) // _MILLISECOND
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def display_datetime_epoch_ms(value):
+    """表示用の日時（'YYYY/MM/DD HH:MM:SS'、JST）をUnix時間のミリ秒にする（解析できない場合はNone）"""
+    if (not isinstance(value, str) or len(value) != 19 or value[4] != '/' or value[7] != '/'
+            or value[10] != ' ' or value[13] != ':' or value[16] != ':'):
+        return None
+    digits = (value[0:4], value[5:7], value[8:10], value[11:13], value[14:16], value[17:19])
+    if not all(part.isdigit() for part in digits):
+        return None
+    try:
+        jst = datetime(*map(int, digits))
+    except ValueError:
+        return None
+    return (jst - _JST_OFFSET - _UNIX_EPOCH) // _MILLISECOND
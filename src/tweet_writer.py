@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+抽出結果の書き出し
+抽出したツイートを有界のキューで書き出しスレッドに渡し、パースと並行して本文の整形・JSONへの変換・
+ファイルへの書き込みを行う。本文の整形（format_tweet_text）はツイートごとに1回だけ行い、
+その結果をtxtとコンソールへの一覧表示の両方に使う。
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from src import json_backend, tweet_store
+from src.atomic_file import AtomicFile, write_if_changed
+from src.tweet_metrics import format_reactions
+from src.tweet_record import tweet_json_default
+
+# 書き出しスレッドにまとめて渡すツイート数（キューの受け渡しとJSONへの変換の回数を減らす）
+WRITE_BATCH_SIZE = 64
+# キューの長さ（書き出しが遅れた場合に、抽出側で溜められるまとまりの数の上限）
+WRITE_QUEUE_SIZE = 16
+
+# キューで渡す終了の合図（_DONE はファイルを書き出して終える、_ABORT は書き出さずに終える）
+_DONE = object()
+_ABORT = object()
+
+# 既存のファイルと内容を比較する際に除く先頭部分（抽出日時は毎回変わるため）
+_TXT_VOLATILE_PREFIX = re.compile(re.escape('抽出日時: '.encode('utf-8')) + rb'[^\n]*\n')
+_JSON_VOLATILE_PREFIX = re.compile(rb'\{\s*"extraction_time":\s*"[^"]*"')
+
+def format_tweet_text(text):
+    """ツイートテキストをフォーマット（箇条書き対応）
+
+    空白で区切った語のうち、箇条書き（・）から始まる語の前に改行を入れる。
+    """
+    formatted = text.replace(' ・', ' \n・')
+    if formatted.startswith('・'):
+        formatted = '\n' + formatted
+    return formatted
+
+def format_txt_entry(tweet, formatted_text):
+    """ツイート1件をtxtファイルの1項目（区切り線まで）にする（formatted_text は format_tweet_text した本文）"""
+    lines = [f"{tweet['id']}."]
+    if tweet.get('user_name'):
+        lines.append(f"ユーザー名: {tweet['user_name']}")
+    if tweet.get('handle'):
+        lines.append(f"ハンドル: {tweet['handle']}")
+    if tweet.get('datetime'):
+        lines.append(f"日時: {tweet['datetime']}")
+    if tweet.get('quote_url'):
+        lines.append(f"ツイートURL: {tweet['quote_url']}")
+    reactions = format_reactions(tweet)
+    if reactions:
+        lines.append(f"反応: {reactions}")
+    if tweet.get('media_urls'):
+        lines.append(f"メディア: {' '.join(tweet['media_urls'])}")
+    lines.append(formatted_text)
+    lines.append("-" * 30)
+    return '\n'.join(lines) + '\n'
+
+def ndjson_line(tweet):
+    """ツイートをNDJSONの1行（改行まで）にする"""
+    return json_backend.dumps(tweet, default=tweet_json_default) + '\n'
+
+class TweetWriter:
+    """抽出したツイートを、書き出しスレッドで整形してtxt・json/ndjsonに書き出す
+
+    put() で渡したツイートは WRITE_BATCH_SIZE 件ずつ書き出しスレッドに渡し、本文を整形して ndjson はその場で書き出す
+    （stream に書き出す場合は、パイプの先で逐次読めるよう1件ずつ渡してフラッシュする）。
+    先頭に件数を書く txt と json は、ツイートごとの整形・JSONへの変換を済ませておき、close() で書き出す。
+    ツイートが1件もない場合はファイルを作らない。with で使うと、例外で抜けた場合は書き出しを取りやめる。
+    ファイルは一時ファイルから原子的に置き換え、抽出日時以外の内容が既存のファイルと同じ場合は書き換えない。
+
+    Args:
+        txt_path (str): txtファイルのパス（Noneの場合は書き出さない）
+        json_path (str): json/ndjsonファイルのパス（Noneの場合は書き出さない）
+        ndjson (bool): Trueの場合は json_path（または stream）にndjsonを書き出す
+        stream: ndjsonの書き出し先（標準出力など）。1行ごとにフラッシュする
+        indent (bool): json を字下げして整形する場合はTrue
+        batch_size (int): 書き出しスレッドにまとめて渡すツイート数
+        queue_size (int): キューの長さ（まとまりの数）
+        store_path (str): ツイートも保存するSQLiteのストアのパス（Noneの場合は保存しない）
+        keyword_type (str): ストアに保存するキーワードタイプ
+    """
+
+    def __init__(self, txt_path=None, json_path=None, ndjson=False, stream=None, indent=True, batch_size=WRITE_BATCH_SIZE, queue_size=WRITE_QUEUE_SIZE,
+                 store_path=None, keyword_type='default'):
+        self.txt_path = txt_path
+        self.json_path = json_path
+        self.ndjson = ndjson
+        self.stream = stream
+        self.indent = indent
+        self.tweets = []
+        self.formatted_texts = []  # format_tweet_text した本文（tweets と同じ順）
+        self._txt_entries = []
+        self._json_items = []
+        self._ndjson_file = None
+        self.unchanged_paths = []  # 内容が同じため書き換えなかったファイル
+        self.store_path = store_path
+        self.keyword_type = keyword_type
+        self.store_count = 0  # ストアに保存したツイート数
+        self._store_error = None
+        self._batch = []
+        self._batch_size = 1 if stream is not None else batch_size
+        self._completed = False
+        self._error = None
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, name='tweet-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, tweet):
+        """ツイートを書き出しスレッドに渡す（キューが一杯の場合は空くまで待つ）"""
+        if self._error is not None:
+            raise self._error
+        self._batch.append(tweet)
+        if len(self._batch) >= self._batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def write_all(self, tweets):
+        """tweets（ジェネレータでもよい）を受け取った順に書き出しスレッドに渡す"""
+        for tweet in tweets:
+            self.put(tweet)
+
+    def close(self):
+        """残りのツイートを処理してファイルを書き出し、書き出しスレッドを終える
+
+        Returns:
+            list: 書き出したツイートデータ
+
+        Raises:
+            書き出しスレッドで発生した例外
+        """
+        self._finish(_DONE)
+        if self._error is not None:
+            raise self._error
+        if self._completed and self.tweets and (self.txt_path or self.json_path):
+            print(f"結果を {' と '.join(path for path in (self.txt_path, self.json_path) if path)} に保存しました。")
+            if self.unchanged_paths:
+                print(f"（内容に変更がないため書き換えませんでした: {', '.join(self.unchanged_paths)}）")
+        if self._store_error is not None:
+            print(f"警告: ストア {self.store_path} への保存に失敗しました: {self._store_error}")
+        elif self.store_count:
+            print(f"{self.store_count} 件のツイートをストア {self.store_path} に保存しました。")
+        return self.tweets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._finish(_ABORT)
+        return False
+
+    def _finish(self, signal):
+        if self._thread is None:
+            return
+        if self._batch and signal is _DONE:
+            self._queue.put(self._batch)
+        self._batch = []
+        self._queue.put(signal)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        item = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE or item is _ABORT:
+                    break
+                self._add(item)
+            if item is _DONE:
+                self._write_files()
+                if self._ndjson_file is not None and not self._ndjson_file.commit():
+                    self.unchanged_paths.append(self.json_path)
+                self._upsert_store()
+                self._completed = True
+        except BaseException as e:
+            self._error = e
+            # put() で待っている抽出側が止まらないよう、終了の合図まで読み捨てる
+            while item is not _DONE and item is not _ABORT:
+                item = self._queue.get()
+        finally:
+            if self._ndjson_file is not None and not self._completed:
+                # 途中までしか書き出していないndjsonは残さない（既存のファイルはそのまま）
+                self._ndjson_file.discard()
+
+    def _add(self, batch):
+        """ツイートの本文を整形し、ndjsonは書き出し、txt・jsonは変換しておく"""
+        for tweet in batch:
+            formatted_text = format_tweet_text(tweet.get('text', ''))
+            self.tweets.append(tweet)
+            self.formatted_texts.append(formatted_text)
+            if self.txt_path:
+                self._txt_entries.append(format_txt_entry(tweet, formatted_text))
+        if self.ndjson:
+            lines = ''.join(ndjson_line(tweet) for tweet in batch)
+            if self.stream is not None:
+                self.stream.write(lines)
+                self.stream.flush()
+            elif self.json_path:
+                if self._ndjson_file is None:
+                    self._ndjson_file = AtomicFile(self.json_path, 'w', encoding='utf-8')
+                self._ndjson_file.write(lines)
+        elif self.json_path:
+            # まとめてJSONの配列に変換し、括弧を除いて {"tweets": [...]} の要素にする
+            # （字下げする場合は1段深くする。JSONの文字列中の改行はエスケープされている）
+            items = json_backend.dumps_bytes(batch, indent=self.indent, default=tweet_json_default)
+            if self.indent:
+                items = b'  ' + items[2:-2].replace(b'\n', b'\n  ')
+            else:
+                items = items[1:-1]
+            self._json_items.append(items)
+
+    def _write_files(self):
+        """件数が確定したtxt・jsonを書き出す（ツイートがない場合は書き出さない）"""
+        if not self.tweets:
+            return
+        now = datetime.now()
+        if self.txt_path:
+            data = ''.join([
+                f"抽出日時: {now.strftime('%Y-%m-%d %H:%M:%S')}\n",
+                f"抽出ツイート数: {len(self.tweets)}\n",
+                "=" * 50 + "\n",
+                *self._txt_entries,
+            ])
+            if not write_if_changed(self.txt_path, data, _TXT_VOLATILE_PREFIX):
+                self.unchanged_paths.append(self.txt_path)
+        if self.json_path and not self.ndjson:
+            # {'extraction_time', 'tweet_count', 'tweets'} を json_backend.dump と同じ形で書き出す
+            head = json_backend.dumps_bytes({'extraction_time': now.isoformat(), 'tweet_count': len(self.tweets)}, indent=self.indent)
+            if self.indent:
+                data = b''.join([head[:-2], b',\n  "tweets": [\n', b',\n'.join(self._json_items), b'\n  ]\n}'])
+            else:
+                data = b''.join([head[:-1], b',"tweets":[', b','.join(self._json_items), b']}'])
+            if not write_if_changed(self.json_path, data, _JSON_VOLATILE_PREFIX):
+                self.unchanged_paths.append(self.json_path)
+
+    def _upsert_store(self):
+        """書き出したツイートをストアに保存する（失敗してもファイルの書き出しは取り消さず、close() で警告する）"""
+        if not self.store_path or not self.tweets:
+            return
+        source_file = os.path.basename(self.txt_path) if self.txt_path else None
+        try:
+            self.store_count = tweet_store.upsert_tweets(self.tweets, self.keyword_type, source_file, self.store_path)
+        except (sqlite3.Error, OSError) as e:
+            self._store_error = e
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+出力ファイルの原子的な書き出しのテスト
+"""
+
+import unittest
+import os
+import re
+import sys
+import tempfile
+import shutil
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.atomic_file import AtomicFile, write_if_changed
+
+class TestAtomicFile(unittest.TestCase):
+    """原子的な書き出しのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'out.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def set_old_mtime(self):
+        os.utime(self.path, (1000000000, 1000000000))
+
+    def test_write_if_changed(self):
+        """内容が同じ場合は書き換えず、更新日時も変えないことを確認"""
+        self.assertTrue(write_if_changed(self.path, '本文'))
+        self.set_old_mtime()
+        self.assertFalse(write_if_changed(self.path, '本文'.encode('utf-8')))
+        self.assertEqual(os.path.getmtime(self.path), 1000000000)
+
+        self.assertTrue(write_if_changed(self.path, '本文2'))
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '本文2')
+        self.assertEqual(os.listdir(self.temp_dir), ['out.txt'])
+
+    def test_volatile_prefix(self):
+        """先頭の抽出日時だけが違う場合は書き換えないことを確認"""
+        volatile_prefix = re.compile(rb'time: [^\n]*\n')
+        write_if_changed(self.path, 'time: 1\nbody\n', volatile_prefix)
+        self.set_old_mtime()
+        self.assertFalse(write_if_changed(self.path, 'time: 2\nbody\n', volatile_prefix))
+        self.assertTrue(write_if_changed(self.path, 'time: 3\nbody2\n', volatile_prefix))
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'time: 3\nbody2\n')
+
+    def test_atomic_file(self):
+        """一時ファイルに書き込み、例外で抜けた場合は既存のファイルを残すことを確認"""
+        with AtomicFile(self.path, 'w', encoding='utf-8') as f:
+            f.write('1行目\n')
+            self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(f.changed)
+
+        with self.assertRaises(RuntimeError):
+            with AtomicFile(self.path, 'w', encoding='utf-8') as f:
+                f.write('書きかけ')
+                raise RuntimeError('中断')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '1行目\n')
+
+        self.set_old_mtime()
+        with AtomicFile(self.path, 'w', encoding='utf-8') as f:
+            f.write('1行目\n')
+        self.assertFalse(f.changed)
+        self.assertEqual(os.path.getmtime(self.path), 1000000000)
+        self.assertEqual(os.listdir(self.temp_dir), ['out.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+一括抽出のテスト
+"""
+
+import unittest
+import os
+import sys
+import json
+import tempfile
+import shutil
+from unittest import mock
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.batch_extract import find_html_files, run_batch_extract, to_yymmdd
+
+TWEET_HTML = """<html><body>
+    <article data-testid="tweet">
+        <a href="/user1/status/{date}"><time datetime="2025-07-01T03:44:35.000Z"></time></a>
+        <div data-testid="tweetText">{date} のツイート</div>
+    </article>
+</body></html>"""
+
+class TestBatchExtract(unittest.TestCase):
+    """一括抽出のテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+
+        # 入力フォルダ（data/input/thai/YYMMDD.html）を作成
+        os.makedirs('data/input/thai')
+        for date_str in ('250630', '250701', '250702'):
+            with open(f'data/input/thai/{date_str}.html', 'w', encoding='utf-8') as f:
+                f.write(TWEET_HTML.format(date=date_str))
+        with open('data/input/thai/memo.html', 'w', encoding='utf-8') as f:
+            f.write('<html></html>')
+
+        # 250630 は抽出済み
+        os.makedirs('data/output/thai/json')
+        with open('data/output/thai/json/250630.json', 'w', encoding='utf-8') as f:
+            f.write('[]')
+
+        self.config_patch = mock.patch.multiple('config', PLAN_CACHE_PATH=os.path.join(self.temp_dir, 'plans.json'),
+                                                RESULT_CACHE_DIR=os.path.join(self.temp_dir, 'results'))
+        self.config_patch.start()
+
+    def tearDown(self):
+        self.config_patch.stop()
+        os.chdir(self.old_cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_find_html_files(self):
+        """日付範囲・未抽出でHTMLファイルを絞り込めることを確認"""
+        dates = lambda files: [date_str for date_str, _ in files]
+        self.assertEqual(dates(find_html_files('thai')), ['250630', '250701', '250702'])
+        self.assertEqual(dates(find_html_files('thai', since='250701')), ['250701', '250702'])
+        self.assertEqual(dates(find_html_files('thai', until='250701')), ['250630', '250701'])
+        self.assertEqual(dates(find_html_files('thai', pending_only=True)), ['250701', '250702'])
+        self.assertEqual(find_html_files('en'), [])
+        self.assertEqual(to_yymmdd('2025-07-01'), '250701')
+
+    def test_run_batch_extract(self):
+        """未抽出のファイルを複数プロセスで抽出し、txt/json を保存することを確認"""
+        self.assertTrue(run_batch_extract(['thai'], pending_only=True, jobs=2))
+
+        for date_str in ('250701', '250702'):
+            with open(f'data/output/thai/json/{date_str}.json', encoding='utf-8') as f:
+                tweets = json.load(f)['tweets']
+            self.assertEqual(tweets[0]['text'], f'{date_str} のツイート')
+            self.assertTrue(os.path.exists(f'data/output/thai/txt/{date_str}.txt'))
+
+        # 抽出済みのファイルは対象にならない
+        with open('data/output/thai/json/250630.json', encoding='utf-8') as f:
+            self.assertEqual(f.read(), '[]')
+        self.assertEqual(find_html_files('thai', pending_only=True), [])
+
+    def test_run_batch_extract_options(self):
+        """抽出オプションがファイルごとの抽出に渡されることを確認"""
+        self.assertTrue(run_batch_extract(['thai'], since='250701', until='250701', jobs=1, use_cache=False,
+                                          stream=True, restrict=True, capture_raw_html=True))
+        with open('data/output/thai/json/250701.json', encoding='utf-8') as f:
+            tweets = json.load(f)['tweets']
+        self.assertEqual(tweets[0]['raw_html_offset'], TWEET_HTML.format(date='250701').encode('utf-8').index(b'<article'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+詳細ページの本文抽出のテスト
+"""
+
+import unittest
+import os
+import sys
+import re
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+from src.detail_page import extract_focal_tweet_text, normalize_detail_text
+
+class TestDetailPage(unittest.TestCase):
+    """詳細ページの本文抽出のテストクラス"""
+
+    def test_normalize_detail_text(self):
+        """1回の走査での整形が、従来の置換を順に行った結果と一致することを確認"""
+        def normalize_in_passes(text):
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+            text = re.sub(r'[ \t]+\n', '\n', text)
+            text = re.sub(r'\n{3,}', '\n\n', text)
+            text = re.sub(r'[ \t]{2,}', ' ', text)
+            return re.sub(r' ?\n ?', '\n', text).strip()
+
+        samples = [
+            '  本文 \r\n\r\n\r\n  2行目\t\t終わり ',
+            'a \n \n \n\tb',
+            'a\n\tb\r\rc\r\n \t d',
+            'a  \t b\n\n\n\n\nc\n ',
+        ]
+        for text in samples:
+            self.assertEqual(normalize_detail_text(text), normalize_in_passes(text))
+
+    def test_extract_focal_tweet_text(self):
+        """コメント・script内の記述を除いた最初の本文要素だけを取り出すことを確認"""
+        html = """<html><head><script>var s = '<div data-testid="tweetText">script内</div>';</script></head><body>
+            <!-- <div data-testid="tweetText">コメント内</div> -->
+            <article data-testid="tweet">
+                <div lang="ja" data-testid="tweetText">  詳細ページの<span>全文</span>&amp;<div>入れ子</div>\r\n\r\n\r\n  続き  </div>
+            </article>
+            <article data-testid="tweet"><div data-testid="tweetText">返信</div></article>
+        </body></html>"""
+        expected = BeautifulSoup(html, 'html.parser').select('[data-testid="tweetText"]')[0].get_text(separator='\n')
+        self.assertEqual(extract_focal_tweet_text(html), normalize_detail_text(expected))
+        self.assertEqual(extract_focal_tweet_text(html), '詳細ページの\n全文\n&\n入れ子\n\n続き')
+
+        # 閉じられていない本文要素は文書全体をパースして取り出す
+        self.assertEqual(extract_focal_tweet_text('<div data-testid="tweetText">閉じていない<div>本文'), '閉じていない\n本文')
+        self.assertIsNone(extract_focal_tweet_text('<html><body><div data-testid="tweet">本文なし</div></body></html>'))
+
+if __name__ == '__main__':
+    unittest.main()
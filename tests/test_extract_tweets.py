@@ -8,13 +8,25 @@ import os
 import sys
 import tempfile
 import shutil
+import mmap
+import io
+import json
 from datetime import datetime
+from unittest import mock
 
 # srcフォルダをパスに追加
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from extract_tweets_from_html import (
+    extract_tweet_url,
     extract_tweets_from_html,
+    extract_tweets_from_html_with_detail_pages,
+    iter_tweets_for_output,
+    iter_tweets_from_html,
+    load_raw_html,
+    save_tweets_to_files,
+    restrict_to_tweet_markup,
+    verify_scan_extraction,
     format_tweet_text
 )
 
@@ -71,6 +83,408 @@ class TestTweetExtraction(unittest.TestCase):
         self.assertIn('datetime', first_tweet)
         self.assertEqual(first_tweet['text'], 'テストツイート1')
 
+    def test_engines_return_same_tweets(self):
+        """lxmlエンジンとBeautifulSoupエンジンの抽出結果が一致することを確認"""
+        html = """
+        <html><body>
+            <article data-testid="tweet">
+                <div data-testid="User-Name"><a href="/user1"><span>ユーザー1</span></a><span>@user1</span></div>
+                <a href="/user1/status/111"><time datetime="2025-06-15T03:44:35.000Z">6月15日</time></a>
+                <div data-testid="tweetText"><span>本文 </span><a href="https://t.co/abc">example.com</a></div>
+                <button data-testid="tweet-text-show-more-link">さらに表示</button>
+            </article>
+            <article data-testid="tweet">
+                <span dir="auto">テキスト要素のない代替本文です</span>
+            </article>
+        </body></html>
+        """
+        html_file = os.path.join(self.temp_dir, "engines.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        for func in (extract_tweets_from_html, extract_tweets_from_html_with_detail_pages):
+            lxml_tweets = func(html_file, engine='lxml')
+            bs4_tweets = func(html_file, engine='bs4')
+            self.assertEqual(lxml_tweets, bs4_tweets)
+
+        tweets = extract_tweets_from_html_with_detail_pages(html_file, engine='lxml')
+        self.assertEqual(tweets[0]['user_name'], 'ユーザー1')
+        self.assertEqual(tweets[0]['text'], '本文 example.com https://t.co/abc')
+        self.assertEqual(tweets[0]['datetime'], '2025/06/15 12:44:35')
+        self.assertEqual(tweets[0]['quote_url'], 'https://x.com/user1/status/111')
+        # Snowflake IDでないため、投稿時刻はtime要素の日時から求める
+        self.assertEqual(tweets[0]['status_id'], 111)
+        self.assertEqual(tweets[0]['epoch_ms'], 1749959075000)
+        self.assertTrue(tweets[0]['has_show_more'])
+        self.assertEqual(tweets[1]['text'], 'テキスト要素のない代替本文です')
+
+    def test_extract_tweet_url(self):
+        """1回の走査で集めたリンクからツイートURLを決定できることを確認"""
+        from bs4 import BeautifulSoup
+        from lxml import etree
+        html = """<article data-testid="tweet">
+            <a href="/user1">ユーザー1</a>
+            <a href="https://t.co/xyz">t.co</a>
+            <a href="/user1/status/222"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+        </article>"""
+        bs4_element = BeautifulSoup(html, 'html.parser').select_one('article')
+        lxml_element = etree.fromstring(html, etree.HTMLParser()).find('.//article')
+        self.assertEqual(extract_tweet_url(bs4_element), 'https://x.com/user1/status/222')
+        self.assertEqual(extract_tweet_url(lxml_element), 'https://x.com/user1/status/222')
+
+    def test_stream_extraction(self):
+        """逐次パースの結果が文書全体のパースと一致することを確認（引用ツイートの入れ子を含む）"""
+        html = """<html><body>
+            <article data-testid="tweet">
+                <div data-testid="tweetText">外側のツイート</div>
+                <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                <div role="link"><article data-testid="tweet">
+                    <div data-testid="tweetText">引用されたツイート</div>
+                    <a href="/user2/status/2"></a>
+                </article></div>
+            </article>
+            <article data-testid="tweet"><div data-testid="tweetText">3件目</div></article>
+        </body></html>"""
+        html_file = os.path.join(self.temp_dir, "stream.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        expected = extract_tweets_from_html(html_file)
+        streamed = extract_tweets_from_html(html_file, stream=True)
+        self.assertEqual(streamed, expected)
+        self.assertEqual([t['text'] for t in streamed][:2], ['外側のツイート', '引用されたツイート'])
+        self.assertEqual([t['id'] for t in streamed], [1, 2, 3])
+
+        # 上限件数で終了
+        limited = list(iter_tweets_from_html(html_file, max_tweets=2))
+        self.assertEqual([t['id'] for t in limited], [1, 2])
+
+        # ツイート要素のないHTMLは文書全体のパースにフォールバック
+        self.assertEqual(extract_tweets_from_html(self.test_html_file, stream=True)[0]['text'], 'テストツイート1')
+
+    def test_restricted_parse(self):
+        """article要素の範囲だけをパースした結果が文書全体のパースと一致することを確認"""
+        html = """<html><head>
+            <style>.r-1 { color: red; }</style>
+            <script>var s = "<article data-testid='tweet'>偽物</article>";</script>
+        </head><body>
+            <nav><a href="/home"><span>ホーム</span></a></nav>
+            <!-- <article data-testid="tweet">コメント内</article> -->
+            <div data-testid="cellInnerDiv"><article data-testid="tweet">
+                <div data-testid="tweetText">本文1</div>
+                <div role="link"><article data-testid="tweet"><div data-testid="tweetText">引用</div></article></div>
+            </article></div>
+            <article data-testid="tweet"><div data-testid="tweetText">本文2</div></article>
+        </body></html>"""
+        html_file = os.path.join(self.temp_dir, "restrict.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        restricted = restrict_to_tweet_markup(html)
+        self.assertNotIn('<nav>', restricted)
+        self.assertNotIn('偽物', restricted)
+        self.assertNotIn('コメント内', restricted)
+        self.assertEqual(restricted.count('<article'), 3)
+
+        for engine in ('lxml', 'bs4'):
+            expected = extract_tweets_from_html(html_file, engine=engine)
+            restricted_tweets = extract_tweets_from_html(html_file, engine=engine, restrict=True)
+            self.assertEqual(restricted_tweets, expected)
+            self.assertEqual([t['text'] for t in restricted_tweets], ['本文1', '引用', '本文2'])
+
+        # article[data-testid="tweet"] がない場合は文書全体をパースする
+        div_html = '<html><body><article><p>外側</p></article><div data-testid="tweet"><div data-testid="tweetText">div本文</div></div></body></html>'
+        div_file = os.path.join(self.temp_dir, "div.html")
+        with open(div_file, 'w', encoding='utf-8') as f:
+            f.write(div_html)
+        self.assertEqual(extract_tweets_from_html(div_file, restrict=True)[0]['text'], 'div本文')
+        self.assertIsNone(restrict_to_tweet_markup('<html><body><div>なし</div></body></html>'))
+
+        # ツイートURLが time要素の親（article要素の外）のリンクで決まる場合も文書全体をパースする
+        wrapped_html = html.replace('<div data-testid="tweetText">本文2</div>',
+                                    '<time datetime="2025-06-15T03:44:35.000Z"></time><div data-testid="tweetText">本文2</div>')
+        wrapped_html = wrapped_html.replace('<article data-testid="tweet"><time', '<a href="/user2/status/2"><article data-testid="tweet"><time')
+        wrapped_html = wrapped_html.replace('本文2</div></article>', '本文2</div></article></a>')
+        self.assertIsNone(restrict_to_tweet_markup(wrapped_html))
+        wrapped_file = os.path.join(self.temp_dir, "wrapped.html")
+        with open(wrapped_file, 'w', encoding='utf-8') as f:
+            f.write(wrapped_html)
+        for engine in ('lxml', 'bs4'):
+            expected = extract_tweets_from_html(wrapped_file, engine=engine)
+            self.assertEqual(expected[-1]['quote_url'], 'https://x.com/user2/status/2')
+            self.assertEqual(extract_tweets_from_html(wrapped_file, engine=engine, restrict=True), expected)
+
+    def test_scan_engine(self):
+        """高速パス（scan）の抽出結果がDOMによる抽出と一致することを確認"""
+        html = """<html><body>
+            <article data-testid="tweet">
+                <div data-testid="User-Name"><span>ユーザー1</span></div>
+                <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z">6月15日</time></a>
+                <div data-testid="tweetText">本文 &amp; リンク<!-- c --><a href="https://example.com/x">example.com/x</a></div>
+                <div role="link"><article data-testid="tweet"><div data-testid="tweetText">引用</div></article></div>
+            </article>
+            <article data-testid="tweet">
+                <a href="/user2/status/2"><time datetime="2025-06-14T01:02:03.000Z"></time></a>
+                <div data-testid="tweetText">処理命令<?pi ?>入り</div>
+            </article>
+            <article data-testid="tweet"><span dir="auto">tweetTextのないツイートの本文</span></article>
+            <a href="/user3/status/3"><article data-testid="tweet">
+                <time datetime="2025-06-13T01:02:03.000Z"></time>
+                <div data-testid="tweetText">リンクに囲まれたツイート</div>
+            </article></a>
+            <a href="/user4/status/4"><div><article data-testid="tweet">
+                <time datetime="2025-06-12T01:02:03.000Z"></time>
+                <div data-testid="tweetText">リンクに囲まれた処理命令<?pi ?>入り</div>
+            </article></div></a>
+        </body></html>"""
+        html_file = os.path.join(self.temp_dir, "scan.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        for func in (extract_tweets_from_html, extract_tweets_from_html_with_detail_pages):
+            expected = func(html_file, engine='lxml')
+            self.assertEqual(func(html_file, engine='scan'), expected)
+            self.assertEqual(func(html_file, engine='scan', stream=True), expected)
+        self.assertEqual(len(expected), 6)
+        # time要素の親のリンク（ツイート要素の外）からツイートURLを決める
+        self.assertEqual([tweet['quote_url'] for tweet in expected[4:]], ['https://x.com/user3/status/3', 'https://x.com/user4/status/4'])
+        self.assertEqual(verify_scan_extraction(html_file, check_show_more=True), [])
+
+        # article[data-testid="tweet"] がない場合は文書全体をパースする
+        div_file = os.path.join(self.temp_dir, "scan_div.html")
+        with open(div_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body><div data-testid="tweet"><div data-testid="tweetText">div本文</div></div></body></html>')
+        self.assertEqual(extract_tweets_from_html(div_file, engine='scan')[0]['text'], 'div本文')
+
+    def test_duplicate_articles(self):
+        """同じツイートIDの要素と、代替セレクタで見つかった入れ子の要素を除くことを確認"""
+        article = '''<article data-testid="tweet">
+            <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+            <div data-testid="tweetText">ツイート{0}</div>
+        </article>'''
+        html_file = os.path.join(self.temp_dir, "duplicate.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body>' + article.format(1) + article.format(1) + article.format(2).replace('status/1', 'status/2') + '</body></html>')
+        with mock.patch('extract_tweets_from_html._PARALLEL_MIN_CHUNK_BYTES', 1):
+            for options in ({'engine': 'lxml'}, {'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}, {'workers': 2}):
+                tweets = extract_tweets_from_html(html_file, **options)
+                self.assertEqual([(t['id'], t['status_id']) for t in tweets], [(1, 1), (3, 2)])
+
+        # 代替セレクタ（article）では、引用ツイートの入れ子の要素を別のツイートとして数えない
+        nested_file = os.path.join(self.temp_dir, "nested.html")
+        with open(nested_file, 'w', encoding='utf-8') as f:
+            f.write('''<html><body><article>
+                <a href="/user1/status/1"></a><span dir="auto">外側のツイートの本文です</span>
+                <article><a href="/user2/status/2"></a><span dir="auto">引用されたツイートの本文</span></article>
+            </article></body></html>''')
+        for engine in ('lxml', 'bs4'):
+            tweets = extract_tweets_from_html(nested_file, engine=engine)
+            self.assertEqual([t['status_id'] for t in tweets], [1])
+
+    def test_fields_projection(self):
+        """指定した項目だけを出力し、抽出されるツイートは変わらないことを確認"""
+        html_file = os.path.join(self.temp_dir, "fields.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('''<html><body>
+                <article data-testid="tweet">
+                    <div data-testid="User-Name"><span>ユーザー1</span></div>
+                    <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                    <div data-testid="tweetText">  本文  <a href="https://example.com/x">x</a></div>
+                </article>
+                <article data-testid="tweet"><div data-testid="tweetText"> </div></article>
+                <article data-testid="tweet"><div data-testid="tweetText"> </div><a href="https://t.co/abc">t.co</a></article>
+            </body></html>''')
+
+        for options in ({'engine': 'lxml'}, {'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}):
+            expected = extract_tweets_from_html(html_file, **options)
+            tweets = extract_tweets_from_html(html_file, fields=['status_id', 'datetime'], **options)
+            self.assertEqual([t.to_dict() for t in tweets],
+                             [{'id': t['id'], 'datetime': t['datetime'], 'status_id': t['status_id']} for t in expected])
+            self.assertEqual([t['id'] for t in tweets], [1, 3])
+
+        with self.assertRaises(ValueError):
+            extract_tweets_from_html(html_file, fields=['timestamp'])
+
+    def test_handle_reactions_and_media(self):
+        """ハンドル・反応数・添付メディアのURLを同じ走査で抽出できることを確認"""
+        html_file = os.path.join(self.temp_dir, "reactions.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('''<html><body>
+                <article data-testid="tweet">
+                    <img src="https://pbs.twimg.com/profile_images/1/a_normal.jpg">
+                    <div data-testid="User-Name"><a href="/user1"><span><span>ユーザー1</span></span></a><a href="/user1"><span>@user1</span></a></div>
+                    <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                    <div data-testid="tweetText">本文</div>
+                    <div data-testid="tweetPhoto"><img src="https://pbs.twimg.com/media/G1?format=jpg&amp;name=small"></div>
+                    <div data-testid="videoPlayer"><video poster="https://pbs.twimg.com/ext_tw_video_thumb/2/pu/img/v.jpg" src="blob:https://x.com/v"></video></div>
+                    <div role="group">
+                        <button data-testid="reply" aria-label="1,234 件の返信。返信する"><span>1,234</span></button>
+                        <button data-testid="retweet" aria-label="リポスト"><span>1.2万</span></button>
+                        <button data-testid="unlike" aria-label="いいね済み"></button>
+                    </div>
+                </article>
+                <article data-testid="tweet"><div data-testid="tweetText">反応数のボタンがないツイート</div></article>
+            </body></html>''')
+
+        expected = extract_tweets_from_html(html_file, engine='lxml')
+        for options in ({'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}):
+            self.assertEqual(extract_tweets_from_html(html_file, **options), expected)
+        self.assertEqual(verify_scan_extraction(html_file), [])
+
+        self.assertEqual(expected[0]['user_name'], 'ユーザー1')
+        self.assertEqual(expected[0]['handle'], '@user1')
+        self.assertEqual((expected[0]['reply_count'], expected[0]['retweet_count'], expected[0]['like_count']), (1234, 12000, 0))
+        self.assertEqual(expected[0]['media_urls'], ['https://pbs.twimg.com/media/G1?format=jpg&name=small',
+                                                     'https://pbs.twimg.com/ext_tw_video_thumb/2/pu/img/v.jpg'])
+        self.assertEqual(expected[1]['handle'], '')
+        self.assertIsNone(expected[1]['like_count'])
+        self.assertEqual(expected[1]['media_urls'], [])
+
+        tweets = extract_tweets_from_html(html_file, fields=['handle', 'like_count'])
+        self.assertEqual(tweets[0].to_dict(), {'id': 1, 'handle': '@user1', 'like_count': 0})
+
+    def test_quoted_tweet_reactions_and_media(self):
+        """引用ツイート（入れ子のツイート要素）の反応数・メディアを外側のツイートに含めないことを確認"""
+        html_file = os.path.join(self.temp_dir, "quoted.html")
+        quoted = '''
+            <a href="/user2/status/{id}"><time datetime="2025-06-14T03:44:35.000Z"></time></a>
+            <div data-testid="tweetText">引用元の本文{id}</div>
+            <img src="https://pbs.twimg.com/media/Q{id}?format=jpg&amp;name=small">
+            <button data-testid="reply" aria-label="5 件の返信"></button>
+            <button data-testid="like" aria-label="7 件のいいね"></button>'''
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(f'''<html><body>
+                <article data-testid="tweet">
+                    <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                    <div data-testid="tweetText">引用した本文</div>
+                    <article data-testid="tweet">{quoted.format(id=2)}</article>
+                    <button data-testid="like" aria-label="3 件のいいね"></button>
+                </article>
+                <article data-testid="tweet">
+                    <a href="/user3/status/3"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                    <div data-testid="tweetText">div の引用</div>
+                    <div data-testid="tweet">{quoted.format(id=4)}</div>
+                </article>
+            </body></html>''')
+
+        expected = extract_tweets_from_html(html_file, engine='lxml')
+        for options in ({'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}):
+            self.assertEqual(extract_tweets_from_html(html_file, **options), expected)
+        self.assertEqual(verify_scan_extraction(html_file), [])
+
+        by_text = {tweet['text']: tweet for tweet in expected}
+        for text, counts in (('引用した本文', (None, 3, [])), ('div の引用', (None, None, [])),
+                             ('引用元の本文2', (5, 7, ['https://pbs.twimg.com/media/Q2?format=jpg&name=small']))):
+            tweet = by_text[text]
+            self.assertEqual((tweet['reply_count'], tweet['like_count'], tweet['media_urls']), counts)
+
+    def test_parallel_extraction(self):
+        """並列パースの結果（id・バイトオフセットを含む）が1プロセスの抽出と一致することを確認"""
+        articles = []
+        for i in range(6):
+            articles.append(f'''<article data-testid="tweet">
+                <a href="/user{i}/status/{i}"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                <div data-testid="tweetText">ツイート{i}</div>
+                <div role="link"><article data-testid="tweet"><div data-testid="tweetText">引用{i}</div></article></div>
+            </article>''')
+            articles.append('<nav><article>ツイートではないarticle</article></nav>')
+        articles.append('<article data-testid="tweet"><div>本文なし</div></article>')
+        articles.append('<article data-testid="tweet"><div data-testid="tweetText">最後のツイート</div></article>')
+        html_file = os.path.join(self.temp_dir, "parallel.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body>' + '\n'.join(articles) + '</body></html>')
+
+        # 小さなHTMLでも分割されるよう、チャンクの最小サイズを下げる
+        with mock.patch('extract_tweets_from_html._PARALLEL_MIN_CHUNK_BYTES', 1):
+            for engine in ('lxml', 'bs4', 'scan'):
+                expected = extract_tweets_from_html_with_detail_pages(html_file, engine=engine, capture_raw_html=True)
+                parallel = extract_tweets_from_html_with_detail_pages(html_file, engine=engine, capture_raw_html=True, workers=2)
+                self.assertEqual(parallel, expected)
+            self.assertEqual([t['id'] for t in parallel][-3:], [11, 12, 14])
+            self.assertEqual(len(extract_tweets_from_html(html_file, workers=2, max_tweets=3)), 3)
+
+            # ツイートURLのリンクが article要素の外にある場合は分割しない
+            wrapped_file = os.path.join(self.temp_dir, "parallel_wrapped.html")
+            with open(wrapped_file, 'w', encoding='utf-8') as f:
+                f.write('<html><body>' + '\n'.join(
+                    f'<a href="/user{i}/status/{i}"><article data-testid="tweet"><time datetime="2025-06-15T03:44:35.000Z"></time>'
+                    f'<div data-testid="tweetText">ツイート{i}</div></article></a>' for i in range(4)) + '</body></html>')
+            for engine in ('lxml', 'scan'):
+                parallel = extract_tweets_from_html(wrapped_file, engine=engine, workers=2)
+                self.assertEqual([t['quote_url'] for t in parallel], [f'https://x.com/user{i}/status/{i}' for i in range(4)])
+
+    def test_capture_raw_html(self):
+        """raw_htmlは既定では記録せず、指定時はソース上の位置から読み込めることを確認"""
+        html = """<html><head><script>var s = "<article data-testid='tweet'>";</script></head><body>
+            <!-- <article data-testid="tweet"> -->
+            <article><p>ツイート以外</p></article>
+            <article data-testid="tweet">
+                <div data-testid="tweetText">日本語の本文</div>
+                <div role="link"><article data-testid="tweet"><div data-testid="tweetText">引用</div></article></div>
+            </article>
+        </body></html>"""
+        html_file = os.path.join(self.temp_dir, "raw.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        tweets = extract_tweets_from_html(html_file)
+        self.assertNotIn('raw_html', tweets[0])
+        self.assertNotIn('raw_html_offset', tweets[0])
+        self.assertEqual(load_raw_html(html_file, tweets[0]), '')
+
+        for options in ({'engine': 'lxml'}, {'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}, {'restrict': True}):
+            tweets = extract_tweets_from_html(html_file, capture_raw_html=True, **options)
+            self.assertEqual(len(tweets), 2)
+            self.assertTrue(load_raw_html(html_file, tweets[0]).startswith('<article data-testid="tweet">'))
+            self.assertIn('日本語の本文', load_raw_html(html_file, tweets[0]))
+            self.assertTrue(load_raw_html(html_file, tweets[1], 60).startswith('<article data-testid="tweet"><div data-testid="tweetText">引用'))
+
+    def test_bytes_and_mmap_input(self):
+        """パスの代わりにバイト列・メモリマップを渡しても同じツイートを抽出できることを確認"""
+        html = """<html><head><meta charset="shift_jis"></head><body>
+            <article data-testid="tweet">
+                <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                <div data-testid="tweetText">日本語の本文</div>
+            </article>
+            <article data-testid="tweet"><div data-testid="tweetText">二件目</div></article>
+        </body></html>"""
+        html_file = os.path.join(self.temp_dir, "bytes.html")
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        with open(html_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for options in ({'engine': 'lxml'}, {'engine': 'bs4'}, {'engine': 'scan'}, {'stream': True}, {'restrict': True}):
+                expected = extract_tweets_from_html(html_file, capture_raw_html=True, **options)
+                self.assertEqual([t['text'] for t in expected], ['日本語の本文', '二件目'])
+                for source in (html.encode('utf-8'), mapped):
+                    self.assertEqual(extract_tweets_from_html(source, capture_raw_html=True, **options), expected)
+            self.assertEqual(load_raw_html(mapped, expected[1], 40), load_raw_html(html_file, expected[1], 40))
+            self.assertEqual(verify_scan_extraction(mapped), [])
+
+    def test_ndjson_output(self):
+        """NDJSONを1行1件で書き出し、標準出力などにも書き出せることを確認"""
+        expected = [tweet.to_dict() for tweet in extract_tweets_from_html_with_detail_pages(self.test_html_file)]
+        self.assertEqual([tweet.to_dict() for tweet in iter_tweets_for_output(self.test_html_file)], expected)
+
+        # 書き出し先を指定した場合はファイルに保存しない
+        stream = io.StringIO()
+        tweets = save_tweets_to_files(iter_tweets_for_output(self.test_html_file), 'test', output_format='ndjson', stream=stream)
+        self.assertEqual(len(tweets), 2)
+        self.assertEqual([json.loads(line) for line in stream.getvalue().splitlines()], expected)
+
+        folders = {'txt': os.path.join(self.temp_dir, 'txt'), 'json': os.path.join(self.temp_dir, 'json')}
+        for folder in folders.values():
+            os.makedirs(folder)
+        with mock.patch('extract_tweets_from_html.config.get_prefix_folders', return_value=folders):
+            save_tweets_to_files(iter_tweets_for_output(self.test_html_file), 'test', output_format='ndjson')
+            # ツイートがない場合は何も保存しない
+            self.assertEqual(save_tweets_to_files(iter([]), 'empty', output_format='ndjson'), [])
+        with open(os.path.join(folders['json'], 'test.ndjson'), encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], expected)
+        with open(os.path.join(folders['txt'], 'test.txt'), encoding='utf-8') as f:
+            self.assertIn('抽出ツイート数: 2', f.read())
+        self.assertEqual(sorted(os.listdir(folders['json'])), ['test.ndjson'])
+
     def test_format_tweet_text(self):
         """ツイートテキストのフォーマットテスト"""
         test_text = "• 箇条書き1 • 箇条書き2 • 箇条書き3"
@@ -91,6 +505,12 @@ class TestTweetExtraction(unittest.TestCase):
         tweets = extract_tweets_from_html(empty_file)
         self.assertEqual(len(tweets), 0)
 
+        for engine in ('lxml', 'bs4'):
+            blank_file = os.path.join(self.temp_dir, "blank.html")
+            with open(blank_file, 'w', encoding='utf-8') as f:
+                f.write("")
+            self.assertEqual(extract_tweets_from_html(blank_file, engine=engine), [])
+
 class TestFileOperations(unittest.TestCase):
     """ファイル操作のテストクラス"""
 
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+抽出プラン（マークアップの種類の判定とキャッシュ）のテスト
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.extraction_plan import PlanCache, fingerprint_markup, plan_for_variant
+from src.extract_tweets_from_html import extract_tweets_from_html
+from src.tweet_selectors import reset_selector_stats, selector_stats
+
+class TestExtractionPlan(unittest.TestCase):
+    """抽出プランのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_html(self, name, body):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'<html><body>{body}</body></html>')
+        return path
+
+    def test_fingerprint_markup(self):
+        """ツイート要素と本文要素の書き方から種類を判定することを確認"""
+        article = self.write_html('article.html', '<article data-testid="tweet"><div data-testid="tweetText">本文</div></article>')
+        div = self.write_html('div.html', '<div class="x" data-testid="tweet"><span dir="auto">本文</span></div>')
+        empty = self.write_html('empty.html', '<p>ツイートなし</p>')
+
+        self.assertEqual(fingerprint_markup(article), 'tweet_article/tweetText')
+        self.assertEqual(fingerprint_markup(div), 'tweet_div/auto_spans')
+        self.assertIsNone(fingerprint_markup(empty))
+        # コメントや script 内の記述は数えない
+        hidden = self.write_html('hidden.html', '<!-- <article data-testid="tweet"> --><script>var s = \'<div data-testid="tweetText">\';</script>'
+                                                '<div role="article"><span dir="auto">本文</span></div>')
+        self.assertEqual(fingerprint_markup(hidden), 'role_article/auto_spans')
+        self.assertEqual(plan_for_variant('tweet_div/auto_spans'),
+                         {'variant': 'tweet_div/auto_spans', 'container': 'tweet_div', 'text': 'auto_spans'})
+        self.assertIsNone(plan_for_variant(None))
+
+    def test_plan_selects_only_planned_selectors(self):
+        """プランで決まったセレクタだけを評価することを確認"""
+        path = self.write_html('div.html', '<div data-testid="tweet"><span dir="auto">tweetTextのない画面構成の本文</span></div>')
+
+        reset_selector_stats()
+        tweets = extract_tweets_from_html(path, engine='lxml')
+        self.assertEqual([t['text'] for t in tweets], ['tweetTextのない画面構成の本文'])
+        stats = selector_stats()
+        self.assertEqual(stats['tweet_article']['calls'], 0)
+        self.assertEqual(stats['tweet_div']['calls'], 1)
+
+        # 判定を誤った場合はすべてのセレクタを順に試す
+        wrong_plan = plan_for_variant('tweet_article/tweetText')
+        tweets = extract_tweets_from_html(path, engine='lxml', plan=wrong_plan)
+        self.assertEqual(len(tweets), 1)
+
+    def test_plan_cache(self):
+        """判定結果とセレクタのマッチ数がファイルに保存されることを確認"""
+        path = self.write_html('article.html', '<article data-testid="tweet"><div data-testid="tweetText">本文</div></article>')
+        cache_path = os.path.join(self.temp_dir, 'cache', 'plans.json')
+
+        cache = PlanCache(cache_path)
+        plan = cache.plan_for(path)
+        before = selector_stats()
+        extract_tweets_from_html(path, plan=plan)
+        cache.record(plan, selector_stats(), before)
+        cache.save()
+
+        reloaded = PlanCache(cache_path)
+        self.assertEqual(reloaded.plan_for(path), plan)
+        self.assertEqual(reloaded.data['variants']['tweet_article/tweetText']['extractions'], 1)
+        self.assertEqual(reloaded.hit_rates('tweet_article/tweetText')['tweet_article'], 1.0)
+
+        # 一時ファイルから置き換え、内容が同じ場合は書き出さない
+        mtime = os.stat(cache_path).st_mtime_ns
+        reloaded.save()
+        self.assertEqual(os.stat(cache_path).st_mtime_ns, mtime)
+        self.assertEqual(os.listdir(os.path.dirname(cache_path)), ['plans.json'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+JSONの読み書きのテスト
+"""
+
+import unittest
+import io
+import os
+import sys
+import json
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import json_backend
+from src.tweet_record import Tweet, tweet_json_default
+
+class TestJsonBackend(unittest.TestCase):
+    """JSONの読み書きのテストクラス"""
+
+    def setUp(self):
+        self.original = json_backend.backend_name()
+        self.data = {'tweet_count': 1, 'tweets': [Tweet(id=1, text='日本語の本文 https://x.com/a', like_count=None, media_urls=[])]}
+
+    def tearDown(self):
+        json_backend.set_backend(self.original)
+
+    def available_backends(self):
+        return [name for name in json_backend.BACKENDS if json_backend.set_backend(name) == name]
+
+    def test_same_output_for_all_backends(self):
+        """どのライブラリでも標準の json と同じJSON（非ASCII文字はエスケープしない）になることを確認"""
+        expected = json.dumps(self.data, ensure_ascii=False, indent=2, default=tweet_json_default)
+        for backend in self.available_backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(json.loads(json_backend.dumps(self.data, indent=True, default=tweet_json_default)), json.loads(expected))
+                compact = json_backend.dumps(self.data, default=tweet_json_default)
+                self.assertNotIn('\n', compact)
+                self.assertIn('日本語の本文', compact)
+                self.assertEqual(json_backend.loads(compact.encode('utf-8')), json.loads(expected))
+
+        # 整形した出力は標準の json と同じ文字列になる
+        json_backend.set_backend('json')
+        self.assertEqual(json_backend.dumps(self.data, indent=True, default=tweet_json_default), expected)
+
+    def test_text_and_binary_files(self):
+        """テキスト・バイナリのどちらのファイルにも書き出し・読み込みできることを確認"""
+        for backend in self.available_backends():
+            with self.subTest(backend=backend):
+                text, binary = io.StringIO(), io.BytesIO()
+                json_backend.dump(self.data, text, default=tweet_json_default)
+                json_backend.dump(self.data, binary, default=tweet_json_default)
+                self.assertEqual(text.getvalue().encode('utf-8'), binary.getvalue())
+                binary.seek(0)
+                self.assertEqual(json_backend.load(binary)['tweets'][0]['text'], '日本語の本文 https://x.com/a')
+
+    def test_invalid_json_raises_value_error(self):
+        """不正なJSONは、どのライブラリでも ValueError になることを確認"""
+        for backend in self.available_backends():
+            with self.subTest(backend=backend):
+                with self.assertRaises(ValueError):
+                    json_backend.loads(b'{"tweets": [')
+
+    def test_unknown_backend(self):
+        """不明なライブラリ名は ValueError になることを確認"""
+        with self.assertRaises(ValueError):
+            json_backend.set_backend('simplejson')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,11 +9,13 @@ import sys
 import tempfile
 import shutil
 import csv
+import json
 
 # srcフォルダをパスに追加
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from merge_all_txt_to_csv import parse_txt_to_tweets
+from merge_all_txt_to_csv import dedupe_tweets, parse_ndjson_to_tweets, parse_txt_to_tweets
+from snowflake import TWITTER_EPOCH_MS, snowflake_epoch_ms, status_id_from_url, tweet_sort_key
 
 class TestCSVMerge(unittest.TestCase):
     """CSVマージ機能のテストクラス"""
@@ -76,6 +78,79 @@ class TestCSVMerge(unittest.TestCase):
         self.assertIn('テストツイート2', second_tweet['text'])
         self.assertIn('箇条書き3', second_tweet['text'])
 
+    def test_parse_handle_reactions_and_media(self):
+        """ハンドル・反応数・メディアの行を本文と区別して読み込むことを確認"""
+        txt_file = os.path.join(self.temp_dir, "reactions.txt")
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            f.write(f"""1.
+ユーザー名: ユーザー1
+ハンドル: @user1
+ツイートURL: https://x.com/user1/status/123456
+反応: 返信 1 / いいね 30
+メディア: https://pbs.twimg.com/media/a.jpg https://pbs.twimg.com/media/b.jpg
+本文
+{'-' * 30}
+""")
+        tweet = parse_txt_to_tweets(txt_file)[0]
+        self.assertEqual(tweet['handle'], '@user1')
+        self.assertEqual((tweet['reply_count'], tweet.get('retweet_count'), tweet['like_count']), (1, None, 30))
+        self.assertEqual(tweet['media_urls'], ['https://pbs.twimg.com/media/a.jpg', 'https://pbs.twimg.com/media/b.jpg'])
+        self.assertEqual(tweet['text'], '本文')
+
+    def test_parse_body_starting_with_header_prefix(self):
+        """本文が「ハンドル: 」「反応: 」「メディア: 」で始まる場合も本文として読み込むことを確認"""
+        txt_file = os.path.join(self.temp_dir, "body.txt")
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            f.write(f"""1.
+ユーザー名: ユーザー1
+ハンドル: @user1
+ツイートURL: https://x.com/user1/status/123456
+反応: いいね 30
+本文
+反応: 返信 5
+メディア: https://pbs.twimg.com/media/a.jpg
+{'-' * 30}
+2.
+ツイートURL: https://x.com/user2/status/789012
+メディア: 画像なし
+ハンドル: @user2
+{'-' * 30}
+3.
+ツイートURL: https://x.com/user3/status/345678
+反応: 返信 1 / いいね
+{'-' * 30}
+""")
+        first, second, third = parse_txt_to_tweets(txt_file)
+        self.assertEqual(first['handle'], '@user1')
+        self.assertEqual((first.get('reply_count'), first['like_count']), (None, 30))
+        self.assertNotIn('media_urls', first)
+        self.assertEqual(first['text'], '本文 反応: 返信 5 メディア: https://pbs.twimg.com/media/a.jpg')
+        self.assertNotIn('handle', second)
+        self.assertNotIn('media_urls', second)
+        self.assertEqual(second['text'], 'メディア: 画像なし ハンドル: @user2')
+        self.assertNotIn('reply_count', third)
+        self.assertEqual(third['text'], '反応: 返信 1 / いいね')
+
+    def test_parse_ndjson_to_tweets(self):
+        """ndjsonファイルを1行1件として読み込み、抽出時のURLをCSVのURLにすることを確認"""
+        ndjson_file = os.path.join(self.temp_dir, "test.ndjson")
+        records = [
+            {'id': 1, 'text': '本文1 ・箇条書き', 'datetime': '2025/06/15 12:44:35', 'quote_url': 'https://x.com/user1/status/123456',
+             'handle': '@user1', 'like_count': 30, 'media_urls': ['https://pbs.twimg.com/media/a.jpg']},
+            {'id': 2, 'text': '', 'quote_url': 'https://x.com/user2/status/789012'},  # 本文のないツイートは除く
+        ]
+        with open(ndjson_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records) + '\n')
+
+        tweets = parse_ndjson_to_tweets(ndjson_file)
+        self.assertEqual(len(tweets), 1)
+        tweet = tweets[0]
+        self.assertEqual(tweet['text'], '本文1 ・箇条書き')
+        self.assertEqual(tweet['url'], 'https://x.com/user1/status/123456')
+        self.assertEqual(tweet['status_id'], 123456)
+        self.assertEqual((tweet['handle'], tweet['like_count'], tweet['media_urls']), ('@user1', 30, ['https://pbs.twimg.com/media/a.jpg']))
+        self.assertEqual(tweet['source_file'], 'test.ndjson')
+
     def test_empty_txt_file(self):
         """空のtxtファイルのテスト"""
         empty_txt = os.path.join(self.temp_dir, "empty.txt")
@@ -95,6 +170,37 @@ class TestCSVMerge(unittest.TestCase):
         # 不正な形式でもエラーにならず、空のリストを返す
         self.assertIsInstance(tweets, list)
 
+class TestSortKeys(unittest.TestCase):
+    """ツイートID・投稿時刻による並べ替えと重複除去のテストクラス"""
+
+    def test_snowflake_epoch(self):
+        """Snowflake IDから投稿時刻を復元できることを確認"""
+        epoch_ms = 1749959075123  # 2025-06-15T03:44:35.123Z
+        status_id = ((epoch_ms - TWITTER_EPOCH_MS) << 22) | 12345
+        self.assertEqual(status_id_from_url(f'https://x.com/user/status/{status_id}'), status_id)
+        self.assertEqual(snowflake_epoch_ms(status_id), epoch_ms)
+        # Snowflake導入前の連番のIDは時刻を含まない
+        self.assertIsNone(snowflake_epoch_ms(123456))
+        self.assertIsNone(status_id_from_url('https://x.com/user'))
+
+    def test_sort_and_dedupe(self):
+        """投稿時刻の昇順に並べ、同じツイートIDを1件にすることを確認"""
+        new_id = ((1749959075000 - TWITTER_EPOCH_MS) << 22) | 1
+        old_id = ((1749872675000 - TWITTER_EPOCH_MS) << 22) | 1
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        txt_file = os.path.join(temp_dir, '250615.txt')
+        with open(txt_file, 'w', encoding='utf-8') as f:
+            for status_id, text in ((new_id, '新しい'), (old_id, '古い'), (new_id, '新しい（重複）')):
+                f.write(f"1.\nツイートURL: https://x.com/user/status/{status_id}\n{text}\n{'-' * 30}\n")
+            # ツイートIDのないツイートは日時の文字列から時刻を求める
+            f.write(f"2.\n日時: 2025/06/14 12:00:00\nIDなし\n{'-' * 30}\n")
+
+        tweets, duplicates = dedupe_tweets(parse_txt_to_tweets(txt_file))
+        tweets.sort(key=tweet_sort_key)
+        self.assertEqual(duplicates, 1)
+        self.assertEqual([t['text'] for t in tweets], ['IDなし', '古い', '新しい'])
+
 class TestCSVOutput(unittest.TestCase):
     """CSV出力のテストクラス"""
 
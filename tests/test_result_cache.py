@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+抽出結果のキャッシュのテスト
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from unittest import mock
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.extract_tweets_from_html import extract_tweets_from_html, extract_tweets_from_html_with_detail_pages
+from src.result_cache import ResultCache
+from src.tweet_selectors import selector_stats
+
+class TestResultCache(unittest.TestCase):
+    """抽出結果のキャッシュのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.temp_dir, 'results'))
+        self.html_file = os.path.join(self.temp_dir, 'tweets.html')
+        self.write_html('本文1')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_html(self, text):
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(f'''<html><body><article data-testid="tweet">
+                <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z"></time></a>
+                <div data-testid="tweetText">{text}</div>
+            </article></body></html>''')
+
+    def tweet_article_calls(self):
+        return selector_stats()['tweet_article']['calls']
+
+    def test_cached_results(self):
+        """HTMLが同じならパースせずに同じ結果を返し、内容が変われば再パースすることを確認"""
+        for func in (extract_tweets_from_html, extract_tweets_from_html_with_detail_pages):
+            expected = func(self.html_file, capture_raw_html=True)
+            self.assertEqual(func(self.html_file, capture_raw_html=True, cache=self.cache), expected)
+
+            calls = self.tweet_article_calls()
+            self.assertEqual(func(self.html_file, capture_raw_html=True, cache=self.cache), expected)
+            self.assertEqual(self.tweet_article_calls(), calls)
+
+        # 「さらに表示」の有無を記録する抽出とは別に保存する
+        self.assertNotIn('has_show_more', extract_tweets_from_html(self.html_file, cache=self.cache)[0])
+        self.assertIn('has_show_more', extract_tweets_from_html_with_detail_pages(self.html_file, cache=self.cache)[0])
+
+        self.write_html('本文2')
+        self.assertEqual(extract_tweets_from_html(self.html_file, cache=self.cache)[0]['text'], '本文2')
+
+    def test_extractor_version_invalidates(self):
+        """抽出処理のバージョンが変わると再パースすることを確認"""
+        extract_tweets_from_html(self.html_file, cache=self.cache)
+        calls = self.tweet_article_calls()
+        with mock.patch('src.result_cache._extractor_version', 'changed'):
+            extract_tweets_from_html(self.html_file, cache=self.cache)
+        self.assertGreater(self.tweet_article_calls(), calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+ツイートのレコードのテスト
+"""
+
+import unittest
+import os
+import sys
+import json
+import pickle
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tweet_record import Tweet, tweet_json_default
+
+class TestTweetRecord(unittest.TestCase):
+    """ツイートのレコードのテストクラス"""
+
+    def test_dict_compatible_access(self):
+        """辞書と同じように読み書きでき、未設定の項目はキーがない扱いになることを確認"""
+        tweet = Tweet(id=1, text='本文', quote_url='https://x.com/user1/status/1')
+        self.assertEqual(tweet['text'], '本文')
+        self.assertEqual(tweet.get('user_name', ''), '')
+        self.assertNotIn('has_show_more', tweet)
+        with self.assertRaises(KeyError):
+            tweet['has_show_more']
+
+        tweet['is_complete'] = True
+        tweet.setdefault('status_id', None)
+        self.assertEqual(list(tweet), ['id', 'text', 'quote_url', 'status_id', 'is_complete'])
+        self.assertEqual(tweet, {'id': 1, 'text': '本文', 'quote_url': 'https://x.com/user1/status/1', 'status_id': None, 'is_complete': True})
+        self.assertEqual(tweet.copy(), tweet)
+        self.assertEqual(pickle.loads(pickle.dumps(tweet)), tweet)
+
+        # 定義されていない項目は設定できない
+        with self.assertRaises(KeyError):
+            tweet['timestamp'] = 0
+        self.assertIsNone(tweet.get('keys'))
+
+    def test_json_serialization(self):
+        """JSONに項目の順で保存できることを確認"""
+        tweet = Tweet(user_name='ユーザー1', text='本文', id=1)
+        self.assertEqual(json.dumps([tweet], ensure_ascii=False, default=tweet_json_default),
+                         '[{"id": 1, "text": "本文", "user_name": "ユーザー1"}]')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+高速パス（DOMを構築しない抽出）のテスト
+"""
+
+import unittest
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tweet_scanner import scan_tweet_articles
+
+class TestTweetScanner(unittest.TestCase):
+    """高速パスのテストクラス"""
+
+    def scan(self, html):
+        return [article for _, _, articles in scan_tweet_articles(html.encode('utf-8')) for article in articles]
+
+    def test_scan_fields(self):
+        """入れ子のツイート要素を含めてフィールドを集めることを確認"""
+        html = """<html><body>
+            <!-- <article data-testid="tweet">コメント内</article> -->
+            <article data-testid="tweet">
+                <div data-testid="User-Name"><a href="/user1"><span>ユーザー<b>1</b></span></a><span>@user1</span></div>
+                <a href="/user1/status/1"><time datetime="2025-06-15T03:44:35.000Z">6月15日</time></a>
+                <div data-testid="tweetText">本文 &amp; <!-- c -->リンク<a href="https://t.co/abc">t.co/abc</a></div>
+                <button data-testid="tweet-text-show-more-link">さらに表示</button>
+                <div data-testid="tweetPhoto"><img alt="画像" src="https://pbs.twimg.com/media/G1?format=jpg&amp;name=small"></div>
+                <button data-testid="like" aria-label="いいね"><span>1.2万</span></button>
+                <div role="link"><article data-testid="tweet"><div data-testid="tweetText">引用</div></article></div>
+            </article>
+        </body></html>"""
+        articles = self.scan(html)
+        self.assertEqual(len(articles), 2)
+        self.assertEqual(html.encode('utf-8')[articles[0][0]:].split(b'>')[0], b'<article data-testid="tweet"')
+
+        fields = articles[0][1]
+        self.assertEqual(fields['user_name'], 'ユーザー1')
+        self.assertEqual(fields['text'], '本文 & リンクt.co/abc')
+        self.assertEqual(fields['links'], ['https://t.co/abc'])
+        self.assertEqual(fields['tco_links'], ['https://t.co/abc'])
+        self.assertEqual(fields['datetime'], '2025-06-15T03:44:35.000Z')
+        self.assertEqual(fields['hrefs'], ['/user1', '/user1/status/1', 'https://t.co/abc'])
+        self.assertTrue(fields['has_show_more'])
+        self.assertEqual(fields['handle'], '@user1')
+        self.assertEqual(fields['media_urls'], ['https://pbs.twimg.com/media/G1?format=jpg&name=small'])
+        self.assertEqual(fields['like_count'], 12000)
+        self.assertIsNone(fields['reply_count'])
+
+        quoted = articles[1][1]
+        self.assertEqual(quoted['text'], '引用')
+        self.assertIsNone(quoted['user_name'])
+        self.assertIsNone(quoted['datetime'])
+
+    def test_unscannable_articles(self):
+        """確実に解析できない要素はフィールドがNoneになることを確認"""
+        html = """<html><body>
+            <article data-testid="tweet"><div data-testid="tweetText">script<script>var a = "<div>";</script></div></article>
+            <article data-testid="tweet"><div data-testid="tweetText">閉じていない<div></div></article>
+            <article data-testid="tweet"><div data-testid="tweetText">正常</div></article>
+            <article data-testid="tweet"><div data-testid="tweetText">末尾"""
+        articles = self.scan(html)
+        self.assertEqual([fields is None for _, fields in articles], [True, True, False, True])
+        self.assertEqual(articles[2][1]['text'], '正常')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+セレクタ登録簿のテスト
+"""
+
+import unittest
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from src.tweet_selectors import SELECTORS, TWEET_SELECTOR_NAMES, selector_stats, reset_selector_stats
+
+class TestTweetSelectors(unittest.TestCase):
+    """セレクタ登録簿のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        reset_selector_stats()
+        self.html = """<html><body>
+            <article data-testid="tweet">
+                <div data-testid="User-Name"><span>ユーザー1</span><span>@user1</span></div>
+                <div data-testid="tweetText">本文<a href="https://t.co/abc">link</a></div>
+            </article>
+            <article data-testid="tweet"><div data-testid="tweetText">本文2</div></article>
+        </body></html>"""
+
+    def tearDown(self):
+        """テスト後のクリーンアップ"""
+        reset_selector_stats()
+
+    def test_css_and_xpath_match_same_elements(self):
+        """CSSセレクタとXPathが同じ要素にマッチすることを確認"""
+        soup = BeautifulSoup(self.html, 'html.parser')
+        root = etree.fromstring(self.html, etree.HTMLParser())
+        for name, selector in SELECTORS.items():
+            self.assertEqual(len(selector.select(soup)), len(selector.select(root)), name)
+
+    def test_select_one(self):
+        """select_oneが最初の要素を返すことを確認"""
+        soup = BeautifulSoup(self.html, 'html.parser')
+        root = etree.fromstring(self.html, etree.HTMLParser())
+        self.assertEqual(SELECTORS['user_name'].select_one(soup).get_text(), 'ユーザー1')
+        self.assertEqual(SELECTORS['user_name'].select_one(root).text, 'ユーザー1')
+        self.assertIsNone(SELECTORS['show_more'].select_one(root))
+
+    def test_stats(self):
+        """評価回数とマッチ数が集計されることを確認"""
+        root = etree.fromstring(self.html, etree.HTMLParser())
+        SELECTORS['tweet_article'].select(root)
+        SELECTORS['show_more'].select(root)
+
+        stats = selector_stats()
+        self.assertEqual(stats['tweet_article'], {'css': 'article[data-testid="tweet"]', 'calls': 1, 'hits': 2})
+        self.assertEqual(stats['show_more']['calls'], 1)
+        self.assertEqual(stats['show_more']['hits'], 0)
+
+        reset_selector_stats()
+        self.assertEqual(selector_stats()['tweet_article']['calls'], 0)
+
+    def test_tweet_selector_order(self):
+        """ツイート要素のセレクタが優先順に並んでいることを確認"""
+        self.assertEqual(TWEET_SELECTOR_NAMES[0], 'tweet_article')
+        for name in TWEET_SELECTOR_NAMES:
+            self.assertIn(name, SELECTORS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ツイートのSQLiteストアのテスト
+"""
+
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+import shutil
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import tweet_store
+from src.tweet_record import Tweet
+from src.tweet_writer import TweetWriter
+
+class TestTweetStore(unittest.TestCase):
+    """SQLiteストアのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'tweets.sqlite3')
+        # ツイートIDの大きい順（投稿時刻の新しい順）に並べる
+        self.tweets = [
+            Tweet(id=i, text=f"本文{i}", datetime='2025/06/15 12:44:35', quote_url=f"https://x.com/user{i % 2}/status/{1934000000000000000 - (i << 32)}",
+                  user_name=f"ユーザー{i % 2}", handle=f"@user{i % 2}", like_count=i, media_urls=[f"https://pbs.twimg.com/media/{i}.jpg"])
+            for i in range(1, 5)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_upsert_and_read(self):
+        """ツイートIDで更新・追加し、投稿時刻の昇順に読み込めることを確認"""
+        self.assertEqual(tweet_store.upsert_tweets(self.tweets, 'thai', '250615.txt', self.path), 4)
+        updated = Tweet(self.tweets[0])
+        updated['text'] = '詳細ページの全文'
+        updated['is_complete'] = True
+        self.assertEqual(tweet_store.upsert_tweets([updated, Tweet(id=9, text='URLなし')], 'thai', '250616.txt', self.path), 1)
+
+        tweets = list(tweet_store.iter_tweets('thai', path=self.path))
+        self.assertEqual([tweet['url'] for tweet in tweets], [tweet['quote_url'] for tweet in reversed(self.tweets)])
+        self.assertEqual(tweets[-1]['text'], '詳細ページの全文')
+        self.assertTrue(tweets[-1]['is_complete'])
+        self.assertEqual(tweets[-1]['source_file'], '250616.txt')
+        self.assertEqual(tweets[0]['media_urls'], ['https://pbs.twimg.com/media/4.jpg'])
+        self.assertEqual(tweets[0]['epoch_ms'], tweet_store.snowflake_epoch_ms(tweets[0]['status_id']))
+        self.assertNotIn('reply_count', tweets[0])
+
+        # キーワードタイプ・投稿時刻の範囲・ハンドルで絞り込む
+        self.assertEqual(list(tweet_store.iter_tweets('default', path=self.path)), [])
+        since_ms = tweets[1]['epoch_ms']
+        self.assertEqual(len(list(tweet_store.iter_tweets('thai', since_ms=since_ms, path=self.path))), 3)
+        self.assertEqual(len(list(tweet_store.iter_tweets('thai', until_ms=since_ms, path=self.path))), 1)
+        self.assertEqual([tweet['handle'] for tweet in tweet_store.iter_tweets('thai', handle='@user1', path=self.path)], ['@user1', '@user1'])
+
+    def test_upsert_projected_tweets(self):
+        """一部の項目だけ抽出したツイート（--fields）は、保存済みの行のほかの列を消さないことを確認"""
+        tweet_store.upsert_tweets(self.tweets[:1], 'thai', path=self.path)
+        projected = Tweet(status_id=tweet_store.status_id_from_url(self.tweets[0]['quote_url']), datetime='2025/06/16 09:00:00')
+        self.assertEqual(tweet_store.upsert_tweets([projected], 'thai', path=self.path), 1)
+
+        tweets = list(tweet_store.iter_tweets('thai', path=self.path))
+        self.assertEqual(len(tweets), 1)
+        self.assertEqual(tweets[0]['datetime'], '2025/06/16 09:00:00')
+        self.assertEqual((tweets[0]['text'], tweets[0]['user_name'], tweets[0]['like_count']), ('本文1', 'ユーザー1', 1))
+        self.assertEqual([tweet['text'] for _, tweet in tweet_store.search_tweets(['本文1'], path=self.path)], ['本文1'])
+
+    def test_indexes(self):
+        """キーワードタイプと投稿時刻、ユーザーの絞り込みにインデックスを使うことを確認"""
+        tweet_store.upsert_tweets(self.tweets, 'thai', path=self.path)
+        conn = sqlite3.connect(self.path)
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM tweets WHERE keyword_type = 'thai' AND epoch_ms >= 0").fetchall()
+            self.assertIn('tweets_keyword_type_epoch', str(plan))
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM tweets WHERE handle = '@user1'").fetchall()
+            self.assertIn('tweets_handle', str(plan))
+        finally:
+            conn.close()
+
+    def test_writer_upserts_into_store(self):
+        """TweetWriter がファイルの書き出し後にストアにも保存することを確認"""
+        txt_path = os.path.join(self.temp_dir, '250615.txt')
+        for _ in range(2):
+            with TweetWriter(txt_path, store_path=self.path, keyword_type='en') as writer:
+                writer.write_all(self.tweets)
+            self.assertEqual(writer.store_count, 4)
+        tweets = list(tweet_store.iter_tweets('en', path=self.path))
+        self.assertEqual(len(tweets), 4)
+        self.assertEqual({tweet['source_file'] for tweet in tweets}, {'250615.txt'})
+
+    def test_search(self):
+        """全文検索の索引（3文字以上）と LIKE（2文字以下）で、すべての検索語を含むツイートを新しい順に返すことを確認"""
+        texts = ['DTVビザの申請', 'タイのdtv情報', 'ビザ更新 100%', 'DTV visa in Thailand']
+        for tweet, text in zip(self.tweets, texts):
+            tweet['text'] = text
+        tweet_store.upsert_tweets(self.tweets[:2], 'thai', path=self.path)
+        tweet_store.upsert_tweets(self.tweets[2:], 'en', path=self.path)
+
+        def search(*terms, **kwargs):
+            return [tweet['text'] for keyword_type, tweet in tweet_store.search_tweets(terms, path=self.path, **kwargs)]
+
+        self.assertEqual(search('dtv'), ['DTVビザの申請', 'タイのdtv情報', 'DTV visa in Thailand'])
+        self.assertEqual(search('ビザ'), ['DTVビザの申請', 'ビザ更新 100%'])
+        self.assertEqual(search('DTV', 'ビザ'), ['DTVビザの申請'])
+        self.assertEqual(search('0%'), ['ビザ更新 100%'])
+        self.assertEqual(search('_'), [])
+        self.assertEqual(search('"dtv'), [])
+        self.assertEqual(search('dtv', keyword_types=['thai']), ['DTVビザの申請', 'タイのdtv情報'])
+        self.assertEqual(search('dtv', limit=1), ['DTVビザの申請'])
+        since_ms = tweet_store.snowflake_epoch_ms(tweet_store.status_id_from_url(self.tweets[1]['quote_url']))
+        self.assertEqual(search('dtv', since_ms=since_ms), ['DTVビザの申請', 'タイのdtv情報'])
+        self.assertEqual(search('dtv', until_ms=since_ms), ['DTV visa in Thailand'])
+
+        # 本文を変更すると索引も更新する
+        self.tweets[0]['text'] = '内容を変更'
+        tweet_store.upsert_tweets(self.tweets[:1], 'thai', path=self.path)
+        self.assertEqual(search('ビザの'), [])
+        self.assertEqual(search('変更'), ['内容を変更'])
+
+        # 全文検索の索引がない場合（FTS5 が使えない SQLite）は、すべての検索語を LIKE で調べる
+        conn = sqlite3.connect(self.path)
+        conn.executescript("DROP TRIGGER tweets_fts_insert; DROP TRIGGER tweets_fts_update; DROP TRIGGER tweets_fts_delete; DROP TABLE tweets_fts;")
+        conn.close()
+        self.assertEqual(search('dtv'), ['タイのdtv情報', 'DTV visa in Thailand'])
+        self.assertEqual(search('DTV', 'ビザ', keyword_types=['en']), [])
+
+    def test_search_rows_per_keyword_type(self):
+        """同じツイートIDでもキーワードタイプごとの行をそれぞれの本文で検索でき、一方を削除しても他方は残ることを確認"""
+        tweet = Tweet(self.tweets[0])
+        tweet_store.upsert_tweets([tweet], 'thai', path=self.path)
+        tweet['text'] = '別のキーワードで抽出した本文'
+        tweet_store.upsert_tweets([tweet], 'en', path=self.path)
+
+        def search(*terms):
+            return [(keyword_type, found['text']) for keyword_type, found in tweet_store.search_tweets(terms, path=self.path)]
+
+        self.assertEqual(search('本文1'), [('thai', '本文1')])
+        self.assertEqual(search('キーワード'), [('en', '別のキーワードで抽出した本文')])
+        self.assertEqual(search('本文'), [('en', '別のキーワードで抽出した本文'), ('thai', '本文1')])
+
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute("DELETE FROM tweets WHERE keyword_type = 'thai'")
+        conn.execute('VACUUM')
+        conn.close()
+        self.assertEqual(search('本文'), [('en', '別のキーワードで抽出した本文')])
+        self.assertEqual(search('本文1'), [])
+
+    def test_date_epoch_ms(self):
+        """日付（JST）の0時と翌日の0時をUnix時間のミリ秒にすることを確認"""
+        self.assertEqual(tweet_store.date_epoch_ms('250615'), 1749913200000)
+        self.assertEqual(tweet_store.date_epoch_ms('2025-06-15', next_day=True), 1749913200000 + 86400000)
+        self.assertIsNone(tweet_store.date_epoch_ms(None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+ツイートの日時の変換のテスト
+"""
+
+import unittest
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tweet_time import display_datetime_epoch_ms, normalize_iso_datetime
+
+def _reference(value):
+    """datetime で変換した場合の結果（比較用）"""
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    display = dt.astimezone(timezone(timedelta(hours=9))).strftime('%Y/%m/%d %H:%M:%S')
+    return display, int(dt.timestamp() * 1000)
+
+class TestTweetTime(unittest.TestCase):
+    """ツイートの日時の変換のテストクラス"""
+
+    def test_normalize_iso_datetime(self):
+        """固定形式・その他のISO形式の変換結果が datetime による変換と一致することを確認"""
+        values = [
+            '2025-06-15T03:44:35.000Z',
+            '2025-06-15T03:44:35.123Z',
+            '2025-06-15T03:44:35Z',
+            '2024-12-31T15:00:00.000Z',  # JSTで年をまたぐ
+            '2024-02-29T20:59:59.999Z',  # うるう日
+            '2025-06-15T12:44:35+09:00',
+            '2025-06-15T03:44:35.5+00:00',
+        ]
+        for value in values:
+            self.assertEqual(normalize_iso_datetime(value), _reference(value), value)
+
+    def test_invalid_values(self):
+        """解析できない日時は元の値と None を返すことを確認"""
+        for value in ('', '6月15日', '2025-13-15T03:44:35.000Z', '2025-06-15T03:44:35.abcZ'):
+            self.assertEqual(normalize_iso_datetime(value), (value, None))
+        self.assertIsNone(display_datetime_epoch_ms(None))
+        self.assertIsNone(display_datetime_epoch_ms('2025/02/30 00:00:00'))
+
+    def test_display_datetime_round_trip(self):
+        """表示用の日時から、元のUnix時間（秒単位）に戻せることを確認"""
+        display, epoch_ms = normalize_iso_datetime('2024-12-31T15:00:01.250Z')
+        self.assertEqual(display, '2025/01/01 00:00:01')
+        self.assertEqual(display_datetime_epoch_ms(display), epoch_ms - 250)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+抽出結果の書き出し（書き出しスレッド）のテスト
+"""
+
+import unittest
+import io
+import os
+import sys
+import json
+import tempfile
+import shutil
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tweet_record import Tweet, tweet_json_default
+from src.tweet_writer import TweetWriter, format_tweet_text
+
+class TestTweetWriter(unittest.TestCase):
+    """書き出しスレッドのテストクラス"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.txt_path = os.path.join(self.temp_dir, 'out.txt')
+        self.json_path = os.path.join(self.temp_dir, 'out.json')
+        self.tweets = [
+            Tweet(id=i, text=f"本文{i} ・箇条書き\n改行", datetime='2025/06/15 12:44:35', quote_url=f"https://x.com/u/status/{i}",
+                  like_count=i if i % 2 else None, media_urls=[])
+            for i in range(1, 6)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_json_same_as_json_dump(self):
+        """まとめて変換したjsonが、全件を json.dump した場合と同じになることを確認（整形あり・なし）"""
+        for indent in (True, False):
+            with self.subTest(indent=indent):
+                with TweetWriter(self.txt_path, self.json_path, indent=indent, batch_size=2) as writer:
+                    writer.write_all(iter(self.tweets))
+                with open(self.json_path, encoding='utf-8') as f:
+                    content = f.read()
+                data = json.loads(content)
+                expected = {'extraction_time': data['extraction_time'], 'tweet_count': 5, 'tweets': self.tweets}
+                if indent:
+                    self.assertEqual(content, json.dumps(expected, ensure_ascii=False, indent=2, default=tweet_json_default))
+                else:
+                    self.assertEqual(content, json.dumps(expected, ensure_ascii=False, separators=(',', ':'), default=tweet_json_default))
+
+        # 本文の整形は1回だけ行い、一覧表示に使えるよう残す
+        self.assertEqual(writer.formatted_texts, [format_tweet_text(tweet['text']) for tweet in self.tweets])
+        with open(self.txt_path, encoding='utf-8') as f:
+            self.assertIn('抽出ツイート数: 5', f.read())
+
+    def test_unchanged_files_not_rewritten(self):
+        """抽出日時以外の内容が同じ場合は、txt・json・ndjsonを書き換えないことを確認"""
+        ndjson_path = os.path.join(self.temp_dir, 'out.ndjson')
+        for json_path, ndjson in ((self.json_path, False), (ndjson_path, True)):
+            with TweetWriter(self.txt_path, json_path, ndjson=ndjson) as writer:
+                writer.write_all(self.tweets)
+            for path in (self.txt_path, json_path):
+                os.utime(path, (1000000000, 1000000000))
+
+            with TweetWriter(self.txt_path, json_path, ndjson=ndjson) as writer:
+                writer.write_all(self.tweets)
+            self.assertEqual(writer.unchanged_paths, [self.txt_path, json_path])
+            self.assertEqual([os.path.getmtime(path) for path in (self.txt_path, json_path)], [1000000000, 1000000000])
+
+            with TweetWriter(self.txt_path, json_path, ndjson=ndjson) as writer:
+                writer.write_all(self.tweets[:-1])
+            self.assertEqual(writer.unchanged_paths, [])
+            with open(self.txt_path, encoding='utf-8') as f:
+                self.assertIn('抽出ツイート数: 4', f.read())
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['out.json', 'out.ndjson', 'out.txt'])
+
+    def test_ndjson_stream(self):
+        """stream には1件ずつndjsonを書き出し、ファイルは作らないことを確認"""
+        stream = io.StringIO()
+        with TweetWriter(ndjson=True, stream=stream) as writer:
+            writer.write_all(self.tweets)
+        self.assertEqual([json.loads(line)['id'] for line in stream.getvalue().splitlines()], [1, 2, 3, 4, 5])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_error_in_writer_thread(self):
+        """書き出しスレッドのエラーを抽出側に送出し、途中までのndjsonを残さないことを確認"""
+        class BrokenStream(io.StringIO):
+            def write(self, data):
+                raise BrokenPipeError()
+
+        writer = TweetWriter(ndjson=True, stream=BrokenStream(), queue_size=1)
+        with self.assertRaises(BrokenPipeError):
+            with writer:
+                writer.write_all(self.tweets * 10)
+
+        ndjson_path = os.path.join(self.temp_dir, 'out.ndjson')
+        with self.assertRaises(RuntimeError):
+            with TweetWriter(self.txt_path, ndjson_path, ndjson=True, batch_size=1) as writer:
+                writer.write_all(self.tweets)
+                raise RuntimeError('抽出中のエラー')
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_no_tweets(self):
+        """ツイートがない場合はファイルを作らないことを確認"""
+        with TweetWriter(self.txt_path, self.json_path) as writer:
+            writer.write_all([])
+        self.assertEqual(writer.tweets, [])
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()